@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Compare the results of two runs of ``run.py``.
+
+The ratios of the wall times and of the peak memory of every stage are
+printed, so that values above 1 are regressions::
+
+    $ python benchmarks/compare.py before.json after.json
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+
+
+def load_results(path):
+    with open(path) as results_file:
+        report = json.load(results_file)
+
+    return {
+        (
+            result["generator"],
+            result["size"],
+            result["interpolation_distance"],
+        ): result
+        for result in report["results"]
+        if "error" not in result
+    }
+
+
+def compare(before, after):
+    for key in sorted(set(before) & set(after)):
+        for stage, measurement in sorted(after[key]["stages"].items()):
+            previous = before[key]["stages"].get(stage)
+            if previous is None:
+                continue
+
+            yield key + (
+                stage,
+                _get_ratio(measurement["seconds"], previous["seconds"]),
+                _get_ratio(measurement["peak_bytes"], previous["peak_bytes"]),
+            )
+
+
+def _get_ratio(value, previous_value):
+    return value / float(previous_value) if previous_value else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    row = "{:<14}{:>6}{:>10}  {:<20}{:>8}{:>8}"
+    print(row.format("generator", "size", "distance", "stage", "time", "peak"))
+    for comparison in compare(
+        load_results(args.before), load_results(args.after)
+    ):
+        generator, size, distance, stage, time_ratio, peak_ratio = comparison
+        print(
+            row.format(
+                generator,
+                size,
+                distance,
+                stage,
+                "{:.2f}".format(time_ratio),
+                "{:.2f}".format(peak_ratio),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""Measure the wall time and the peak memory of the centerline's stages.
+
+The synthetic geometries of the ``synthetic`` module are generated for
+every combination of the sizes and the interpolation distances. The
+stages of their centerlines' construction are measured one by one, and
+the whole-file conversion with ``create_centerlines`` is measured on a
+GeoJSON file of the geometry's parts. With ``--delaunay``, the whole
+construction with the Delaunay engine is measured as well, as the
+``delaunay`` stage, and whether it fell back to the Voronoi diagram.
+The results are written as JSON, which ``compare.py`` compares between
+two runs::
+
+    $ python benchmarks/run.py --sizes 1 2 4 --output before.json
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import numpy
+import scipy
+import scipy.spatial  # noqa: F401, its import time is not measured
+import shapely
+
+from shapely.geometry import mapping
+from synthetic import GENERATORS
+
+import centerline
+
+from centerline.exceptions import CenterlineError
+from centerline.geometry import DELAUNAY_ENGINE, CenterlineBuilder
+from centerline.graph import RidgeGraph
+from centerline.stats import FeatureStats
+
+
+def measure(function, repeat):
+    """Measure the ``function``'s shortest wall time out of ``repeat``
+    calls, and the peak memory it allocates in an additional call.
+
+    :return: measurement and the function's result
+    :rtype: tuple
+    """
+    durations = []
+    for _ in range(repeat):
+        gc.collect()
+        start = timeit.default_timer()
+        result = function()
+        durations.append(timeit.default_timer() - start)
+
+    # Tracing the allocations slows the function down, so the memory is
+    # measured separately.
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": min(durations), "peak_bytes": peak}, result
+
+
+def measure_stages(
+    geometry, interpolation_distance, repeat, directory, delaunay=False
+):
+    """Measure every stage of the ``geometry``'s centerline.
+
+    :return: measurements of the stages, and the stage's counts
+    :rtype: dict
+    """
+    builder = CenterlineBuilder(geometry, interpolation_distance)
+    stages = {}
+
+    stages["densification"], borders = measure(
+        builder._get_densified_borders, repeat
+    )
+    stages["voronoi"], (vertices, ridges, ridge_sites) = measure(
+        lambda: builder._get_voronoi_vertices_and_ridges(borders), repeat
+    )
+    stages["ridge_filtering"], kept_ridges = measure(
+        lambda: builder._get_ridges_within_input_geometry(
+            vertices, ridges, ridge_sites
+        ),
+        repeat,
+    )
+    restored_vertices = builder._create_point_with_restored_coordinates(
+        vertices
+    )
+    stages["assembly"], _ = measure(
+        lambda: RidgeGraph(restored_vertices, kept_ridges).get_polylines(),
+        repeat,
+    )
+    stages["centerline"], _ = measure(
+        CenterlineBuilder(geometry, interpolation_distance).build, repeat
+    )
+    if directory is not None:
+        stages["create_centerlines"] = measure_create_centerlines(
+            geometry, interpolation_distance, repeat, directory
+        )
+
+    result = {
+        "stages": stages,
+        "points": len(borders),
+        "ridges": len(ridges),
+        "kept_ridges": len(kept_ridges),
+    }
+    if delaunay:
+        stats = FeatureStats()
+        stages["delaunay"], _ = measure(
+            CenterlineBuilder(
+                geometry,
+                interpolation_distance,
+                stats=stats,
+                engine=DELAUNAY_ENGINE,
+            ).build,
+            repeat,
+        )
+        # The triangulation's points include those added to split the
+        # border's long segments, unless it fell back to the Voronoi
+        # diagram, whose points are counted instead.
+        result["delaunay_points"] = stats.points
+        result["delaunay_fallback"] = stats.fallbacks > 0
+    return result
+
+
+def measure_create_centerlines(
+    geometry, interpolation_distance, repeat, directory
+):
+    import fiona
+
+    from centerline.converters import create_centerlines
+
+    src = os.path.join(directory, "src.geojson")
+    dst = os.path.join(directory, "dst.geojson")
+    parts = getattr(geometry, "geoms", [geometry])
+    schema = {"geometry": "Polygon", "properties": {"id": "int"}}
+    with fiona.open(src, "w", driver="GeoJSON", schema=schema) as src_file:
+        src_file.writerecords(
+            {"geometry": mapping(part), "properties": {"id": index}}
+            for index, part in enumerate(parts)
+        )
+
+    def convert():
+        if os.path.exists(dst):
+            os.remove(dst)
+        create_centerlines.main(
+            [
+                src,
+                dst,
+                "--interpolation-distance",
+                str(interpolation_distance),
+            ],
+            standalone_mode=False,
+        )
+
+    measurement, _ = measure(convert, repeat)
+    return measurement
+
+
+def get_metadata():
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "centerline": centerline.__version__,
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "shapely": shapely.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--generators",
+        nargs="+",
+        choices=sorted(GENERATORS),
+        default=sorted(GENERATORS),
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument(
+        "--interpolation-distances",
+        nargs="+",
+        type=float,
+        default=[0.5, 1.0],
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--skip-files",
+        action="store_true",
+        help="do not measure create_centerlines, which requires GDAL",
+    )
+    parser.add_argument(
+        "--delaunay",
+        action="store_true",
+        help="also measure the centerline with the Delaunay engine",
+    )
+    parser.add_argument("--output", help="JSON file of the results")
+    args = parser.parse_args()
+
+    directory = None if args.skip_files else tempfile.mkdtemp()
+    results = []
+    try:
+        for name in args.generators:
+            for size in args.sizes:
+                geometry = GENERATORS[name](size, seed=args.seed)
+                for interpolation_distance in args.interpolation_distances:
+                    result = {
+                        "generator": name,
+                        "size": size,
+                        "seed": args.seed,
+                        "interpolation_distance": interpolation_distance,
+                    }
+                    try:
+                        result.update(
+                            measure_stages(
+                                geometry,
+                                interpolation_distance,
+                                args.repeat,
+                                directory,
+                                delaunay=args.delaunay,
+                            )
+                        )
+                    except CenterlineError as error:
+                        result["error"] = str(error)
+                    results.append(result)
+                    print(
+                        name,
+                        size,
+                        interpolation_distance,
+                        result.get("error")
+                        or "{:.3f} s".format(
+                            result["stages"]["centerline"]["seconds"]
+                        ),
+                        file=sys.stderr,
+                    )
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory)
+
+    report = {"metadata": get_metadata(), "results": results}
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Measure the latency of the centerline service under concurrent load.
+
+An HTTP server of ``centerline.server`` is started on a free local
+port, and the synthetic geometries of the ``synthetic`` module are
+POSTed to it by a number of concurrent clients. The median and the 99th
+percentile of the latencies of the successful requests, the throughput
+and the counts of the responses by their status codes, e.g. the 503
+rejections, are written as JSON::
+
+    $ python benchmarks/server.py --workers 4 --clients 16 --requests 400
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import threading
+import time
+
+from collections import Counter
+from multiprocessing.pool import ThreadPool
+
+from numpy import percentile
+from shapely.geometry import mapping
+from synthetic import GENERATORS
+
+from centerline.server import CenterlineService, create_http_server
+
+
+try:
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+except ImportError:  # pragma: no cover
+    from urllib2 import HTTPError, Request, urlopen
+
+
+def create_requests(generator, size, count):
+    return [
+        json.dumps(
+            {
+                "id": index,
+                "geometry": mapping(GENERATORS[generator](size, seed=index)),
+            }
+        ).encode("utf-8")
+        for index in range(count)
+    ]
+
+
+def send_request(url, body):
+    request = Request(
+        url, data=body, headers={"Content-Type": "application/json"}
+    )
+    start = time.time()
+    try:
+        response = urlopen(request)
+        status = response.getcode()
+        response.read()
+    except HTTPError as error:
+        status = error.code
+        error.read()
+    return status, time.time() - start
+
+
+def measure(url, bodies, clients):
+    pool = ThreadPool(clients)
+    start = time.time()
+    try:
+        results = pool.map(lambda body: send_request(url, body), bodies)
+    finally:
+        pool.close()
+        pool.join()
+    duration = time.time() - start
+
+    statuses = Counter(status for status, _ in results)
+    latencies = [latency for status, latency in results if status == 200]
+    return {
+        "seconds": duration,
+        "requests_per_second": len(bodies) / duration,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "p50_seconds": percentile(latencies, 50) if latencies else None,
+        "p99_seconds": percentile(latencies, 99) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--generator", choices=sorted(GENERATORS), default="river"
+    )
+    parser.add_argument("--size", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    bodies = create_requests(args.generator, args.size, args.requests)
+
+    service = CenterlineService(args.workers, args.max_pending, args.timeout)
+    server = create_http_server(service)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        result = measure(
+            "http://127.0.0.1:{}/".format(server.server_port),
+            bodies,
+            args.clients,
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+    result.update(vars(args))
+    print(json.dumps(result, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
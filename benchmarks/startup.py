@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Measure how long it takes to import the package's modules.
+
+Every module is imported in a fresh interpreter, and the fastest of the
+repeated measurements is reported in seconds, as JSON. If the
+``--max-seconds`` limit is exceeded by any of the modules, the script
+exits with a non-zero status, so it can guard against regressions::
+
+    $ python benchmarks/startup.py --max-seconds 0.5
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+MODULES = ("centerline", "centerline.geometry", "centerline.converters")
+HEAVY_MODULES = ("scipy", "fiona", "osgeo", "pyarrow")
+
+MEASUREMENT = """
+import sys
+import time
+
+start = time.time()
+import {module}
+duration = time.time() - start
+
+heavy_modules = [name for name in {heavy_modules!r} if name in sys.modules]
+print(duration, " ".join(heavy_modules))
+"""
+
+
+def measure_import(module, repeat):
+    durations = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                "-c",
+                MEASUREMENT.format(
+                    module=module, heavy_modules=list(HEAVY_MODULES)
+                ),
+            ]
+        )
+        duration, _, heavy_modules = output.decode().partition(" ")
+        durations.append(float(duration))
+
+    return {
+        "seconds": min(durations),
+        "heavy_modules": heavy_modules.split(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float)
+    args = parser.parse_args()
+
+    results = {
+        module: measure_import(module, args.repeat) for module in args.modules
+    }
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+    if args.max_seconds is not None and any(
+        result["seconds"] > args.max_seconds for result in results.values()
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
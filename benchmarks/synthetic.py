@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Reproducible synthetic input geometries for the benchmarks.
+
+Every generator takes a ``size``, which scales the number of the
+geometry's vertices roughly linearly, and a ``seed``, so that the same
+arguments always produce the same geometry.
+"""
+
+from __future__ import unicode_literals
+
+from numpy import (
+    arange,
+    arctan2,
+    concatenate,
+    cos,
+    cumsum,
+    diff,
+    hypot,
+    linspace,
+    ones,
+    pi,
+    sin,
+    sqrt,
+)
+from numpy.random import RandomState
+from shapely import affinity
+from shapely.geometry import LineString, MultiPolygon, Point, Polygon, box
+from shapely.ops import unary_union
+
+
+def create_river(size, seed=0):
+    """Long meandering river of a varying width.
+
+    :param size: the river is ``1000 * size`` [meter] long
+    :type size: int
+    """
+    random_state = RandomState(seed)
+    length = 1000.0 * size
+    xs = linspace(0, length, 200 * size)
+    # The meanders' phase drifts randomly, so that no two bends are
+    # equal.
+    phase = cumsum(random_state.normal(0, 0.05, len(xs)))
+    ys = 60 * sin(2 * pi * xs / 250 + phase)
+    river = LineString(list(zip(xs, ys)))
+
+    widths = 8 + 4 * sin(2 * pi * xs / 700 + random_state.uniform(0, 2 * pi))
+    buffers = [
+        Point(x, y).buffer(width / 2, resolution=4)
+        for x, y, width in zip(xs[::10], ys[::10], widths[::10])
+    ]
+    return unary_union(
+        [river.buffer(4, cap_style=2, join_style=1)] + buffers
+    ).simplify(0.05)
+
+
+def create_round_river(size, seed=0):
+    """Long meandering river of a constant width, with round caps and
+    joins, whose vertices are not simplified.
+
+    :param size: the river is ``1000 * size`` [meter] long
+    :type size: int
+    """
+    random_state = RandomState(seed)
+    length = 1000.0 * size
+    xs = linspace(0, length, 400 * size)
+    phase = random_state.uniform(0, 2 * pi)
+    ys = 60 * sin(2 * pi * xs / 250 + phase)
+    return LineString(list(zip(xs, ys))).buffer(8)
+
+
+def create_disc(size, seed=0):
+    """Disc of a random radius, with ``64 * size`` vertices.
+
+    :param size: number of the vertices divided by 64
+    :type size: int
+    """
+    random_state = RandomState(seed)
+    return Point(0, 0).buffer(
+        random_state.uniform(10, 50), resolution=16 * size
+    )
+
+
+def create_canal(size, seed=0):
+    """Long, gently curving canal of a constant width, whose banks have
+    a vertex every 25 meters.
+
+    :param size: the canal is ``5000 * size`` [meter] long
+    :type size: int
+    """
+    random_state = RandomState(seed)
+    length = 5000.0 * size
+    xs = linspace(0, length, 200 * size + 1)
+    phase = random_state.uniform(0, 2 * pi)
+    ys = 200 * sin(2 * pi * xs / 2000 + phase)
+    return LineString(list(zip(xs, ys))).buffer(
+        10, cap_style=2, join_style=2
+    )
+
+
+def create_polygon_with_holes(size, seed=0):
+    """Square with ``250 * size`` small round holes.
+
+    :param size: number of the holes divided by 250
+    :type size: int
+    """
+    random_state = RandomState(seed)
+    count = 250 * size
+    columns = int(sqrt(count)) + 1
+    spacing = 10.0
+    side = columns * spacing
+
+    holes = []
+    for index in range(count):
+        row, column = divmod(index, columns)
+        center = (
+            (column + 0.5) * spacing + random_state.uniform(-2, 2),
+            (row + 0.5) * spacing + random_state.uniform(-2, 2),
+        )
+        radius = random_state.uniform(1, 2.5)
+        hole = Point(center).buffer(radius, resolution=3)
+        holes.append(list(hole.exterior.coords))
+
+    return Polygon(box(0, 0, side, side).exterior.coords, holes)
+
+
+def create_multipolygon(size, seed=0):
+    """Multipolygon of ``100 * size`` rotated, elongated parts.
+
+    :param size: number of the parts divided by 100
+    :type size: int
+    """
+    random_state = RandomState(seed)
+    count = 100 * size
+    columns = int(sqrt(count)) + 1
+    parts = []
+    for index in range(count):
+        row, column = divmod(index, columns)
+        part = box(0, 0, random_state.uniform(10, 25), 3)
+        part = affinity.rotate(part, random_state.uniform(0, 180))
+        parts.append(affinity.translate(part, column * 40, row * 40))
+    return MultiPolygon(parts)
+
+
+def create_raster_outline(size, seed=0):
+    """Staircase outline of a blob of raster cells, as produced by
+    vectorizing a classified raster.
+
+    :param size: the raster has ``64 * size`` rows and columns
+    :type size: int
+    """
+    random_state = RandomState(seed)
+    shape = 64 * size
+    center = (shape - 1) / 2.0
+    ys = arange(shape)[:, None] - center
+    xs = arange(shape)[None, :] - center
+
+    # A disc whose radius is modulated by random harmonics, with some
+    # noise on its border.
+    angles = arctan2(ys, xs)
+    radii = 0.35 * shape * ones((shape, shape))
+    for harmonic, phase in enumerate(random_state.uniform(0, 2 * pi, 4)):
+        radii += 0.03 * shape * cos((harmonic + 2) * angles + phase)
+    noise = random_state.uniform(-1.5, 1.5, (shape, shape))
+    cells = hypot(xs, ys) + noise < radii
+
+    # The cells are merged into horizontal runs first, which is much
+    # faster than merging them one by one.
+    runs = []
+    for row in range(shape):
+        changes = diff(concatenate(([0], cells[row].astype(int), [0])))
+        (starts,) = (changes == 1).nonzero()
+        (ends,) = (changes == -1).nonzero()
+        runs.extend(
+            box(start, row, end, row + 1) for start, end in zip(starts, ends)
+        )
+
+    outline = unary_union(runs)
+    if outline.geom_type == "MultiPolygon":
+        outline = max(outline.geoms, key=lambda polygon: polygon.area)
+    return outline
+
+
+GENERATORS = {
+    "river": create_river,
+    "round_river": create_round_river,
+    "canal": create_canal,
+    "disc": create_disc,
+    "holes": create_polygon_with_holes,
+    "multipolygon": create_multipolygon,
+    "raster": create_raster_outline,
+}
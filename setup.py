@@ -5,5 +5,7 @@ setup(
     entry_points="""
         [console_scripts]
         create_centerlines=centerline.converters:create_centerlines
+        merge_centerlines=centerline.converters:merge_centerlines
+        serve_centerlines=centerline.server:serve_centerlines
     """
 )
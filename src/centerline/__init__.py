@@ -2,6 +2,9 @@
 
 from __future__ import unicode_literals
 
+from .batch import build_centerlines  # noqa: F401
+from .processing import CenterlineFeature, iter_centerlines  # noqa: F401
+
 
 __title__ = 'centerline'
 __version__ = '0.6.3'
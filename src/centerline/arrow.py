@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import bisect
+import json
+import logging
+import os
+import struct
+
+from numpy import asarray
+from shapely import wkb
+from shapely.geometry import GeometryCollection
+
+from .exceptions import UnsupportedGeometryEncoding
+from .processing import _iter_centerline_results
+
+
+# PyArrow is an optional dependency, which is only imported when the
+# columnar files are read or written.
+
+# Formats of the columnar files by their extensions.
+ARROW_FORMATS = {
+    ".parquet": "parquet",
+    ".geoparquet": "parquet",
+    ".arrow": "ipc",
+    ".feather": "ipc",
+    ".ipc": "ipc",
+}
+# Number of the rows read from a Parquet file at once. The batches of
+# the Arrow IPC files are read as they were written.
+DEFAULT_BATCH_SIZE = 10000
+# Key of the GeoParquet metadata in the schema's metadata.
+GEO_METADATA_KEY = b"geo"
+GEOPARQUET_VERSION = "1.0.0"
+DEFAULT_GEOMETRY_COLUMN = "geometry"
+# Name of the GeoArrow extension type of the WKB geometry columns.
+GEOARROW_WKB = b"geoarrow.wkb"
+WKB_LINESTRING = 2
+WKB_MULTILINESTRING = 5
+
+
+def get_arrow_format(path):
+    """Get the columnar format of the file by its extension.
+
+    :param path: path to the file
+    :type path: str
+    :return: ``"parquet"``, ``"ipc"``, or ``None`` if the file is not
+        a GeoParquet or an Arrow IPC file
+    :rtype: str
+    """
+    return ARROW_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def write_arrow_centerlines(
+    src,
+    dst,
+    interpolation_distance=0.5,
+    batch_size=DEFAULT_BATCH_SIZE,
+    **options
+):
+    """Convert the polygons of a GeoParquet or an Arrow IPC file to
+    centerlines in another such file.
+
+    The WKB geometry column is read in record batches, whereas the
+    other columns are copied to the ``dst`` file as they are, batch by
+    batch, without converting them to Python objects. The rows whose
+    centerlines cannot be constructed are logged as warnings and left
+    out. The GeoParquet metadata and the CRS are carried over.
+
+    The other ``options`` are those of
+    :py:func:`centerline.processing.iter_centerlines`.
+
+    :param src: path to the input file
+    :type src: str
+    :param dst: path to the output file
+    :type dst: str
+    :param interpolation_distance: densify the input geometry's
+        border by placing additional points at this distance, defaults
+        to 0.5 [meter], or ``"auto"``
+    :type interpolation_distance: float or str, optional
+    :param batch_size: number of the rows read from a Parquet file at
+        once, defaults to 10000
+    :type batch_size: int, optional
+    :raises exceptions.UnsupportedGeometryEncoding: geometry column is
+        not WKB encoded
+    """
+    schema, batches = _open_record_batches(src, batch_size)
+    geometry_column = _get_geometry_column(schema)
+    output_schema = _get_output_schema(schema, geometry_column)
+
+    writer = _open_writer(dst, output_schema)
+    try:
+        for output_batch in _iter_centerline_batches(
+            batches,
+            output_schema,
+            geometry_column,
+            interpolation_distance,
+            **options
+        ):
+            writer.write_batch(output_batch)
+    finally:
+        writer.close()
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(
+            "PyArrow is required to read and write the GeoParquet and "
+            "the Arrow IPC files: pip install centerline[arrow]"
+        )
+    return pyarrow
+
+
+def _open_record_batches(path, batch_size):
+    pyarrow = _import_pyarrow()
+
+    if get_arrow_format(path) == "parquet":
+        import pyarrow.parquet
+
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        return (
+            parquet_file.schema_arrow,
+            parquet_file.iter_batches(batch_size=batch_size),
+        )
+
+    import pyarrow.ipc
+
+    try:
+        reader = pyarrow.ipc.open_file(path)
+    except pyarrow.ArrowInvalid:
+        reader = pyarrow.ipc.open_stream(path)
+        return reader.schema, iter(reader)
+
+    batches = (
+        reader.get_batch(index) for index in range(reader.num_record_batches)
+    )
+    return reader.schema, batches
+
+
+def _open_writer(path, schema):
+    pyarrow = _import_pyarrow()
+
+    if get_arrow_format(path) == "parquet":
+        import pyarrow.parquet
+
+        return pyarrow.parquet.ParquetWriter(path, schema)
+
+    import pyarrow.ipc
+
+    return pyarrow.ipc.new_file(path, schema)
+
+
+def _get_geo_metadata(schema):
+    metadata = schema.metadata or {}
+    if GEO_METADATA_KEY not in metadata:
+        return None
+    return json.loads(metadata[GEO_METADATA_KEY].decode("utf-8"))
+
+
+def _get_geometry_column(schema):
+    # The GeoParquet metadata names the primary geometry column, and the
+    # plain Arrow files mark it with the GeoArrow extension type.
+    geo_metadata = _get_geo_metadata(schema)
+    if geo_metadata is not None:
+        geometry_column = geo_metadata["primary_column"]
+        encoding = geo_metadata["columns"][geometry_column].get(
+            "encoding", "WKB"
+        )
+        if encoding.upper() != "WKB":
+            raise UnsupportedGeometryEncoding
+    else:
+        geometry_column = DEFAULT_GEOMETRY_COLUMN
+        for field in schema:
+            field_metadata = field.metadata or {}
+            if field_metadata.get(b"ARROW:extension:name") == GEOARROW_WKB:
+                geometry_column = field.name
+                break
+
+    pyarrow = _import_pyarrow()
+    geometry_type = schema.field(geometry_column).type
+    if not (
+        pyarrow.types.is_binary(geometry_type)
+        or pyarrow.types.is_large_binary(geometry_type)
+    ):
+        raise UnsupportedGeometryEncoding
+    return geometry_column
+
+
+def _get_output_schema(schema, geometry_column):
+    pyarrow = _import_pyarrow()
+
+    geo_metadata = _get_geo_metadata(schema) or {
+        "version": GEOPARQUET_VERSION,
+        "primary_column": geometry_column,
+        "columns": {geometry_column: {}},
+    }
+    # The bounding box and the other properties of the input geometries
+    # do not apply to the centerlines, unlike their CRS.
+    column_metadata = {
+        "encoding": "WKB",
+        "geometry_types": ["MultiLineString"],
+    }
+    crs = geo_metadata["columns"][geometry_column].get("crs")
+    if crs is not None:
+        column_metadata["crs"] = crs
+    geo_metadata["columns"] = {geometry_column: column_metadata}
+
+    metadata = dict(schema.metadata or {})
+    metadata[GEO_METADATA_KEY] = json.dumps(geo_metadata).encode("utf-8")
+
+    index = schema.get_field_index(geometry_column)
+    field = pyarrow.field(
+        geometry_column,
+        pyarrow.binary(),
+        metadata=schema.field(geometry_column).metadata,
+    )
+    return schema.set(index, field).with_metadata(metadata)
+
+
+def _iter_centerline_batches(
+    batches, output_schema, geometry_column, interpolation_distance, **options
+):
+    # All of the rows are processed in a single pool, so a batch is only
+    # complete once the centerlines of all of its rows are constructed.
+    pending_batches = {}
+    starts = []
+
+    def features():
+        start = 0
+        for batch in batches:
+            if not batch.num_rows:
+                continue
+
+            pending_batches[start] = _PendingBatch(batch)
+            starts.append(start)
+            start += batch.num_rows
+            for geometry in _get_geometries(batch.column(geometry_column)):
+                if geometry is None:
+                    # An empty collection fails like the other
+                    # unsupported geometries.
+                    yield GeometryCollection(), None
+                else:
+                    yield geometry, None
+
+    for centerline_feature in _iter_centerline_results(
+        features(), interpolation_distance, **options
+    ):
+        position = bisect.bisect_right(starts, centerline_feature.index)
+        start = starts[position - 1]
+        pending_batch = pending_batches[start]
+        if centerline_feature.error is not None:
+            logging.warning(centerline_feature.error)
+            pending_batch.skip()
+        else:
+            pending_batch.add(
+                centerline_feature.index - start,
+                _get_multilinestring_wkb(centerline_feature.geometry),
+            )
+
+        if pending_batch.is_complete():
+            del pending_batches[start]
+            starts.remove(start)
+            yield pending_batch.to_record_batch(output_schema, geometry_column)
+
+
+class _PendingBatch(object):
+    def __init__(self, batch):
+        self.batch = batch
+        self.processed = 0
+        self.centerlines = []
+
+    def add(self, row, centerline_wkb):
+        self.processed += 1
+        self.centerlines.append((row, centerline_wkb))
+
+    def skip(self):
+        self.processed += 1
+
+    def is_complete(self):
+        return self.processed == self.batch.num_rows
+
+    def to_record_batch(self, schema, geometry_column):
+        pyarrow = _import_pyarrow()
+
+        # The centerlines of the unordered pool arrive in any order.
+        self.centerlines.sort(key=lambda centerline: centerline[0])
+        rows = pyarrow.array(
+            [row for row, _ in self.centerlines], type=pyarrow.int64()
+        )
+        columns = [
+            (
+                pyarrow.array(
+                    [centerline_wkb for _, centerline_wkb in self.centerlines],
+                    type=pyarrow.binary(),
+                )
+                if name == geometry_column
+                else self.batch.column(index).take(rows)
+            )
+            for index, name in enumerate(schema.names)
+        ]
+        return pyarrow.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _get_geometries(column):
+    # Shapely 2 decodes the whole column at once, whereas the older
+    # versions decode the geometries one by one.
+    try:
+        from shapely import from_wkb
+    except ImportError:
+        return [
+            None if geometry_wkb is None else wkb.loads(geometry_wkb)
+            for geometry_wkb in column.to_pylist()
+        ]
+    return from_wkb(column.to_numpy(zero_copy_only=False))
+
+
+def _get_multilinestring_wkb(result):
+    # The centerline's coordinates are encoded directly, because
+    # creating a Shapely geometry only to export it would be slower.
+    coordinates = asarray(result.coordinates, dtype="<f8")
+    offsets = result.offsets
+    parts = [struct.pack("<BII", 1, WKB_MULTILINESTRING, len(result))]
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        parts.append(struct.pack("<BII", 1, WKB_LINESTRING, end - start))
+        parts.append(coordinates[start:end].tobytes())
+    return b"".join(parts)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from numpy import (
+    arange,
+    asarray,
+    concatenate,
+    cumsum,
+    diff,
+    empty,
+    intp,
+    isin,
+    repeat,
+    searchsorted,
+    split,
+)
+
+from .densification import densify_rings_uniformly
+from .exceptions import InvalidInputTypeError, TooFewRidgesError
+from .geometry import (
+    AUTO_INTERPOLATION_DISTANCE,
+    DELAUNAY_ENGINE,
+    CenterlineBuilder,
+    _import_qhull_error,
+    _PolygonArrays,
+)
+from .processing import _get_construction_error, map_in_pool
+
+
+# Type IDs of the polygons and the multipolygons in Shapely 2.
+POLYGON_TYPE_IDS = (3, 6)
+
+
+def build_centerlines(
+    geometries, interpolation_distance=0.5, workers=1, **options
+):
+    """Construct the centerlines of an array of geometries.
+
+    The geometries can be a Shapely 2 array, a
+    :py:class:`geopandas.GeoSeries` or any other sequence. With
+    Shapely 2, the types and the bounds of all of the geometries are
+    checked, their rings' coordinates are extracted and, unless the
+    interpolation distance is adaptive or searched for, their borders
+    are densified in vectorized operations over the whole batch,
+    instead of one geometry at a time. The parts of the multipolygons
+    are still densified one by one, since their centerlines are
+    constructed separately. With the older versions of
+    Shapely, every geometry is converted by
+    :py:class:`centerline.geometry.CenterlineBuilder` separately.
+
+    Two arrays aligned with the ``geometries`` are returned: the
+    centerlines, and the errors raised while constructing them. The
+    missing geometries get neither of them, whereas the other ones get
+    one or the other.
+
+    The other ``options`` are those of
+    :py:class:`centerline.geometry.CenterlineBuilder`.
+
+    :param geometries: input geometries
+    :type geometries: array-like
+    :param interpolation_distance: densify the input geometry's
+        border by placing additional points at this distance,
+        defaults to 0.5 [meter], or ``"auto"``
+    :type interpolation_distance: float or str, optional
+    :param workers: number of processes used to construct the
+        centerlines, defaults to 1
+    :type workers: int, optional
+    :return: centerlines, or ``None`` where the construction failed,
+        and the :py:class:`centerline.exceptions.CenterlineError`
+        errors, or ``None`` where it succeeded
+    :rtype: tuple of two :py:class:`numpy.ndarray` of objects
+    """
+    geometries = _as_object_array(geometries)
+    centerlines = empty(len(geometries), dtype=object)
+    errors = empty(len(geometries), dtype=object)
+
+    try:
+        import shapely.lib  # noqa: F401, only exists in Shapely 2
+    except ImportError:
+        builders = _iter_builders(
+            geometries, interpolation_distance, errors, **options
+        )
+    else:
+        builders = _iter_vectorized_builders(
+            geometries, interpolation_distance, errors, **options
+        )
+
+    for index, centerline, error in map_in_pool(
+        _build_centerline, builders, workers=workers
+    ):
+        centerlines[index] = centerline
+        errors[index] = error
+
+    return centerlines, errors
+
+
+def _as_object_array(geometries):
+    # Arrays and GeoSeries convert to arrays of their geometries, whereas
+    # the lists are filled in one by one, since the multipart geometries
+    # of Shapely 1 would be converted to arrays themselves.
+    if hasattr(geometries, "__array__"):
+        array = asarray(geometries, dtype=object)
+        if array.ndim == 1:
+            return array
+
+    array = empty(len(geometries), dtype=object)
+    for index, geometry in enumerate(geometries):
+        array[index] = geometry
+    return array
+
+
+def _iter_builders(geometries, interpolation_distance, errors, **options):
+    for index, geometry in enumerate(geometries):
+        if geometry is None:
+            continue
+
+        try:
+            if geometry.is_empty:
+                raise InvalidInputTypeError
+            builder = CenterlineBuilder(
+                geometry, interpolation_distance, **options
+            )
+        except InvalidInputTypeError as error:
+            errors[index] = error
+            continue
+
+        yield index, builder
+
+
+def _iter_vectorized_builders(
+    geometries, interpolation_distance, errors, **options
+):
+    import shapely
+
+    type_ids = shapely.get_type_id(geometries)
+    is_missing = type_ids == -1
+    is_polygon = isin(type_ids, POLYGON_TYPE_IDS) & ~shapely.is_empty(
+        geometries
+    )
+    for index in (~(is_missing | is_polygon)).nonzero()[0]:
+        errors[index] = InvalidInputTypeError()
+
+    (indices,) = is_polygon.nonzero()
+    polygons = geometries[indices]
+    min_coordinates = shapely.bounds(polygons)[:, :2]
+
+    parts, part_polygons = shapely.get_parts(polygons, return_index=True)
+    rings, ring_parts = shapely.get_rings(parts, return_index=True)
+    coordinates, coordinate_rings = shapely.get_coordinates(
+        rings, return_index=True
+    )
+    # The rings and the densified borders are views of the arrays of
+    # the whole batch.
+    ring_offsets = searchsorted(coordinate_rings, arange(len(rings) + 1))
+    polygon_ring_offsets = searchsorted(
+        part_polygons[ring_parts], arange(len(polygons) + 1)
+    )
+    ring_coordinates = split(coordinates, ring_offsets[1:-1])
+
+    densified_borders = [None] * len(polygons)
+    if not (
+        options.get("adaptive")
+        or options.get("engine") == DELAUNAY_ENGINE
+        or interpolation_distance == AUTO_INTERPOLATION_DISTANCE
+    ):
+        # The parts of the multipolygons are densified one by one by
+        # their builders, so only the other polygons are densified here.
+        (positions,) = (shapely.get_num_geometries(polygons) == 1).nonzero()
+        for position, borders in zip(
+            positions,
+            _densify_polygons(
+                coordinates,
+                ring_offsets,
+                polygon_ring_offsets,
+                positions,
+                min_coordinates,
+                abs(interpolation_distance),
+            ),
+        ):
+            densified_borders[position] = borders
+
+    for position, index in enumerate(indices):
+        first_ring = polygon_ring_offsets[position]
+        last_ring = polygon_ring_offsets[position + 1]
+        polygon_arrays = _PolygonArrays(
+            ring_coordinates[first_ring:last_ring],
+            polygon=polygons[position],
+            min_coordinates=min_coordinates[position],
+            densified_borders=densified_borders[position],
+        )
+        yield index, CenterlineBuilder(
+            polygon_arrays, interpolation_distance, **options
+        )
+
+
+def _densify_polygons(
+    coordinates,
+    ring_offsets,
+    polygon_ring_offsets,
+    positions,
+    min_coordinates,
+    interpolation_distance,
+):
+    if not len(positions):
+        return []
+
+    polygon_ring_counts = diff(polygon_ring_offsets)
+    is_densified_ring = repeat(
+        isin(arange(len(polygon_ring_counts)), positions),
+        polygon_ring_counts,
+    )
+    ring_lengths = diff(ring_offsets)
+    points, point_offsets = densify_rings_uniformly(
+        coordinates[repeat(is_densified_ring, ring_lengths)],
+        concatenate(([0], cumsum(ring_lengths[is_densified_ring]))),
+        interpolation_distance,
+    )
+    # The points are reduced by the integer part of their polygon's
+    # minimum coordinates, as the builder would reduce them.
+    polygon_point_offsets = point_offsets[
+        concatenate(([0], cumsum(polygon_ring_counts[positions])))
+    ]
+    points -= repeat(
+        min_coordinates[positions].astype(intp),
+        diff(polygon_point_offsets),
+        axis=0,
+    )
+    return split(points, polygon_point_offsets[1:-1])
+
+
+def _build_centerline(task):
+    index, builder = task
+    try:
+        return index, builder.build(), None
+    except (TooFewRidgesError, _import_qhull_error()) as error:
+        return index, None, _get_construction_error(error)
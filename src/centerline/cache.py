@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import sqlite3
+import threading
+
+from numpy import float64, frombuffer, int64
+
+from .exceptions import TooFewRidgesError
+from .geometry import CenterlineResult
+
+
+# Default size of the cached centerlines' coordinates, in bytes.
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024
+# Number of the centerlines cached in a single transaction.
+DEFAULT_COMMIT_INTERVAL = 1000
+
+
+def get_cache_key(geometry, **options):
+    """Get the cache key of the centerline of the ``geometry``.
+
+    The key is the hash of the normalized geometry's WKB, the
+    ``options`` the centerline is constructed with, and the library's
+    version, so that upgrading the library does not reuse the
+    centerlines of the previous versions.
+
+    :param geometry: input geometry
+    :type geometry: :py:class:`shapely.geometry.base.BaseGeometry`
+    :param options: options the centerline is constructed with
+    :type options: dict
+    :return: hexadecimal key
+    :rtype: str
+    """
+    from . import __version__
+
+    # Geometries that only differ in their rings' starting points and
+    # orientation share the same normalized form.
+    normalize = getattr(geometry, "normalize", None)
+    if normalize is not None:
+        geometry = normalize()
+
+    digest = hashlib.sha256(geometry.wkb)
+    digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    digest.update(__version__.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CenterlineCache(object):
+    """Persistent cache of the centerlines, stored in an SQLite database.
+
+    When the total size of the cached coordinates exceeds the
+    ``max_size``, the least recently used centerlines are evicted.
+    The number of the ``hits`` and the ``misses`` is counted for every
+    cache object.
+
+    The cache can be shared between the threads, but not between the
+    processes, so it should be queried in the main process only.
+
+    The centerlines are committed in batches of the ``commit_interval``
+    and when the cache is closed, so that caching every centerline does
+    not wait for the disk. The centerlines that cannot be constructed
+    are cached as well, so that they are not constructed again.
+
+    :param path: path to the SQLite database, which is created if it
+        does not exist
+    :type path: str
+    :param max_size: maximum size of the cached coordinates, defaults to
+        1 GiB [bytes]
+    :type max_size: int, optional
+    :param commit_interval: number of the centerlines cached in a single
+        transaction, defaults to 1000
+    :type commit_interval: int, optional
+    """
+
+    def __init__(
+        self,
+        path,
+        max_size=DEFAULT_CACHE_SIZE,
+        commit_interval=DEFAULT_COMMIT_INTERVAL,
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.commit_interval = commit_interval
+        self.hits = 0
+        self.misses = 0
+        self._uncommitted = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS centerlines ("
+            "key TEXT PRIMARY KEY, "
+            "coordinates BLOB NOT NULL, "
+            "offsets BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "accessed INTEGER NOT NULL, "
+            "failed INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [
+            row[1]
+            for row in self._connection.execute(
+                "PRAGMA table_info(centerlines)"
+            )
+        ]
+        if "failed" not in columns:
+            # The caches created by the previous versions.
+            self._connection.execute(
+                "ALTER TABLE centerlines "
+                "ADD COLUMN failed INTEGER NOT NULL DEFAULT 0"
+            )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS centerlines_accessed "
+            "ON centerlines (accessed)"
+        )
+        size, clock = self._connection.execute(
+            "SELECT TOTAL(size), MAX(accessed) FROM centerlines"
+        ).fetchone()
+        self._size = int(size)
+        self._clock = clock or 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM centerlines"
+            ).fetchone()[0]
+
+    @property
+    def size(self):
+        """Total size of the cached coordinates.
+
+        :rtype: int
+        """
+        return self._size
+
+    def get(self, key):
+        """Get the cached centerline.
+
+        :param key: centerline's key
+        :type key: str
+        :return: centerline without properties, or ``None`` if it is
+            not cached
+        :rtype: :py:class:`centerline.geometry.CenterlineResult`
+        :raises exceptions.TooFewRidgesError: the centerline is cached
+            as one that cannot be constructed
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT coordinates, offsets, failed FROM centerlines "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._connection.execute(
+                "UPDATE centerlines SET accessed = ? WHERE key = ?",
+                (self._tick(), key),
+            )
+
+        coordinates, offsets, failed = row
+        if failed:
+            raise TooFewRidgesError
+        return CenterlineResult(
+            frombuffer(coordinates, dtype=float64).reshape(-1, 2),
+            frombuffer(offsets, dtype=int64),
+        )
+
+    def set(self, key, result):
+        """Cache the centerline, without its properties.
+
+        :param key: centerline's key
+        :type key: str
+        :param result: centerline
+        :type result: :py:class:`centerline.geometry.CenterlineResult`
+        """
+        coordinates = result.coordinates.astype(float64).tobytes()
+        offsets = result.offsets.astype(int64).tobytes()
+        size = len(coordinates) + len(offsets)
+        self._insert(key, coordinates, offsets, size)
+
+    def set_failed(self, key):
+        """Cache that the centerline cannot be constructed, so that
+        :py:meth:`get` raises the
+        :py:class:`centerline.exceptions.TooFewRidgesError` instead.
+
+        :param key: centerline's key
+        :type key: str
+        """
+        # The entry's size is that of its key, so that the failures are
+        # evicted as well.
+        self._insert(key, b"", b"", len(key), failed=True)
+
+    def commit(self):
+        """Commit the cached centerlines and the access times."""
+        with self._lock:
+            self._connection.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        """Save the access times and close the database."""
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
+
+    def _insert(self, key, coordinates, offsets, size, failed=False):
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            previous = self._connection.execute(
+                "SELECT size FROM centerlines WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO centerlines "
+                "(key, coordinates, offsets, size, accessed, failed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    sqlite3.Binary(coordinates),
+                    sqlite3.Binary(offsets),
+                    size,
+                    self._tick(),
+                    int(failed),
+                ),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            if self._size > self.max_size:
+                self._evict()
+
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_interval:
+                self._connection.commit()
+                self._uncommitted = 0
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def _evict(self):
+        evicted_keys = []
+        rows = self._connection.execute(
+            "SELECT key, size FROM centerlines ORDER BY accessed"
+        )
+        for key, size in rows:
+            if self._size <= self.max_size:
+                break
+            evicted_keys.append((key,))
+            self._size -= size
+        rows.close()
+
+        self._connection.executemany(
+            "DELETE FROM centerlines WHERE key = ?", evicted_keys
+        )
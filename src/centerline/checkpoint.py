@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import os
+
+from .exceptions import InvalidCheckpoint
+
+
+# Extension of the checkpoint, which is stored next to the destination
+# file.
+CHECKPOINT_EXTENSION = ".checkpoint"
+# Drivers whose files keep the written batches if the process dies, and
+# can be appended to afterwards.
+CHECKPOINT_DRIVERS = ("ESRI Shapefile", "GPKG", "SQLite")
+
+_replace = getattr(os, "replace", os.rename)
+
+
+def get_checkpoint_path(dst):
+    """Get the path to the checkpoint of the ``dst`` file.
+
+    :param dst: path to the destination file
+    :type dst: str
+    :rtype: str
+    """
+    return dst + CHECKPOINT_EXTENSION
+
+
+class Checkpoint(object):
+    """Progress of a conversion, which is saved whenever a batch of the
+    centerlines is written, so that the conversion can be resumed.
+
+    The ``position`` is the number of the input features whose
+    centerlines were written, or skipped because of their errors, and
+    the ``records`` is the number of the centerlines in the destination
+    file. The progress is saved before a batch is written and once it
+    is written, so that a batch written by a process that died before
+    saving the progress is not written again.
+
+    :param path: path to the checkpoint's JSON file
+    :type path: str
+    :param arguments: arguments of the conversion, which must be the
+        same when it is resumed
+    :type arguments: dict
+    :param position: number of the processed input features, defaults
+        to 0
+    :type position: int, optional
+    :param records: number of the written centerlines, defaults to 0
+    :type records: int, optional
+    """
+
+    def __init__(self, path, arguments, position=0, records=0):
+        self.path = path
+        self.arguments = arguments
+        self.position = position
+        self.records = records
+        self._pending = None
+
+    @classmethod
+    def load(cls, path, arguments, records):
+        """Load the checkpoint of a conversion that is resumed.
+
+        :param path: path to the checkpoint's JSON file
+        :type path: str
+        :param arguments: arguments of the resumed conversion
+        :type arguments: dict
+        :param records: number of the centerlines in the destination
+            file
+        :type records: int
+        :raises exceptions.InvalidCheckpoint: checkpoint is missing, or
+            does not match the ``arguments`` or the ``records``
+        :rtype: :py:class:`Checkpoint`
+        """
+        try:
+            with open(path) as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except (IOError, OSError, ValueError) as error:
+            raise InvalidCheckpoint(
+                "The checkpoint cannot be read: {}".format(error)
+            )
+
+        if state["arguments"] != _normalize(arguments):
+            raise InvalidCheckpoint(
+                "The conversion was started with other arguments."
+            )
+
+        # The pending batch was written if the destination file has its
+        # centerlines.
+        for progress in (state, state.get("pending")):
+            if progress is not None and progress["records"] == records:
+                return cls(path, arguments, progress["position"], records)
+        raise InvalidCheckpoint(
+            "The destination file has {} centerlines, whereas the "
+            "checkpoint expects {}.".format(records, state["records"])
+        )
+
+    def begin(self, position, records):
+        """Save the progress before a batch of the centerlines is
+        written.
+
+        :param position: number of the processed input features once
+            the batch is written
+        :type position: int
+        :param records: number of the centerlines once the batch is
+            written
+        :type records: int
+        """
+        self._pending = {"position": position, "records": records}
+        self._save(self._pending)
+
+    def commit(self):
+        """Save the progress once the batch is written."""
+        self.position = self._pending["position"]
+        self.records = self._pending["records"]
+        self._save()
+
+    def remove(self):
+        """Remove the checkpoint once the conversion is complete."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _save(self, pending=None):
+        state = {
+            "arguments": _normalize(self.arguments),
+            "position": self.position,
+            "records": self.records,
+            "pending": pending,
+        }
+        # The checkpoint is replaced at once, so that it is complete
+        # even if the process dies while writing it.
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as temporary:
+            json.dump(state, temporary, sort_keys=True)
+            temporary.flush()
+            os.fsync(temporary.fileno())
+        _replace(temporary_path, self.path)
+
+
+def _normalize(arguments):
+    # The tuples of the arguments are loaded from JSON as lists.
+    return json.loads(json.dumps(arguments, sort_keys=True))
@@ -2,25 +2,84 @@
 
 from __future__ import unicode_literals
 
+import functools
+import itertools
+import json
 import logging
 import os
 
 import click
-import fiona
 
-from osgeo import gdal, ogr
-from shapely.geometry import mapping, shape
+from .arrow import get_arrow_format, write_arrow_centerlines
+from .cache import DEFAULT_CACHE_SIZE, CenterlineCache
+from .checkpoint import CHECKPOINT_DRIVERS, Checkpoint, get_checkpoint_path
+from .exceptions import InvalidCheckpoint, UnsupportedVectorType
+from .geometry import AUTO_INTERPOLATION_DISTANCE, ENGINES, VORONOI_ENGINE
+from .incremental import PreviousOutput, iter_incremental_centerlines
+from .processing import iter_centerlines
+from .sharding import get_spatial_shard_ids
+from .stats import CenterlineStats
 
-from .exceptions import (
-    InvalidInputTypeError,
-    TooFewRidgesError,
-    UnsupportedVectorType,
-)
-from .geometry import Centerline
 
+MEBIBYTE = 1024 * 1024
+# Number of the centerlines written to the destination file at once, in
+# a single transaction of the drivers that support them.
+DEFAULT_WRITE_BATCH_SIZE = 10000
+# The features are sharded by their FIDs, or by their locations.
+FID_SHARDING = "fid"
+SPATIAL_SHARDING = "space"
+
+# Names of the OGR drivers by the file extensions, which are read from
+# the drivers' metadata when the first driver is looked up. Fiona and
+# GDAL are only imported when they are used, so that the command line
+# options can be parsed quickly.
+_ogr_driver_names = None
+
+
+class InterpolationDistance(click.ParamType):
+    """Interpolation distance, which is either a number or ``auto``."""
+
+    name = "float|{}".format(AUTO_INTERPOLATION_DISTANCE)
+
+    def convert(self, value, param, ctx):
+        if value == AUTO_INTERPOLATION_DISTANCE:
+            return value
 
-# Enable GDAL/OGR exceptions
-gdal.UseExceptions()
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            self.fail(
+                "{!r} is neither a number nor {!r}".format(
+                    value, AUTO_INTERPOLATION_DISTANCE
+                ),
+                param,
+                ctx,
+            )
+
+
+class Shard(click.ParamType):
+    """Shard ``i/N``, the ``i``-th of ``N`` shards, which is converted to
+    a zero-based index and the number of the shards."""
+
+    name = "i/N"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, tuple):
+            return value
+
+        try:
+            number, count = [int(part) for part in value.split("/")]
+        except (AttributeError, ValueError):
+            self.fail("{!r} is not of the form i/N".format(value), param, ctx)
+        if not 1 <= number <= count:
+            self.fail(
+                "{!r} must be between 1/{} and {}/{}".format(
+                    value, count, count, count
+                ),
+                param,
+                ctx,
+            )
+        return number - 1, count
 
 
 @click.command()
@@ -30,12 +89,211 @@ gdal.UseExceptions()
     "--interpolation-distance",
     default=0.5,
     show_default=True,
+    type=InterpolationDistance(),
     help=(
         "Densify the input geometry's border by placing additional "
-        "points at this distance"
+        "points at this distance, or find the coarsest suitable "
+        "distance for each geometry with 'auto'"
+    ),
+)
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of processes used to construct the centerlines",
+)
+@click.option(
+    "--unordered",
+    is_flag=True,
+    default=False,
+    help=(
+        "Write the centerlines as soon as they are constructed instead "
+        "of in the order of the input geometries"
     ),
 )
-def create_centerlines(src, dst, interpolation_distance=0.5):
+@click.option(
+    "--write-batch-size",
+    default=DEFAULT_WRITE_BATCH_SIZE,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help=(
+        "Number of the centerlines buffered and written to the DST file "
+        "at once"
+    ),
+)
+@click.option(
+    "--min-branch-length",
+    type=click.FloatRange(min=0),
+    help=(
+        "Remove the centerlines' branches that are shorter than this "
+        "length, i.e. the spurs toward the bumps of the border"
+    ),
+)
+@click.option(
+    "--simplify-tolerance",
+    type=click.FloatRange(min=0),
+    help=(
+        "Simplify the centerlines' lines with this tolerance, keeping "
+        "their ends and junctions in place"
+    ),
+)
+@click.option(
+    "--engine",
+    default=VORONOI_ENGINE,
+    show_default=True,
+    type=click.Choice(ENGINES),
+    help=(
+        "Construct the centerlines from the Voronoi diagram of the "
+        "densified border, or from the chordal axis of a Delaunay "
+        "triangulation, which ignores the --interpolation-distance"
+    ),
+)
+@click.option(
+    "--bbox",
+    type=(float, float, float, float),
+    metavar="MINX MINY MAXX MAXY",
+    help=(
+        "Only convert the features that intersect this bounding box in "
+        "the SRC file's coordinates"
+    ),
+)
+@click.option(
+    "--mask",
+    type=click.Path(exists=True),
+    help=(
+        "Only convert the features that intersect the geometries of "
+        "this file, which has the same CRS as the SRC file"
+    ),
+)
+@click.option(
+    "--where",
+    help=(
+        "Only convert the features that match this SQL WHERE clause, "
+        "e.g. \"class = 'river'\", which requires Fiona 1.9"
+    ),
+)
+@click.option(
+    "--fid",
+    "fids",
+    multiple=True,
+    type=int,
+    help="Only convert the feature with this FID, which can be repeated",
+)
+@click.option(
+    "--shard",
+    type=Shard(),
+    help=(
+        "Only convert the i-th of N deterministic slices of the "
+        "features, e.g. 2/4, so that the slices can be converted on "
+        "separate machines and merged with merge_centerlines"
+    ),
+)
+@click.option(
+    "--shard-by",
+    default=FID_SHARDING,
+    show_default=True,
+    type=click.Choice([FID_SHARDING, SPATIAL_SHARDING]),
+    help=(
+        "Slice the features by their FIDs, or into compact regions with "
+        "equal numbers of the features"
+    ),
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help=(
+        "Continue an interrupted run from its checkpoint, appending to "
+        "the DST file"
+    ),
+)
+@click.option(
+    "--cache",
+    type=click.Path(dir_okay=False),
+    help=(
+        "Reuse the centerlines constructed by the previous runs, which "
+        "are stored in this SQLite database"
+    ),
+)
+@click.option(
+    "--cache-size",
+    default=DEFAULT_CACHE_SIZE // MEBIBYTE,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Maximum size of the cache [MiB]",
+)
+@click.option(
+    "--previous-src",
+    type=click.Path(exists=True),
+    help=(
+        "Input file of a previous run, whose unchanged features' "
+        "centerlines are copied from the --previous-dst file"
+    ),
+)
+@click.option(
+    "--previous-dst",
+    type=click.Path(exists=True),
+    help="Output file of the previous run of the --previous-src file",
+)
+@click.option(
+    "--fid-field",
+    help=(
+        "Write the FIDs of the input features to this attribute of "
+        "their centerlines, by which the next runs find them in the "
+        "--previous-dst file"
+    ),
+)
+@click.option(
+    "--stats",
+    type=click.Path(dir_okay=False, writable=True),
+    help=(
+        "Write the counts and the durations of the construction's "
+        "stages to this JSON file"
+    ),
+)
+@click.option(
+    "--stats-slowest",
+    default=10,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="Number of the slowest features listed in the --stats file",
+)
+@click.option(
+    "--trace-memory",
+    is_flag=True,
+    default=False,
+    help=(
+        "Add the peak memory allocations of the stages to the --stats "
+        "file, which slows the construction down"
+    ),
+)
+def create_centerlines(
+    src,
+    dst,
+    interpolation_distance=0.5,
+    workers=1,
+    unordered=False,
+    write_batch_size=DEFAULT_WRITE_BATCH_SIZE,
+    min_branch_length=None,
+    simplify_tolerance=None,
+    engine=VORONOI_ENGINE,
+    bbox=None,
+    mask=None,
+    where=None,
+    fids=(),
+    shard=None,
+    shard_by=FID_SHARDING,
+    resume=False,
+    cache=None,
+    cache_size=DEFAULT_CACHE_SIZE // MEBIBYTE,
+    previous_src=None,
+    previous_dst=None,
+    fid_field=None,
+    stats=None,
+    stats_slowest=10,
+    trace_memory=False,
+):
     """Convert the geometries from the ``src`` file to centerlines in
     the ``dst`` file.
 
@@ -49,7 +307,85 @@ def create_centerlines(src, dst, interpolation_distance=0.5):
     If the ``interpolation_distance`` factor does not suit the polygon's
     geometry, the ``TooFewRidgesError`` error is logged as a warning.
     You should try readjusting the ``interpolation_distance`` factor and
-    rerun the command.
+    rerun the command, or set it to ``auto`` in the first place, which
+    searches for a suitable distance for each polygon separately.
+
+    Use the ``workers`` parameter to construct the centerlines in a pool
+    of processes. The centerlines are written in the order of the input
+    geometries, unless the ``unordered`` flag is set, in which case
+    they are written as soon as they are constructed.
+
+    The centerlines are buffered and written in batches of the
+    ``write_batch_size``, which is much faster than writing them one by
+    one with the transactional drivers, e.g. GeoPackage.
+
+    If both of the files are GeoParquet (``.parquet``) or Arrow IPC
+    (``.arrow``, ``.feather``) files, they are read and written with
+    PyArrow instead of OGR: the WKB geometries are read in record
+    batches of the ``write_batch_size`` rows, and the other columns are
+    copied as they are.
+
+    Use the ``min_branch_length`` parameter to remove the short spurs
+    that the bumps of the polygon's border produce, and the
+    ``simplify_tolerance`` parameter to reduce the number of the
+    centerlines' vertices. Neither moves the junctions of the
+    centerlines.
+
+    Set the ``engine`` parameter to ``delaunay`` to construct the
+    centerlines from the chordal axis of a Delaunay triangulation of
+    the border's vertices, which only adds points where the polygon is
+    narrow, instead of the Voronoi diagram of the densified border.
+    It is much faster for long polygons with smooth borders, and it
+    ignores the ``interpolation_distance``.
+
+    Use the ``bbox``, the ``mask``, the ``where`` and the ``fids``
+    parameters to only convert the selected features. The filters are
+    passed on to OGR, which uses the layer's spatial index where one
+    exists, so the other features are never read. The ``mask``
+    geometries must be in the same CRS as the ``src`` file. The
+    ``where`` clause requires Fiona 1.9, whereas with the older
+    versions the ``fids`` are selected as the features are read.
+
+    Use the ``shard`` parameter to only convert the ``i``-th of ``N``
+    slices of the selected features, which are the same on every
+    machine, and combine the partial outputs with ``merge_centerlines``.
+    With the ``shard_by`` parameter set to ``fid``, the features are
+    sliced by the remainders of their FIDs divided by ``N``, which OGR
+    evaluates before the features are read. With ``space``, every
+    slice is a compact region with the same number of the features,
+    but all of the features' bounding boxes have to be read first.
+
+    When the centerlines are written in the order of the input
+    geometries to a GeoPackage, a SpatiaLite or a Shapefile, the
+    progress is saved to the ``dst`` file's ``.checkpoint`` file after
+    every batch, and the file is removed once the run is complete. Use
+    the ``resume`` flag and the same arguments to continue an
+    interrupted run, without converting any of the features again or
+    skipping any of them.
+
+    Use the ``cache`` parameter to store the centerlines in an SQLite
+    database, so that the following runs only construct the centerlines
+    of the new and the modified geometries. The least recently used
+    centerlines are evicted from the cache once it exceeds the
+    ``cache_size``.
+
+    Use the ``previous_src`` and the ``previous_dst`` parameters to
+    only construct the centerlines of the features that were added or
+    modified since the previous run, which was made with the same
+    options. The features are matched by their FIDs, and the unchanged
+    features' centerlines are copied from the ``previous_dst`` file.
+    The previous centerlines are found by the features' attributes,
+    unless the previous run wrote the FIDs to the ``fid_field``, so the
+    features with the same attributes are only reused with it. The
+    number of the unchanged features whose centerlines were not found
+    is logged as a warning.
+
+    Use the ``stats`` parameter to write the statistics of the
+    construction's stages to a JSON file: the total counts of the
+    points and the ridges, the total durations of the stages and the
+    ``stats_slowest`` slowest features by their FIDs. If the
+    ``trace_memory`` flag is set, the stages' peak memory allocations
+    are added as well.
 
     :param src: path to the file containing input geometries
     :type src: str
@@ -58,51 +394,579 @@ def create_centerlines(src, dst, interpolation_distance=0.5):
     :param interpolation_distance: densify the input geometry's
         border by placing additional points at this distance, defaults
         to 0.5 [meter].
-    :type interpolation_distance: float, optional
+    :type interpolation_distance: float or str, optional
+    :param workers: number of processes used to construct the
+        centerlines, defaults to 1
+    :type workers: int, optional
+    :param unordered: write the centerlines in the order they are
+        constructed in, defaults to False
+    :type unordered: bool, optional
+    :param write_batch_size: number of the centerlines written at once,
+        defaults to 10000
+    :type write_batch_size: int, optional
+    :param min_branch_length: minimum length of the centerlines'
+        branches, defaults to None
+    :type min_branch_length: float, optional
+    :param simplify_tolerance: tolerance of the centerlines'
+        simplification, defaults to None
+    :type simplify_tolerance: float, optional
+    :param engine: construct the centerlines from the Voronoi diagram
+        (``voronoi``) or a Delaunay triangulation (``delaunay``),
+        defaults to ``voronoi``
+    :type engine: str, optional
+    :param bbox: bounding box of the selected features, defaults to
+        None
+    :type bbox: tuple, optional
+    :param mask: path to the file whose geometries the selected
+        features intersect, defaults to None
+    :type mask: str, optional
+    :param where: SQL WHERE clause of the selected features, defaults
+        to None
+    :type where: str, optional
+    :param fids: FIDs of the selected features, defaults to ()
+    :type fids: tuple, optional
+    :param shard: zero-based index and number of the shards, defaults
+        to None
+    :type shard: tuple, optional
+    :param shard_by: slice the features by their FIDs (``fid``) or
+        their locations (``space``), defaults to ``fid``
+    :type shard_by: str, optional
+    :param resume: continue an interrupted run from its checkpoint,
+        defaults to False
+    :type resume: bool, optional
+    :param cache: path to the cache database, defaults to None
+    :type cache: str, optional
+    :param cache_size: maximum size of the cache, defaults to 1024
+        [MiB]
+    :type cache_size: int, optional
+    :param previous_src: path to the input file of the previous run,
+        defaults to None
+    :type previous_src: str, optional
+    :param previous_dst: path to the output file of the previous run,
+        defaults to None
+    :type previous_dst: str, optional
+    :param fid_field: attribute of the centerlines that holds the FIDs
+        of their input features, defaults to None
+    :type fid_field: str, optional
+    :param stats: path to the statistics' JSON file, defaults to None
+    :type stats: str, optional
+    :param stats_slowest: number of the slowest features listed in the
+        statistics, defaults to 10
+    :type stats_slowest: int, optional
+    :param trace_memory: trace the peak memory allocations of the
+        stages, defaults to False
+    :type trace_memory: bool, optional
     :return: ``dst`` file is generated
     :rtype: None
     """
 
+    if (previous_src is None) != (previous_dst is None):
+        raise click.UsageError(
+            "--previous-src and --previous-dst must be used together"
+        )
+    if previous_dst is not None and _is_same_path(previous_dst, dst):
+        raise click.UsageError("--previous-dst must differ from the DST")
+    if bbox is not None and mask is not None:
+        raise click.UsageError("--bbox and --mask cannot be used together")
+    filters = {"bbox": bbox, "mask": mask, "where": where, "fids": fids}
+    spatial_shard = None
+    if shard is not None and shard_by == SPATIAL_SHARDING:
+        spatial_shard = shard
+    elif shard is not None:
+        filters["fid_shard"] = shard
+    if spatial_shard is not None and previous_src is not None:
+        raise click.UsageError(
+            "--previous-src and --previous-dst are not supported with "
+            "--shard-by {}".format(SPATIAL_SHARDING)
+        )
+    columnar = bool(get_arrow_format(src) and get_arrow_format(dst))
+    if columnar and previous_src is not None:
+        raise click.UsageError(
+            "--previous-src and --previous-dst are not supported between "
+            "the GeoParquet and the Arrow IPC files"
+        )
+    if columnar and fid_field is not None:
+        raise click.UsageError(
+            "--fid-field is not supported between the GeoParquet and the "
+            "Arrow IPC files"
+        )
+    if columnar and (any(filters.values()) or shard is not None):
+        raise click.UsageError(
+            "--bbox, --mask, --where, --fid and --shard are not supported "
+            "between the GeoParquet and the Arrow IPC files"
+        )
+    if resume and (columnar or unordered):
+        raise click.UsageError(
+            "--resume is not supported with --unordered, or between the "
+            "GeoParquet and the Arrow IPC files"
+        )
+    if resume and not os.path.exists(dst):
+        raise click.UsageError("--resume requires an existing DST")
+
+    centerline_cache = None
+    if cache is not None:
+        centerline_cache = CenterlineCache(cache, cache_size * MEBIBYTE)
+
+    centerline_stats = None
+    if stats is not None:
+        centerline_stats = CenterlineStats(trace_memory, stats_slowest)
+
+    options = {
+        "workers": workers,
+        "ordered": not unordered,
+        "min_branch_length": min_branch_length,
+        "simplify_tolerance": simplify_tolerance,
+        "engine": engine,
+        "cache": centerline_cache,
+        "stats": centerline_stats,
+    }
+    try:
+        if columnar:
+            _write_arrow_centerlines(
+                src,
+                dst,
+                interpolation_distance,
+                batch_size=write_batch_size,
+                **options
+            )
+        else:
+            _write_centerlines(
+                src,
+                dst,
+                interpolation_distance,
+                previous_src=previous_src,
+                previous_dst=previous_dst,
+                fid_field=fid_field,
+                write_batch_size=write_batch_size,
+                filters=filters,
+                spatial_shard=spatial_shard,
+                resume=resume,
+                arguments={
+                    "src": os.path.abspath(src),
+                    "interpolation_distance": interpolation_distance,
+                    "min_branch_length": min_branch_length,
+                    "simplify_tolerance": simplify_tolerance,
+                    "engine": engine,
+                    "filters": filters,
+                    "spatial_shard": spatial_shard,
+                    "previous_src": previous_src,
+                    "previous_dst": previous_dst,
+                    "fid_field": fid_field,
+                },
+                **options
+            )
+    except InvalidCheckpoint as error:
+        raise click.ClickException(str(error))
+    finally:
+        if centerline_cache is not None:
+            centerline_cache.close()
+            click.echo(
+                "Cache: {} hits, {} misses".format(
+                    centerline_cache.hits, centerline_cache.misses
+                ),
+                err=True,
+            )
+
+    if centerline_stats is not None:
+        with open(stats, "w") as stats_file:
+            json.dump(centerline_stats.to_dict(), stats_file, indent=2)
+
+    return None
+
+
+def _write_arrow_centerlines(*args, **kwargs):
+    try:
+        write_arrow_centerlines(*args, **kwargs)
+    except ImportError as error:
+        raise click.ClickException(str(error))
+
+
+def _write_centerlines(
+    src,
+    dst,
+    interpolation_distance,
+    previous_src=None,
+    previous_dst=None,
+    fid_field=None,
+    write_batch_size=DEFAULT_WRITE_BATCH_SIZE,
+    filters=None,
+    spatial_shard=None,
+    resume=False,
+    arguments=None,
+    **options
+):
+    import fiona
+
+    filter_options = _get_filter_options(**(filters or {}))
+    driver_name = get_ogr_driver(filepath=dst).GetName()
+    # The centerlines written in any order cannot be resumed from a
+    # single position.
+    checkpointed = (
+        options.get("ordered", True) and driver_name in CHECKPOINT_DRIVERS
+    )
+    if resume and not checkpointed:
+        raise click.UsageError(
+            "--resume is only supported with the {} drivers".format(
+                ", ".join(CHECKPOINT_DRIVERS)
+            )
+        )
+
+    checkpoint = None
+    previous_output = None
     with fiona.Env():
         with fiona.open(src, mode="r") as source_file:
+            source_features = _select_features(
+                source_file, filter_options, spatial_shard
+            )
             schema = source_file.schema.copy()
             schema.update({"geometry": "MultiLineString"})
-            driver = get_ogr_driver(filepath=dst)
+            if fid_field is not None:
+                if fid_field in schema["properties"]:
+                    raise click.UsageError(
+                        "--fid-field {} is an attribute of the SRC".format(
+                            fid_field
+                        )
+                    )
+                schema["properties"] = dict(schema["properties"])
+                schema["properties"][fid_field] = "int"
+                source_features = _add_fid_field(source_features, fid_field)
             with fiona.open(
                 dst,
-                mode="w",
-                driver=driver.GetName(),
+                mode="a" if resume else "w",
+                driver=driver_name,
                 schema=schema,
                 crs=source_file.crs,
                 encoding=source_file.encoding,
             ) as destination_file:
-                for record in source_file:
-                    geom = record.get("geometry")
-                    input_geom = shape(geom)
-
-                    attributes = record.get("properties")
-                    try:
-                        centerline_obj = Centerline(
-                            input_geom, interpolation_distance, **attributes
-                        )
-                    except (InvalidInputTypeError, TooFewRidgesError) as error:
-                        logging.warning(error)
-                        continue
+                checkpoint_path = get_checkpoint_path(dst)
+                if resume:
+                    checkpoint = Checkpoint.load(
+                        checkpoint_path, arguments, len(destination_file)
+                    )
+                    # The features are read again, but only those after
+                    # the checkpoint are converted.
+                    source_features = itertools.islice(
+                        source_features, checkpoint.position, None
+                    )
+                elif checkpointed:
+                    checkpoint = Checkpoint(checkpoint_path, arguments)
+
+                if previous_src is None:
+                    centerline_features = iter_centerlines(
+                        source_features, interpolation_distance, **options
+                    )
+                    _write_centerline_features(
+                        destination_file,
+                        centerline_features,
+                        write_batch_size,
+                        checkpoint,
+                    )
+                else:
+                    previous_output = _write_incremental_centerlines(
+                        destination_file,
+                        source_features,
+                        previous_src,
+                        previous_dst,
+                        filter_options,
+                        write_batch_size,
+                        checkpoint,
+                        fid_field,
+                        interpolation_distance=interpolation_distance,
+                        **options
+                    )
+
+    if checkpoint is not None:
+        checkpoint.remove()
+    if previous_output is None:
+        return
+
+    if previous_output.unmatched:
+        logging.warning(
+            "The previous centerlines of {} unchanged features were not "
+            "found, so they were constructed again.".format(
+                previous_output.unmatched
+            )
+        )
+    click.echo(
+        "Previous output: {} reused, {} recomputed, {} deleted".format(
+            previous_output.reused,
+            previous_output.recomputed,
+            previous_output.deleted,
+        ),
+        err=True,
+    )
+
+
+def _write_incremental_centerlines(
+    destination_file,
+    source_features,
+    previous_src,
+    previous_dst,
+    filter_options,
+    batch_size,
+    checkpoint,
+    fid_field,
+    **options
+):
+    import fiona
+
+    with fiona.open(previous_src, mode="r") as previous_source:
+        with fiona.open(previous_dst, mode="r") as previous_destination:
+            # The previous features outside of the filters are not
+            # counted as deleted.
+            previous_output = PreviousOutput(
+                _filter_features(previous_source, filter_options),
+                previous_destination,
+                fid_field,
+            )
+            centerline_features = iter_incremental_centerlines(
+                source_features, previous_output, **options
+            )
+            _write_centerline_features(
+                destination_file, centerline_features, batch_size, checkpoint
+            )
+    return previous_output
+
+
+def _add_fid_field(features, fid_field):
+    for feature in features:
+        properties = dict(feature["properties"])
+        properties[fid_field] = int(feature["id"])
+        yield {
+            "id": feature["id"],
+            "geometry": feature["geometry"],
+            "properties": properties,
+        }
+
+
+def _get_filter_options(
+    bbox=None, mask=None, where=None, fids=(), fid_shard=None
+):
+    # The options of fiona.Collection.filter. The FIDs are selected by
+    # the attribute filter, which OGR supports for all of the drivers,
+    # unless Fiona is too old to pass it on.
+    filter_options = {}
+    if bbox is not None:
+        filter_options["bbox"] = bbox
+    if mask is not None:
+        filter_options["mask"] = _read_mask(mask)
+
+    if not _supports_attribute_filters():
+        if where:
+            raise click.UsageError("--where requires Fiona 1.9 or later")
+        if fids or fid_shard is not None:
+            filter_options["fid_filter"] = functools.partial(
+                _is_selected_fid, frozenset(fids), fid_shard
+            )
+        return filter_options
+
+    clauses = []
+    if where:
+        clauses.append("({})".format(where))
+    if fids:
+        clauses.append("FID IN ({})".format(", ".join(map(str, fids))))
+    if fid_shard is not None:
+        index, count = fid_shard
+        clauses.append("FID % {} = {}".format(count, index))
+    if clauses:
+        filter_options["where"] = " AND ".join(clauses)
+    return filter_options
+
+
+def _supports_attribute_filters():
+    # Fiona passes the WHERE clauses on to OGR since 1.9, whereas the
+    # older versions ignore them.
+    try:
+        from fiona.errors import AttributeFilterError  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _is_selected_fid(fids, fid_shard, fid):
+    if fids and fid not in fids:
+        return False
+    if fid_shard is not None:
+        index, count = fid_shard
+        return fid % count == index
+    return True
+
+
+def _read_mask(path):
+    import fiona
+
+    from shapely.geometry import mapping, shape
+    from shapely.ops import unary_union
+
+    with fiona.open(path, mode="r") as mask_file:
+        geometries = [
+            shape(record["geometry"])
+            for record in mask_file
+            if record["geometry"] is not None
+        ]
+    return mapping(unary_union(geometries))
+
 
-                    centerline_dict = {
-                        "geometry": mapping(centerline_obj),
-                        "properties": {
-                            k: v
-                            for k, v in centerline_obj.__dict__.items()
-                            if k in attributes.keys()
-                        },
-                    }
+def _filter_features(collection, filter_options):
+    # The features outside of the filters are skipped by OGR, before
+    # they are decoded, except for the FIDs selected in Python.
+    filter_options = dict(filter_options)
+    fid_filter = filter_options.pop("fid_filter", None)
+    if fid_filter is not None:
+        return (
+            feature
+            for feature in _filter_features(collection, filter_options)
+            if fid_filter(int(feature["id"]))
+        )
+    if not filter_options:
+        return collection
+    if "where" not in filter_options:
+        return collection.filter(**filter_options)
 
-                    destination_file.write(centerline_dict)
+    from fiona.errors import AttributeFilterError
+
+    try:
+        return collection.filter(**filter_options)
+    except AttributeFilterError as error:
+        raise click.BadParameter(str(error), param_hint="'--where'")
+
+
+def _select_features(collection, filter_options, spatial_shard=None):
+    features = _filter_features(collection, filter_options)
+    if spatial_shard is None:
+        return features
+
+    # The features are read twice: for their locations, which determine
+    # the shards, and for the centerlines of the shard's features.
+    shard_ids = get_spatial_shard_ids(features, *spatial_shard)
+    return (
+        feature
+        for feature in _filter_features(collection, filter_options)
+        if int(feature["id"]) in shard_ids
+    )
+
+
+def _write_centerline_features(
+    destination_file, centerline_features, batch_size, checkpoint=None
+):
+    start = 0 if checkpoint is None else checkpoint.position
+    indexed_records = _iter_centerline_records(centerline_features)
+    while True:
+        batch = list(itertools.islice(indexed_records, batch_size))
+        if not batch:
+            return
+
+        records = [record for _, record in batch]
+        if checkpoint is None:
+            destination_file.writerecords(records)
+            continue
+
+        # The features are processed up to the batch's last centerline,
+        # including those that failed before it.
+        checkpoint.begin(
+            start + batch[-1][0] + 1, checkpoint.records + len(records)
+        )
+        destination_file.writerecords(records)
+        destination_file.flush()
+        checkpoint.commit()
+
+
+def _write_records(destination_file, records, batch_size):
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+        destination_file.writerecords(batch)
+
+
+def _iter_centerline_records(centerline_features):
+    for centerline_feature in centerline_features:
+        if centerline_feature.error is not None:
+            logging.warning(centerline_feature.error)
+            continue
+
+        yield centerline_feature.index, {
+            "geometry": centerline_feature.geometry,
+            "properties": centerline_feature.properties,
+        }
+
+
+@click.command()
+@click.argument(
+    "partial_dsts", nargs=-1, required=True, type=click.Path(exists=True)
+)
+@click.argument("dst", nargs=1, type=click.Path(exists=False))
+@click.option(
+    "--write-batch-size",
+    default=DEFAULT_WRITE_BATCH_SIZE,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help=(
+        "Number of the centerlines buffered and written to the DST file "
+        "at once"
+    ),
+)
+def merge_centerlines(
+    partial_dsts, dst, write_batch_size=DEFAULT_WRITE_BATCH_SIZE
+):
+    """Merge the partial outputs of the ``create_centerlines`` shards
+    into the ``dst`` file.
+
+    The centerlines are copied in the order of the ``partial_dsts``,
+    which must have the same schema and CRS. The ``dst`` file gets
+    them as well.
+
+    :param partial_dsts: paths to the partial outputs
+    :type partial_dsts: tuple of str
+    :param dst: path to the file that will contain the centerlines
+    :type dst: str
+    :param write_batch_size: number of the centerlines written at once,
+        defaults to 10000
+    :type write_batch_size: int, optional
+    :return: ``dst`` file is generated
+    :rtype: None
+    """
+    if any(_is_same_path(path, dst) for path in partial_dsts):
+        raise click.UsageError("The DST must differ from the partial outputs")
+
+    import fiona
+
+    with fiona.Env():
+        with fiona.open(partial_dsts[0], mode="r") as first_file:
+            schema = first_file.schema
+            crs = first_file.crs
+            encoding = first_file.encoding
+        driver = get_ogr_driver(filepath=dst)
+        with fiona.open(
+            dst,
+            mode="w",
+            driver=driver.GetName(),
+            schema=schema,
+            crs=crs,
+            encoding=encoding,
+        ) as destination_file:
+            for path in partial_dsts:
+                with fiona.open(path, mode="r") as partial_file:
+                    if (
+                        partial_file.schema != schema
+                        or partial_file.crs != crs
+                    ):
+                        raise click.ClickException(
+                            "{} does not have the schema and the CRS of "
+                            "{}".format(path, partial_dsts[0])
+                        )
+                    _write_records(
+                        destination_file, partial_file, write_batch_size
+                    )
 
     return None
 
 
+def _is_same_path(path, other_path):
+    return os.path.abspath(path) == os.path.abspath(other_path)
+
+
 def get_ogr_driver(filepath):
     """Get the OGR driver based on the file's extension.
 
@@ -115,13 +979,43 @@ def get_ogr_driver(filepath):
     filename, file_extension = os.path.splitext(filepath)
     extension = file_extension[1:]
 
-    ogr_driver_count = ogr.GetDriverCount()
-    for idx in range(ogr_driver_count):
+    driver_name = get_ogr_driver_names().get(extension)
+    if driver_name is None:
+        raise UnsupportedVectorType
+
+    from osgeo import ogr
+
+    return ogr.GetDriverByName(str(driver_name))
+
+
+def get_ogr_driver_names():
+    """Get the names of the OGR drivers by the file extensions they
+    support.
+
+    The drivers' metadata is only read on the first call. An extension
+    is mapped to the first driver that supports it.
+
+    :return: driver names by the extensions
+    :rtype: dict
+    """
+    global _ogr_driver_names
+    if _ogr_driver_names is not None:
+        return _ogr_driver_names
+
+    from osgeo import gdal, ogr
+
+    # Enable GDAL/OGR exceptions
+    gdal.UseExceptions()
+
+    driver_names = {}
+    for idx in range(ogr.GetDriverCount()):
         driver = ogr.GetDriver(idx)
         driver_extension = driver.GetMetadataItem(str("DMD_EXTENSION")) or ""
         driver_extensions = driver.GetMetadataItem(str("DMD_EXTENSIONS")) or ""
 
-        if extension == driver_extension or extension in driver_extensions:
-            return driver
+        for extension in [driver_extension] + driver_extensions.split():
+            if extension:
+                driver_names.setdefault(extension, driver.GetName())
 
-    raise UnsupportedVectorType
+    _ogr_driver_names = driver_names
+    return _ogr_driver_names
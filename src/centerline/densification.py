@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from math import pi
+
+from numpy import (
+    absolute,
+    arange,
+    arctan2,
+    ceil,
+    clip,
+    concatenate,
+    cumsum,
+    diff,
+    empty,
+    hypot,
+    inf,
+    interp,
+    intp,
+    linspace,
+    maximum,
+    minimum,
+    repeat,
+    roll,
+    searchsorted,
+    split,
+    where,
+)
+
+
+# Number of times the spacing is re-estimated from the previous points.
+ADAPTIVE_ITERATIONS = 3
+# The spacing is at most this fraction of the local width...
+WIDTH_FACTOR = 0.25
+# ...and of the local radius of curvature.
+CURVATURE_FACTOR = 0.25
+# Number of the nearest points searched for the opposite side.
+WIDTH_NEIGHBOURS = 12
+# Points are on opposite sides when the boundary between them is longer
+# than this many times the distance between them (a half circle's ratio).
+OPPOSITE_SIDE_RATIO = pi / 2
+
+
+def densify_adaptively(rings, min_distance, max_distance):
+    """Densify the rings with a spacing that follows the local width and
+    curvature of the geometry they enclose.
+
+    The rings are first densified uniformly with the ``max_distance``.
+    Each iteration then estimates the width at every point from the
+    distance to the nearest point on the opposite side of the geometry,
+    and the curvature from the turning angle, and resamples the rings so
+    that narrow and sharply bent parts are densified more than wide and
+    straight ones.
+
+    :param rings: coordinates of the closed rings
+    :type rings: list of :py:class:`numpy.ndarray` of shape (n, 2)
+    :param min_distance: smallest distance between the points
+    :type min_distance: float
+    :param max_distance: largest distance between the points
+    :type max_distance: float
+    :return: densified rings, whose first and last points are the
+        rings' first and last points
+    :rtype: list of :py:class:`numpy.ndarray` of shape (m, 2)
+    """
+    cumulative_lengths = [get_cumulative_lengths(ring) for ring in rings]
+    positions = [
+        _get_uniform_positions(lengths[-1], max_distance)
+        for lengths in cumulative_lengths
+    ]
+
+    for _ in range(ADAPTIVE_ITERATIONS):
+        points = _interpolate_rings(rings, cumulative_lengths, positions)
+        spacings = _get_spacings(points, positions, min_distance, max_distance)
+        positions = [
+            _get_positions_with_spacings(ring_positions, ring_spacings)
+            for ring_positions, ring_spacings in zip(positions, spacings)
+        ]
+
+    return _interpolate_rings(rings, cumulative_lengths, positions)
+
+
+def _get_uniform_positions(length, distance):
+    count = max(int(ceil(length / distance)), 3)
+    return linspace(0.0, length, count + 1)
+
+
+def _interpolate_rings(rings, cumulative_lengths, positions):
+    return [
+        interpolate_along_line(
+            ring, lengths, ring_positions, out=empty((len(ring_positions), 2))
+        )
+        for ring, lengths, ring_positions in zip(
+            rings, cumulative_lengths, positions
+        )
+    ]
+
+
+def _get_spacings(points, positions, min_distance, max_distance):
+    widths = _get_widths(points, positions)
+    ring_ends = cumsum([len(ring_points) for ring_points in points])[:-1]
+    spacings = []
+    for ring_points, ring_widths in zip(points, split(widths, ring_ends)):
+        curvatures = _get_curvatures(ring_points)
+        bent = curvatures > 0
+        ring_spacings = WIDTH_FACTOR * ring_widths
+        ring_spacings[bent] = minimum(
+            ring_spacings[bent], CURVATURE_FACTOR / curvatures[bent]
+        )
+        # The spacing of a point also limits its neighbours' spacings,
+        # so that it does not change abruptly.
+        ring_spacings = minimum(
+            ring_spacings,
+            minimum(roll(ring_spacings, 1), roll(ring_spacings, -1)),
+        )
+        spacings.append(clip(ring_spacings, min_distance, max_distance))
+
+    return spacings
+
+
+def _get_widths(points, positions):
+    """Get the distance from every point to the nearest point on the
+    opposite side of the geometry, i.e. on another ring or on a part of
+    the same ring that is much further away along the ring than in a
+    straight line. If there is no such point among the nearest ones,
+    the distance to the furthest of them is used as a lower bound.
+    """
+    from scipy.spatial import cKDTree
+
+    ring_indices = repeat(arange(len(points)), [len(ring) for ring in points])
+    ring_lengths = [ring_positions[-1] for ring_positions in positions]
+    ring_lengths = repeat(ring_lengths, [len(ring) for ring in points])
+    points = concatenate(points)
+    positions = concatenate(positions)
+
+    neighbour_count = min(WIDTH_NEIGHBOURS, len(points))
+    distances, neighbours = cKDTree(points).query(points, k=neighbour_count)
+    distances = distances.reshape(len(points), -1)
+    neighbours = neighbours.reshape(len(points), -1)
+
+    along_ring = absolute(positions[neighbours] - positions[:, None])
+    along_ring = minimum(along_ring, ring_lengths[:, None] - along_ring)
+    opposite = (ring_indices[neighbours] != ring_indices[:, None]) | (
+        along_ring > OPPOSITE_SIDE_RATIO * distances
+    )
+
+    nearest_opposite = opposite.argmax(axis=1)
+    return where(
+        opposite.any(axis=1),
+        distances[arange(len(points)), nearest_opposite],
+        distances[:, -1],
+    )
+
+
+def _get_curvatures(points):
+    # The first and the last points of a ring coincide, so the turning
+    # angle at them is measured between the last and the first segment.
+    segments = diff(points, axis=0)
+    segment_lengths = hypot(*segments.T)
+    previous_segments = roll(segments, 1, axis=0)
+    previous_lengths = roll(segment_lengths, 1)
+
+    angles = absolute(
+        arctan2(
+            previous_segments[:, 0] * segments[:, 1]
+            - previous_segments[:, 1] * segments[:, 0],
+            (previous_segments * segments).sum(axis=1),
+        )
+    )
+    lengths = (previous_lengths + segment_lengths) / 2
+    curvatures = angles / where(lengths > 0, lengths, inf)
+    return concatenate((curvatures, curvatures[:1]))
+
+
+def _get_positions_with_spacings(positions, spacings):
+    # The number of points placed up to each position is the integral of
+    # the point density (the spacing's reciprocal) along the ring.
+    densities = 1 / spacings
+    counts = concatenate(
+        ([0.0], cumsum(diff(positions) * (densities[1:] + densities[:-1]) / 2))
+    )
+    point_count = max(int(ceil(counts[-1])), 3)
+    return interp(
+        linspace(0.0, counts[-1], point_count + 1), counts, positions
+    )
+
+
+def get_cumulative_lengths(coordinates):
+    """Get the distance of every vertex from the start of the line.
+
+    :param coordinates: vertices of the line
+    :type coordinates: :py:class:`numpy.ndarray` of shape (n, 2)
+    :return: cumulative lengths, starting with 0
+    :rtype: :py:class:`numpy.ndarray` of shape (n,)
+    """
+    segment_lengths = hypot(*diff(coordinates, axis=0).T)
+    cumulative_lengths = empty(len(coordinates))
+    cumulative_lengths[0] = 0.0
+    cumsum(segment_lengths, out=cumulative_lengths[1:])
+    return cumulative_lengths
+
+
+def interpolate_along_line(coordinates, cumulative_lengths, distances, out):
+    """Place points along the line at the given distances from its
+    start, as :py:meth:`shapely.geometry.LineString.interpolate`
+    would, but for all of the distances at once.
+
+    :param coordinates: vertices of the line
+    :type coordinates: :py:class:`numpy.ndarray` of shape (n, 2)
+    :param cumulative_lengths: output of :py:func:`get_cumulative_lengths`
+    :type cumulative_lengths: :py:class:`numpy.ndarray` of shape (n,)
+    :param distances: sorted distances from the start of the line
+    :type distances: :py:class:`numpy.ndarray` of shape (m,)
+    :param out: array the interpolated points are written into
+    :type out: :py:class:`numpy.ndarray` of shape (m, 2)
+    :return: ``out``
+    :rtype: :py:class:`numpy.ndarray` of shape (m, 2)
+    """
+    segments = searchsorted(cumulative_lengths, distances, side="right") - 1
+    clip(segments, 0, len(coordinates) - 2, out=segments)
+
+    segment_starts = cumulative_lengths[segments]
+    segment_lengths = cumulative_lengths[segments + 1] - segment_starts
+    nonzero = segment_lengths > 0
+    ratios = (distances - segment_starts) / where(nonzero, segment_lengths, 1)
+    ratios[~nonzero] = 0.0
+
+    start_points = coordinates[segments]
+    end_points = coordinates[segments + 1]
+    out[:] = start_points + (end_points - start_points) * ratios[:, None]
+    return out
+
+
+def densify_rings_uniformly(coordinates, ring_offsets, distance):
+    """Densify many rings at once by placing points at the ``distance``
+    along each of them, as the centerline builder does ring by ring.
+
+    The rings' coordinates are stored in a single array, in which the
+    ring ``i`` spans the rows from ``ring_offsets[i]`` up to
+    ``ring_offsets[i + 1]``, and so are the densified points.
+
+    :param coordinates: coordinates of the closed rings
+    :type coordinates: :py:class:`numpy.ndarray` of shape (n, 2)
+    :param ring_offsets: index of every ring's first vertex, followed
+        by the number of the vertices
+    :type ring_offsets: :py:class:`numpy.ndarray` of shape (r + 1,)
+    :param distance: distance between the points
+    :type distance: float
+    :return: densified points, whose first and last points of every ring
+        are the ring's first and last vertices, and their offsets
+    :rtype: tuple of :py:class:`numpy.ndarray` of shapes (m, 2) and
+        (r + 1,)
+    """
+    ring_starts = ring_offsets[:-1]
+    ring_ends = ring_offsets[1:] - 1
+    # The segments between the consecutive rings have no length, so the
+    # lengths can be accumulated over all of the rings.
+    segment_lengths = hypot(*diff(coordinates, axis=0).T)
+    segment_lengths[ring_ends[:-1]] = 0.0
+    cumulative_lengths = concatenate(([0.0], cumsum(segment_lengths)))
+    ring_lengths = (
+        cumulative_lengths[ring_ends] - cumulative_lengths[ring_starts]
+    )
+
+    # Only the points closer to the start than the ring's end are placed.
+    counts = (ring_lengths // distance).astype(intp)
+    counts = maximum(counts - (counts * distance >= ring_lengths), 0)
+    point_counts = counts + 2
+    point_offsets = concatenate(([0], cumsum(point_counts)))
+    point_rings = repeat(arange(len(point_counts)), point_counts)
+    positions = (
+        arange(point_offsets[-1]) - point_offsets[point_rings]
+    ) * distance
+
+    ring_bases = cumulative_lengths[ring_starts][point_rings]
+    segments = searchsorted(
+        cumulative_lengths, positions + ring_bases, side="right"
+    )
+    segments = clip(
+        segments - 1, ring_starts[point_rings], ring_ends[point_rings] - 1
+    )
+    segment_starts = cumulative_lengths[segments] - ring_bases
+    lengths = segment_lengths[segments]
+    nonzero = lengths > 0
+    ratios = (positions - segment_starts) / where(nonzero, lengths, 1)
+    ratios[~nonzero] = 0.0
+
+    start_points = coordinates[segments]
+    end_points = coordinates[segments + 1]
+    points = start_points + (end_points - start_points) * ratios[:, None]
+    points[point_offsets[:-1]] = coordinates[ring_starts]
+    points[point_offsets[1:] - 1] = coordinates[ring_ends]
+    return points, point_offsets
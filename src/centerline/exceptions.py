@@ -30,6 +30,27 @@ class TooFewRidgesError(CenterlineError):
     )
 
 
+class RefinementLimitError(CenterlineError):
+
+    default_message = (
+        "The triangulation needs too many points to conform to the "
+        "border."
+    )
+
+
 class UnsupportedVectorType(CenterlineError):
 
     default_message = "No OGR driver was found for the provided file."
+
+
+class UnsupportedGeometryEncoding(CenterlineError):
+
+    default_message = "Only the WKB encoded geometry columns are supported."
+
+
+class InvalidCheckpoint(CenterlineError):
+
+    default_message = (
+        "The checkpoint does not match the destination file or the "
+        "arguments of the run."
+    )
@@ -2,171 +2,1034 @@
 
 from __future__ import unicode_literals
 
-from numpy import array
-from scipy.spatial import Voronoi
+import logging
+
+from numpy import (
+    arange,
+    around,
+    asarray,
+    ceil,
+    clip,
+    column_stack,
+    concatenate,
+    empty,
+    float64,
+    hypot,
+    inf,
+    intp,
+    meshgrid,
+    nonzero,
+    sqrt,
+    unique,
+    where,
+    zeros,
+)
 from shapely.geometry import LineString, MultiLineString, MultiPolygon, Polygon
-from shapely.ops import unary_union
+from shapely.prepared import prep
+from shapely.vectorized import contains
 
 from . import exceptions
+from .densification import (
+    densify_adaptively,
+    get_cumulative_lengths,
+    interpolate_along_line,
+)
+from .graph import RidgeGraph
+from .stats import FeatureStats, measure_stage
+from .triangulation import (
+    get_chordal_axis,
+    get_ring_segments,
+    triangulate_conforming,
+)
 
 
-class Centerline(MultiLineString):
-    """Create a centerline object.
+# SciPy is only imported where it is used, because importing it takes
+# longer than importing the rest of the package.
+
+# Value of the interpolation distance that makes it be searched for.
+AUTO_INTERPOLATION_DISTANCE = "auto"
+# Number of the interpolation distances tried before giving up.
+AUTO_INTERPOLATION_ATTEMPTS = 10
+# Default ratio between the largest and the smallest distance between
+# the adaptively densified points.
+ADAPTIVE_MAX_FACTOR = 10
+# Approximate number of points the overlap between the tiles is
+# estimated on.
+OVERLAP_GRID_SIZE = 100000
+# The vertices of the tiles are snapped to a grid of this fraction of
+# the interpolation distance.
+SNAPPING_GRID_FACTOR = 1e-6
+# The centerline is approximated by the Voronoi diagram of the densified
+# border, or by the chordal axis of a triangulation of its vertices.
+VORONOI_ENGINE = "voronoi"
+DELAUNAY_ENGINE = "delaunay"
+ENGINES = (VORONOI_ENGINE, DELAUNAY_ENGINE)
 
-    The ``attributes`` are copied and set as the centerline's
-    attributes.
+
+class CenterlineBuilder(object):
+    """Construct the centerline of a polygon.
+
+    Unlike :py:class:`Centerline`, the builder does not keep the
+    centerline itself; :py:meth:`build` returns it as a compact
+    :py:class:`CenterlineResult` instead.
 
     :param input_geometry: input geometry
     :type input_geometry: :py:class:`shapely.geometry.Polygon` or
         :py:class:`shapely.geometry.MultiPolygon`
     :param interpolation_distance: densify the input geometry's
         border by placing additional points at this distance,
-        defaults to 0.5 [meter]
-    :type interpolation_distance: float, optional
+        defaults to 0.5 [meter]. If set to ``"auto"``, the distance is
+        derived from the input geometry's mean width and halved until
+        the centerline can be constructed.
+    :type interpolation_distance: float or str, optional
+    :param adaptive: densify the border more where the input geometry
+        is narrow or sharply bent, and less where it is wide and
+        straight, in which case the ``interpolation_distance`` is the
+        smallest distance between the points, defaults to False
+    :type adaptive: bool, optional
+    :param max_interpolation_distance: largest distance between the
+        points of the adaptively densified border, defaults to ten
+        times the ``interpolation_distance``
+    :type max_interpolation_distance: float, optional
+    :param tile_size: construct the centerline in square tiles of this
+        size in order to bound the memory used by the Voronoi diagram,
+        defaults to None (no tiling)
+    :type tile_size: float, optional
+    :param tile_workers: number of processes the tiles are distributed
+        to, defaults to 1
+    :type tile_workers: int, optional
+    :param min_branch_length: remove the branches of the centerline
+        that are shorter than this length, i.e. the spurs toward the
+        bumps of the input geometry's border, defaults to None
+    :type min_branch_length: float, optional
+    :param simplify_tolerance: simplify the centerline's lines with
+        this tolerance, keeping their ends and junctions in place,
+        defaults to None
+    :type simplify_tolerance: float, optional
+    :param cache: reuse the centerlines constructed earlier from the
+        same geometry with the same options, defaults to None
+    :type cache: :py:class:`centerline.cache.CenterlineCache`, optional
+    :param stats: record the counts and the durations of the stages of
+        the construction, defaults to None
+    :type stats: :py:class:`centerline.stats.FeatureStats`, optional
+    :param engine: ``"voronoi"`` to construct the centerline from the
+        Voronoi diagram of the densified border, or ``"delaunay"`` to
+        construct the chordal axis of a conforming Delaunay
+        triangulation of the border's vertices, which ignores the
+        interpolation distance, the adaptive densification and the
+        tiles, unless the triangulation needs too many points, in which
+        case the Voronoi diagram is used, defaults to ``"voronoi"``
+    :type engine: str, optional
+    :param part_workers: number of processes the parts of a
+        :py:class:`shapely.geometry.MultiPolygon` are distributed to,
+        defaults to 1
+    :type part_workers: int, optional
     :raises exceptions.InvalidInputTypeError: input geometry is not
         of type :py:class:`shapely.geometry.Polygon` or
         :py:class:`shapely.geometry.MultiPolygon`
+    :raises ValueError: unknown engine
     """
 
     def __init__(
-        self, input_geometry, interpolation_distance=0.5, **attributes
+        self,
+        input_geometry,
+        interpolation_distance=0.5,
+        adaptive=False,
+        max_interpolation_distance=None,
+        tile_size=None,
+        tile_workers=1,
+        min_branch_length=None,
+        simplify_tolerance=None,
+        cache=None,
+        stats=None,
+        engine=VORONOI_ENGINE,
+        part_workers=1,
     ):
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine: {!r}".format(engine))
+
         self._input_geometry = input_geometry
-        self._interpolation_distance = abs(interpolation_distance)
+        self._adaptive = adaptive
+        self._max_interpolation_distance = max_interpolation_distance
+        self._tile_size = tile_size
+        self._tile_workers = tile_workers
+        self._min_branch_length = min_branch_length
+        self._simplify_tolerance = simplify_tolerance
+        self._cache = cache
+        self._stats = stats
+        self._engine = engine
+        self._part_workers = part_workers
+        self._reuse_densified_borders = False
+        self._previous_borders = None
+
+        self._auto_interpolation = (
+            interpolation_distance == AUTO_INTERPOLATION_DISTANCE
+        )
+        if self._auto_interpolation:
+            self._interpolation_distance = None
+        else:
+            self._interpolation_distance = abs(interpolation_distance)
 
         if not self.input_geometry_is_valid():
             raise exceptions.InvalidInputTypeError
 
         self._min_x, self._min_y = self._get_reduced_coordinates()
-        self.assign_attributes_to_instance(attributes)
 
-        super(Centerline, self).__init__(lines=self._construct_centerline())
+    @classmethod
+    def from_arrays(
+        cls, exterior, holes=None, interpolation_distance=0.5, **options
+    ):
+        """Construct the centerline of a polygon whose rings are given
+        as coordinate arrays.
+
+        The float64 arrays are densified as they are, without being
+        copied, so they can also be read-only, e.g. memory-mapped. The
+        Shapely polygon is only created where one is needed, i.e. to
+        test which ridges lie within it, to derive the ``"auto"``
+        interpolation distance and to compute the cache key.
+
+        The other ``options`` are those of the class, including the
+        attributes of a :py:class:`Centerline`.
+
+        :param exterior: coordinates of the exterior ring
+        :type exterior: :py:class:`numpy.ndarray` of shape (n, 2)
+        :param holes: coordinates of the interior rings, defaults to
+            None
+        :type holes: list of :py:class:`numpy.ndarray` of shape (n, 2),
+            optional
+        :param interpolation_distance: densify the input geometry's
+            border by placing additional points at this distance,
+            defaults to 0.5 [meter], or ``"auto"``
+        :type interpolation_distance: float or str, optional
+        :raises exceptions.InvalidInputTypeError: a ring is not an array
+            of at least three points' coordinates
+        """
+        rings = [exterior] + list(holes or ())
+        return cls(
+            _PolygonArrays([_get_ring_coordinates(ring) for ring in rings]),
+            interpolation_distance,
+            **options
+        )
+
+    def build(self, properties=None):
+        """Construct the centerline.
+
+        :param properties: properties kept along with the centerline,
+            defaults to None
+        :type properties: dict, optional
+        :return: centerline
+        :rtype: :py:class:`CenterlineResult`
+        :raises exceptions.TooFewRidgesError: the centerline cannot be
+            constructed with the interpolation distance
+        """
+        result = self._construct_result()
+        return CenterlineResult(result.coordinates, result.offsets, properties)
 
     def input_geometry_is_valid(self):
-        """Input geometry is of a :py:class:`shapely.geometry.Polygon`
-        or a :py:class:`shapely.geometry.MultiPolygon`.
+        """Input geometry is a non-empty
+        :py:class:`shapely.geometry.Polygon` or
+        :py:class:`shapely.geometry.MultiPolygon`, or it was given as
+        coordinate arrays.
 
         :return: geometry is valid
         :rtype: bool
         """
-        if isinstance(self._input_geometry, Polygon) or isinstance(
-            self._input_geometry, MultiPolygon
-        ):
+        if isinstance(self._input_geometry, _PolygonArrays):
             return True
+        elif isinstance(self._input_geometry, (Polygon, MultiPolygon)):
+            return not self._input_geometry.is_empty
         else:
             return False
 
     def _get_reduced_coordinates(self):
+        if isinstance(self._input_geometry, _PolygonArrays):
+            min_x, min_y = self._input_geometry.min_coordinates
+            return int(min_x), int(min_y)
+
         min_x = int(min(self._input_geometry.envelope.exterior.xy[0]))
         min_y = int(min(self._input_geometry.envelope.exterior.xy[1]))
         return min_x, min_y
 
-    def assign_attributes_to_instance(self, attributes):
-        """Assign the ``attributes`` to the :py:class:`Centerline` object.
+    def get_cache_key(self):
+        """Get the key of the centerline in a
+        :py:class:`centerline.cache.CenterlineCache`.
 
-        :param attributes: polygon's attributes
-        :type attributes: dict
+        The numbers of the ``tile_workers`` and the ``part_workers`` do
+        not affect the centerline, so they are not a part of the key.
+
+        :return: hexadecimal key
+        :rtype: str
         """
-        for key in attributes:
-            setattr(self, key, attributes.get(key))
+        from .cache import get_cache_key
+
+        return get_cache_key(
+            self._get_input_polygon(),
+            interpolation_distance=(
+                AUTO_INTERPOLATION_DISTANCE
+                if self._auto_interpolation
+                else self._interpolation_distance
+            ),
+            adaptive=self._adaptive,
+            max_interpolation_distance=self._max_interpolation_distance,
+            tile_size=self._tile_size,
+            min_branch_length=self._min_branch_length,
+            simplify_tolerance=self._simplify_tolerance,
+            engine=self._engine,
+        )
+
+    def _construct_result(self):
+        if self._cache is None:
+            return CenterlineResult.from_lines(self._construct_lines())
+
+        key = self.get_cache_key()
+        result = self._cache.get(key)
+        if result is None:
+            try:
+                result = CenterlineResult.from_lines(self._construct_lines())
+            except exceptions.TooFewRidgesError:
+                self._cache.set_failed(key)
+                raise
+            self._cache.set(key, result)
+        return result
+
+    def _construct_lines(self):
+        parts = self._get_input_parts()
+        if len(parts) > 1:
+            return self._construct_lines_of_parts(parts)
+        if self._engine == DELAUNAY_ENGINE:
+            try:
+                return self._construct_chordal_axis()
+            except exceptions.RefinementLimitError:
+                # The polygon's sharp corners cannot be triangulated
+                # with a bounded number of the points.
+                logging.warning(
+                    "The Delaunay triangulation needs too many points, "
+                    "the centerline is constructed from the Voronoi "
+                    "diagram instead."
+                )
+                if self._stats is not None:
+                    self._stats.fallbacks += 1
+        if self._auto_interpolation:
+            return self._construct_centerline_with_auto_interpolation()
+        return self._construct_centerline()
+
+    def _get_input_parts(self):
+        if (
+            isinstance(self._input_geometry, _PolygonArrays)
+            and not self._input_geometry.is_multipart
+        ):
+            return ()
+        input_polygon = self._get_input_polygon()
+        if isinstance(input_polygon, MultiPolygon):
+            return list(input_polygon.geoms)
+        return ()
+
+    def _construct_lines_of_parts(self, parts):
+        """Construct the centerline of every part of a multipolygon
+        separately, optionally in a pool of the ``part_workers``.
+
+        The points of the other parts never affect the ridges within a
+        part, but a single diagram of all of the parts would span the
+        space between them with ridges that are only rejected by the
+        ridge filtering. Every part is tested against its own polygon,
+        and its coordinates are reduced by its own minimum. The parts
+        whose centerlines cannot be constructed are left out, unless
+        none of them can be.
+        """
+        from .processing import map_in_pool
+
+        options = {
+            "adaptive": self._adaptive,
+            "max_interpolation_distance": self._max_interpolation_distance,
+            "tile_size": self._tile_size,
+            # The pool's processes cannot start pools of their own.
+            "tile_workers": (
+                self._tile_workers if self._part_workers <= 1 else 1
+            ),
+            "min_branch_length": self._min_branch_length,
+            "simplify_tolerance": self._simplify_tolerance,
+            "engine": self._engine,
+        }
+        interpolation_distance = (
+            AUTO_INTERPOLATION_DISTANCE
+            if self._auto_interpolation
+            else self._interpolation_distance
+        )
+        tasks = (
+            (
+                part,
+                interpolation_distance,
+                options,
+                None
+                if self._stats is None
+                else FeatureStats(trace_memory=self._stats.trace_memory),
+            )
+            for part in parts
+        )
+
+        lines = []
+        for part_lines, part_stats in map_in_pool(
+            _construct_lines_of_part, tasks, workers=self._part_workers
+        ):
+            lines.extend(part_lines)
+            if part_stats is not None:
+                self._stats.add(part_stats)
+
+        if not lines:
+            raise exceptions.TooFewRidgesError
+        return lines
+
+    def _construct_centerline_with_auto_interpolation(self):
+        """Construct the centerline with the coarsest interpolation
+        distance that produces enough ridges.
+
+        The search starts at the input geometry's mean half-width and
+        halves the distance on every attempt. The uniformly densified
+        borders of an attempt are reused by the next one, which only
+        adds the midpoints between them.
+        """
+        self._interpolation_distance = (
+            self._get_initial_interpolation_distance()
+        )
+        self._reuse_densified_borders = True
+        qhull_error = _import_qhull_error()
+        for _ in range(AUTO_INTERPOLATION_ATTEMPTS - 1):
+            try:
+                return self._construct_centerline()
+            except (exceptions.TooFewRidgesError, qhull_error):
+                # Too few points for a Voronoi diagram are no better.
+                self._interpolation_distance /= 2
+
+        return self._construct_centerline()
+
+    def _get_initial_interpolation_distance(self):
+        input_polygon = self._get_input_polygon()
+        return input_polygon.area / input_polygon.length
 
     def _construct_centerline(self):
-        vertices, ridges = self._get_voronoi_vertices_and_ridges()
-        linestrings = []
-        for ridge in ridges:
-            if self._ridge_is_finite(ridge):
-                starting_point = self._create_point_with_restored_coordinates(
-                    x=vertices[ridge[0]][0], y=vertices[ridge[0]][1]
+        with measure_stage(self._stats, "densification"):
+            borders = self._get_densified_borders()
+        with measure_stage(self._stats, "voronoi"):
+            if self._tile_size:
+                vertices, ridges, ridge_sites = (
+                    self._get_tiled_voronoi_vertices_and_ridges(borders)
                 )
-                ending_point = self._create_point_with_restored_coordinates(
-                    x=vertices[ridge[1]][0], y=vertices[ridge[1]][1]
+            else:
+                vertices, ridges, ridge_sites = (
+                    self._get_voronoi_vertices_and_ridges(borders)
                 )
-                linestring = LineString((starting_point, ending_point))
+        with measure_stage(self._stats, "ridge_filtering"):
+            kept_ridges = self._get_ridges_within_input_geometry(
+                vertices, ridges, ridge_sites
+            )
+
+        return self._assemble_centerline(
+            borders, ridges, vertices, kept_ridges
+        )
+
+    def _assemble_centerline(self, points, ridges, vertices, kept_ridges):
+        if self._stats is not None:
+            self._stats.points = len(points)
+            self._stats.ridges = len(ridges)
+            self._stats.kept_ridges = len(kept_ridges)
+
+        if len(kept_ridges) < 2:
+            raise exceptions.TooFewRidgesError
+
+        with measure_stage(self._stats, "assembly"):
+            ridge_graph = RidgeGraph(
+                self._create_point_with_restored_coordinates(vertices),
+                kept_ridges,
+            )
+            if self._min_branch_length:
+                ridge_graph = ridge_graph.prune(self._min_branch_length)
+            return ridge_graph.get_polylines(
+                simplify_tolerance=self._simplify_tolerance
+            )
 
-                if self._linestring_is_within_input_geometry(linestring):
-                    linestrings.append(linestring)
+    def _construct_chordal_axis(self):
+        """Construct the centerline from the chordal axis of a conforming
+        Delaunay triangulation of the border's vertices.
 
-        if len(linestrings) < 2:
+        The triangulation only adds points where the polygon is narrow
+        compared to its border's segments, so the construction takes
+        time in proportion to the number of the vertices rather than to
+        the length of the border. The stages are recorded as those of
+        the Voronoi diagram: the ``"voronoi"`` stage is the
+        triangulation, and the ``"ridge_filtering"`` one is the
+        construction of the chordal axis.
+        """
+        with measure_stage(self._stats, "densification"):
+            points, segments = get_ring_segments(self._get_boundaries())
+            self._reduce_coordinates(points)
+        if len(points) < 3:
             raise exceptions.TooFewRidgesError
+        with measure_stage(self._stats, "voronoi"):
+            points, triangles, neighbours, triangles_are_inside = (
+                triangulate_conforming(
+                    points,
+                    segments,
+                    lambda centroids: self._points_are_within_input_geometry(
+                        self._create_point_with_restored_coordinates(centroids)
+                    ),
+                )
+            )
+        with measure_stage(self._stats, "ridge_filtering"):
+            vertices, ridges = get_chordal_axis(
+                points, triangles, neighbours, triangles_are_inside
+            )
 
-        return unary_union(linestrings)
+        return self._assemble_centerline(points, triangles, vertices, ridges)
 
-    def _get_voronoi_vertices_and_ridges(self):
-        borders = self._get_densified_borders()
+    def _get_voronoi_vertices_and_ridges(self, borders):
+        from scipy.spatial import Voronoi
 
         voronoi_diagram = Voronoi(borders)
         vertices = voronoi_diagram.vertices
-        ridges = voronoi_diagram.ridge_vertices
+        ridges = asarray(voronoi_diagram.ridge_vertices, dtype=intp)
+        ridge_sites = borders[voronoi_diagram.ridge_points[:, 0]]
 
-        return vertices, ridges
+        return vertices, ridges.reshape(-1, 2), ridge_sites
 
-    def _ridge_is_finite(self, ridge):
-        return -1 not in ridge
+    def _get_tiled_voronoi_vertices_and_ridges(self, borders):
+        """Compute the Voronoi diagram tile by tile.
 
-    def _create_point_with_restored_coordinates(self, x, y):
-        return (x + self._min_x, y + self._min_y)
+        Each tile is extended by an overlap that contains all of the
+        densified points that can affect the ridges inside the input
+        geometry, so the ridges of a tile's diagram are the same as the
+        ones of the whole diagram. Every ridge is kept by the single
+        tile that contains its midpoint, and the vertices are snapped to
+        a fine grid so that the ones shared by neighbouring tiles are
+        merged when the centerline is assembled.
+        """
+        from .processing import map_in_pool
+
+        overlap = self._get_tile_overlap(borders)
+        tiles = self._get_tiles(borders)
 
-    def _linestring_is_within_input_geometry(self, linestring):
-        return (
-            linestring.within(self._input_geometry)
-            and len(linestring.coords[0]) > 1
+        tasks = (
+            (borders[_get_points_within_bounds(borders, tile, overlap)], tile)
+            for tile in tiles
+        )
+        tile_results = map_in_pool(
+            _get_voronoi_vertices_and_ridges_of_tile,
+            tasks,
+            workers=self._tile_workers,
         )
 
+        vertices, ridges, ridge_sites = [], [], []
+        vertex_count = 0
+        for tile_vertices, tile_ridges, tile_ridge_sites in tile_results:
+            vertices.append(tile_vertices)
+            ridges.append(tile_ridges + vertex_count)
+            ridge_sites.append(tile_ridge_sites)
+            vertex_count += len(tile_vertices)
+
+        grid_size = self._interpolation_distance * SNAPPING_GRID_FACTOR
+        vertices = around(concatenate(vertices) / grid_size) * grid_size
+        return vertices, concatenate(ridges), concatenate(ridge_sites)
+
+    def _get_tiles(self, borders):
+        # The outer tiles are unbounded, so that they also keep the
+        # ridges that reach beyond the densified points.
+        min_x, min_y = borders.min(axis=0)
+        max_x, max_y = borders.max(axis=0)
+        x_edges = _get_tile_edges(min_x, max_x, self._tile_size)
+        y_edges = _get_tile_edges(min_y, max_y, self._tile_size)
+        return [
+            (x_0, y_0, x_1, y_1)
+            for x_0, x_1 in zip(x_edges[:-1], x_edges[1:])
+            for y_0, y_1 in zip(y_edges[:-1], y_edges[1:])
+        ]
+
+    def _get_tile_overlap(self, borders):
+        """Get the overlap between the tiles.
+
+        No ridge inside the input geometry is further away from its
+        generating points than the radius of the largest circle that
+        fits into the input geometry, and no ridge is longer than the
+        circle's diameter. The radius is bounded from above by
+        sampling the distance to the densified borders on a grid.
+        """
+        from scipy.spatial import cKDTree
+
+        min_x, min_y = borders.min(axis=0)
+        max_x, max_y = borders.max(axis=0)
+        spacing = max(
+            self._get_max_point_spacing(),
+            sqrt((max_x - min_x) * (max_y - min_y) / OVERLAP_GRID_SIZE),
+        )
+        xs, ys = meshgrid(
+            arange(min_x, max_x + spacing, spacing),
+            arange(min_y, max_y + spacing, spacing),
+        )
+        grid = column_stack((xs.ravel(), ys.ravel()))
+
+        distances, _ = cKDTree(borders).query(grid)
+        tolerance = spacing + self._get_max_point_spacing()
+        grid_points_are_relevant = (
+            self._points_are_within_input_geometry(
+                self._create_point_with_restored_coordinates(grid)
+            )
+            | (distances <= tolerance)
+        )
+        radius = distances[grid_points_are_relevant].max() + tolerance
+        return 3 * radius
+
+    def _get_ridges_within_input_geometry(self, vertices, ridges, ridge_sites):
+        """Keep the ridges that lie within the input geometry.
+
+        Every Voronoi vertex is classified once and the ridges with an
+        infinite or an outer vertex are dropped in bulk. A ridge whose
+        vertices are both inside can only leave the input geometry if
+        the boundary comes close to it. The boundary is never further
+        than half of the interpolation distance from one of its
+        densified points, whereas no densified point is closer to the
+        ridge than its own generating point (``ridge_sites``), so only
+        the ridges passing close to their generating points need the
+        exact (and expensive) segment test.
+        """
+        ridges_are_finite = self._ridges_are_finite(ridges)
+        ridges = ridges[ridges_are_finite]
+        ridge_sites = ridge_sites[ridges_are_finite]
+
+        vertices_are_inside = self._points_are_within_input_geometry(
+            self._create_point_with_restored_coordinates(vertices)
+        )
+        ridges_are_inside = vertices_are_inside[ridges].all(axis=1)
+        ridges = ridges[ridges_are_inside]
+        ridge_sites = ridge_sites[ridges_are_inside]
+
+        clearances = _get_distances_to_segments(
+            ridge_sites, vertices[ridges[:, 0]], vertices[ridges[:, 1]]
+        )
+        ridges_are_within = clearances > self._get_max_point_spacing()
+        if not ridges_are_within.all():
+            prepared_input_geometry = prep(self._get_input_polygon())
+            indices = nonzero(~ridges_are_within)[0]
+            segments = self._create_point_with_restored_coordinates(
+                vertices[ridges[indices]]
+            )
+            for index, segment in zip(indices, segments):
+                ridges_are_within[index] = prepared_input_geometry.contains(
+                    LineString(segment)
+                )
+
+        return ridges[ridges_are_within]
+
+    def _ridges_are_finite(self, ridges):
+        return (ridges != -1).all(axis=1)
+
+    def _points_are_within_input_geometry(self, points):
+        return contains(
+            self._get_input_polygon(), points[:, 0], points[:, 1]
+        )
+
+    def _get_input_polygon(self):
+        if isinstance(self._input_geometry, _PolygonArrays):
+            return self._input_geometry.polygon
+        return self._input_geometry
+
+    def _create_point_with_restored_coordinates(self, points):
+        return points + (self._min_x, self._min_y)
+
+    def _reduce_coordinates(self, points):
+        # The densified points are reduced in place, so that the input
+        # coordinates never have to be copied.
+        points -= (self._min_x, self._min_y)
+        return points
+
     def _get_densified_borders(self):
-        polygons = self._extract_polygons_from_input_geometry()
-        points = []
-        for polygon in polygons:
-            points += self._get_interpolated_boundary(polygon.exterior)
-            if self._polygon_has_interior_rings(polygon):
-                for interior in polygon.interiors:
-                    points += self._get_interpolated_boundary(interior)
+        if (
+            isinstance(self._input_geometry, _PolygonArrays)
+            and self._input_geometry.densified_borders is not None
+        ):
+            return self._input_geometry.densified_borders
+
+        boundaries = self._get_boundaries()
+
+        if self._adaptive:
+            return concatenate(
+                [
+                    self._reduce_coordinates(points)
+                    for points in densify_adaptively(
+                        boundaries,
+                        min_distance=self._interpolation_distance,
+                        max_distance=self._get_max_point_spacing(),
+                    )
+                ]
+            )
+
+        if self._previous_borders is None:
+            borders = [
+                self._get_interpolated_boundary(boundary)
+                for boundary in boundaries
+            ]
+        else:
+            borders = [
+                self._get_refined_boundary(boundary, points)
+                for boundary, points in zip(boundaries, self._previous_borders)
+            ]
+
+        if self._reuse_densified_borders:
+            self._previous_borders = borders
+
+        return concatenate(borders)
+
+    def _get_max_point_spacing(self):
+        if self._adaptive:
+            return self._max_interpolation_distance or (
+                ADAPTIVE_MAX_FACTOR * self._interpolation_distance
+            )
+        else:
+            return self._interpolation_distance
+
+    def _get_boundaries(self):
+        if isinstance(self._input_geometry, _PolygonArrays):
+            return self._input_geometry.rings
 
-        return array(points)
+        boundaries = []
+        for polygon in self._extract_polygons_from_input_geometry():
+            boundaries.append(polygon.exterior)
+            if self._polygon_has_interior_rings(polygon):
+                boundaries.extend(polygon.interiors)
+        return [
+            asarray(boundary.coords, dtype=float)[:, :2]
+            for boundary in boundaries
+        ]
 
     def _extract_polygons_from_input_geometry(self):
         if isinstance(self._input_geometry, MultiPolygon):
-            return (polygon for polygon in self._input_geometry)
+            return (polygon for polygon in self._input_geometry.geoms)
         else:
             return (self._input_geometry,)
 
     def _polygon_has_interior_rings(self, polygon):
         return len(polygon.interiors) > 0
 
-    def _get_interpolated_boundary(self, boundary):
-        line = LineString(boundary)
+    def _get_interpolated_boundary(self, coordinates):
+        cumulative_lengths = get_cumulative_lengths(coordinates)
+        distances = self._get_interpolation_distances(cumulative_lengths[-1])
+
+        points = empty((len(distances) + 2, 2))
+        points[0] = coordinates[0]
+        interpolate_along_line(
+            coordinates, cumulative_lengths, distances, out=points[1:-1]
+        )
+        points[-1] = coordinates[-1]
+
+        return self._reduce_coordinates(points)
 
-        first_point = self._get_coordinates_of_first_point(line)
-        last_point = self._get_coordinates_of_last_point(line)
+    def _get_refined_boundary(self, coordinates, points):
+        # The ``points`` were interpolated at twice the current distance,
+        # so they become every other point of the refined boundary.
+        cumulative_lengths = get_cumulative_lengths(coordinates)
+        distances = self._get_interpolation_distances(cumulative_lengths[-1])
 
-        intermediate_points = self._get_coordinates_of_interpolated_points(
-            line
+        refined_points = empty((len(distances) + 2, 2))
+        refined_points[0] = points[0]
+        refined_points[2:-1:2] = points[1:-1]
+        interpolate_along_line(
+            coordinates,
+            cumulative_lengths,
+            distances[::2],
+            out=refined_points[1:-1:2],
         )
+        self._reduce_coordinates(refined_points[1:-1:2])
+        refined_points[-1] = points[-1]
+
+        return refined_points
+
+    def _get_interpolation_distances(self, line_length):
+        count = int(line_length // self._interpolation_distance)
+        distances = arange(1, count + 1) * self._interpolation_distance
+        return distances[distances < line_length]
+
+
+class Centerline(CenterlineBuilder, MultiLineString):
+    """Create a centerline object.
+
+    The centerline is constructed right away and the object is the
+    :py:class:`shapely.geometry.MultiLineString` itself. The
+    ``attributes`` are copied and set as the centerline's attributes.
+    When many centerlines are kept, :py:meth:`CenterlineBuilder.build`
+    needs less memory.
+
+    The other options of :py:class:`CenterlineBuilder` are given with a
+    leading underscore, e.g. ``_engine``, so that they never collide
+    with the ``attributes``, which can have any other name.
+
+    :param input_geometry: input geometry
+    :type input_geometry: :py:class:`shapely.geometry.Polygon` or
+        :py:class:`shapely.geometry.MultiPolygon`
+    :param interpolation_distance: densify the input geometry's
+        border by placing additional points at this distance,
+        defaults to 0.5 [meter], or ``"auto"``
+    :type interpolation_distance: float or str, optional
+    :raises exceptions.InvalidInputTypeError: input geometry is not
+        of type :py:class:`shapely.geometry.Polygon` or
+        :py:class:`shapely.geometry.MultiPolygon`
+    """
+
+    def __init__(
+        self,
+        input_geometry,
+        interpolation_distance=0.5,
+        _adaptive=False,
+        _max_interpolation_distance=None,
+        _tile_size=None,
+        _tile_workers=1,
+        _min_branch_length=None,
+        _simplify_tolerance=None,
+        _cache=None,
+        _stats=None,
+        _engine=VORONOI_ENGINE,
+        _part_workers=1,
+        **attributes
+    ):
+        CenterlineBuilder.__init__(
+            self,
+            input_geometry,
+            interpolation_distance,
+            adaptive=_adaptive,
+            max_interpolation_distance=_max_interpolation_distance,
+            tile_size=_tile_size,
+            tile_workers=_tile_workers,
+            min_branch_length=_min_branch_length,
+            simplify_tolerance=_simplify_tolerance,
+            cache=_cache,
+            stats=_stats,
+            engine=_engine,
+            part_workers=_part_workers,
+        )
+        self.assign_attributes_to_instance(attributes)
+
+        MultiLineString.__init__(self, lines=list(self._construct_result()))
+
+    def assign_attributes_to_instance(self, attributes):
+        """Assign the ``attributes`` to the :py:class:`Centerline` object.
+
+        :param attributes: polygon's attributes
+        :type attributes: dict
+        """
+        for key in attributes:
+            setattr(self, key, attributes.get(key))
+
+
+class CenterlineResult(object):
+    """Centerline stored as contiguous arrays.
+
+    The coordinates of all the lines are kept in a single array, in
+    which the line ``i`` spans the rows from ``offsets[i]`` up to
+    ``offsets[i + 1]``. The Shapely geometry is only created when it
+    is first accessed, and the GeoJSON-like mapping returned by
+    :py:func:`shapely.geometry.mapping` is created from the arrays
+    directly.
+
+    :param coordinates: coordinates of the lines' points
+    :type coordinates: :py:class:`numpy.ndarray` of shape (n, 2)
+    :param offsets: index of every line's first point, followed by the
+        number of the points
+    :type offsets: :py:class:`numpy.ndarray` of shape (m + 1,)
+    :param properties: properties of the centerline, defaults to None
+    :type properties: dict, optional
+    """
+
+    __slots__ = ("coordinates", "offsets", "properties", "_geometry")
+
+    def __init__(self, coordinates, offsets, properties=None):
+        self.coordinates = coordinates
+        self.offsets = offsets
+        self.properties = dict(properties or {})
+        self._geometry = None
+
+    @classmethod
+    def from_lines(cls, lines, properties=None):
+        """Create the result from the coordinates of the lines.
+
+        :param lines: coordinates of every line
+        :type lines: list of :py:class:`numpy.ndarray` of shape (k, 2)
+        :param properties: properties of the centerline, defaults to None
+        :type properties: dict, optional
+        :rtype: :py:class:`CenterlineResult`
+        """
+        offsets = zeros(len(lines) + 1, dtype=intp)
+        offsets[1:] = [len(line) for line in lines]
+        if lines:
+            coordinates = concatenate(lines).astype(float, copy=False)
+        else:
+            coordinates = empty((0, 2))
+        return cls(coordinates, offsets.cumsum(), properties)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for start, end in zip(self.offsets[:-1], self.offsets[1:]):
+            yield self.coordinates[start:end]
+
+    def __getstate__(self):
+        return self.coordinates, self.offsets, self.properties
+
+    def __setstate__(self, state):
+        self.coordinates, self.offsets, self.properties = state
+        self._geometry = None
+
+    @property
+    def geometry(self):
+        """Centerline as a Shapely geometry, created on first access.
+
+        :rtype: :py:class:`shapely.geometry.MultiLineString`
+        """
+        if self._geometry is None:
+            self._geometry = MultiLineString(list(self))
+        return self._geometry
+
+    @property
+    def __geo_interface__(self):
+        return {
+            "type": "MultiLineString",
+            "coordinates": tuple(
+                tuple(map(tuple, line.tolist())) for line in self
+            ),
+        }
+
 
-        return [first_point] + intermediate_points + [last_point]
+class _PolygonArrays(object):
+    # Polygon given as the coordinate arrays of its rings, the exterior
+    # one first, whose Shapely polygon is only created when it is first
+    # needed. The batches of the geometries set the Shapely geometry,
+    # the minimum coordinates and the densified borders right away,
+    # since they are computed for all of the geometries at once.
 
-    def _get_coordinates_of_first_point(self, linestring):
-        return self._create_point_with_reduced_coordinates(
-            x=linestring.xy[0][0], y=linestring.xy[1][0]
+    def __init__(
+        self,
+        rings,
+        polygon=None,
+        min_coordinates=None,
+        densified_borders=None,
+    ):
+        self.rings = rings
+        self.densified_borders = densified_borders
+        self._polygon = polygon
+        self._min_coordinates = min_coordinates
+
+    @property
+    def min_coordinates(self):
+        if self._min_coordinates is None:
+            self._min_coordinates = self.rings[0].min(axis=0)
+        return self._min_coordinates
+
+    @property
+    def is_multipart(self):
+        # Only the batches set the multipolygons, whose rings belong to
+        # several parts.
+        return isinstance(self._polygon, MultiPolygon)
+
+    @property
+    def polygon(self):
+        if self._polygon is None:
+            self._polygon = Polygon(self.rings[0], self.rings[1:])
+        return self._polygon
+
+
+def _get_ring_coordinates(ring):
+    # Neither the float64 arrays nor their first two columns are copied,
+    # only the rings that have to be closed.
+    coordinates = asarray(ring, dtype=float64)
+    if coordinates.ndim != 2 or coordinates.shape[1] < 2:
+        raise exceptions.InvalidInputTypeError(
+            "Rings must be arrays of shape (n, 2)."
         )
 
-    def _get_coordinates_of_last_point(self, linestring):
-        return self._create_point_with_reduced_coordinates(
-            x=linestring.xy[0][-1], y=linestring.xy[1][-1]
+    coordinates = coordinates[:, :2]
+    if len(coordinates) and (coordinates[0] != coordinates[-1]).any():
+        coordinates = concatenate((coordinates, coordinates[:1]))
+    if len(coordinates) < 4:
+        raise exceptions.InvalidInputTypeError(
+            "Rings must have at least three points."
         )
+    return coordinates
 
-    def _get_coordinates_of_interpolated_points(self, linestring):
-        intermediate_points = []
-        interpolation_distance = self._interpolation_distance
-        line_length = linestring.length
-        while interpolation_distance < line_length:
-            point = linestring.interpolate(interpolation_distance)
-            reduced_point = self._create_point_with_reduced_coordinates(
-                x=point.x, y=point.y
-            )
-            intermediate_points.append(reduced_point)
-            interpolation_distance += self._interpolation_distance
 
-        return intermediate_points
+def _import_qhull_error():
+    try:
+        from scipy.spatial import QhullError
+    except ImportError:  # pragma: no cover
+        from scipy.spatial.qhull import QhullError
+    return QhullError
+
+
+def _get_tile_edges(min_value, max_value, tile_size):
+    tile_count = max(1, int(ceil((max_value - min_value) / tile_size)))
+    edges = min_value + arange(tile_count + 1) * tile_size
+    edges[0], edges[-1] = -inf, inf
+    return edges
+
+
+def _get_points_within_bounds(points, bounds, buffer_distance=0):
+    min_x, min_y, max_x, max_y = bounds
+    return (
+        (points[:, 0] >= min_x - buffer_distance)
+        & (points[:, 0] < max_x + buffer_distance)
+        & (points[:, 1] >= min_y - buffer_distance)
+        & (points[:, 1] < max_y + buffer_distance)
+    )
+
+
+def _construct_lines_of_part(task):
+    part, interpolation_distance, options, part_stats = task
+    builder = CenterlineBuilder(
+        part, interpolation_distance, stats=part_stats, **options
+    )
+    try:
+        lines = builder._construct_lines()
+    except (exceptions.TooFewRidgesError, _import_qhull_error()):
+        # Qhull fails if a small part has too few points for a diagram.
+        lines = []
+    return lines, part_stats
+
+
+def _get_voronoi_vertices_and_ridges_of_tile(task):
+    """Get the finite ridges of the tile's Voronoi diagram, whose
+    midpoints lie within the tile, together with their vertices and
+    generating points.
+    """
+    from scipy.spatial import Voronoi
+
+    points, tile = task
+    empty_result = (empty((0, 2)), empty((0, 2), dtype=intp), empty((0, 2)))
+    if len(points) < 4:
+        return empty_result
+
+    try:
+        voronoi_diagram = Voronoi(points)
+    except _import_qhull_error():
+        # Degenerate (e.g. collinear) points cannot generate a ridge
+        # inside the input geometry within the tile's overlap.
+        return empty_result
+
+    ridges = asarray(voronoi_diagram.ridge_vertices, dtype=intp)
+    ridges = ridges.reshape(-1, 2)
+    ridge_sites = points[voronoi_diagram.ridge_points[:, 0]]
+    ridges_are_kept = (ridges != -1).all(axis=1)
+    ridges, ridge_sites = ridges[ridges_are_kept], ridge_sites[ridges_are_kept]
+
+    midpoints = voronoi_diagram.vertices[ridges].mean(axis=1)
+    ridges_are_kept = _get_points_within_bounds(midpoints, tile)
+    ridges, ridge_sites = ridges[ridges_are_kept], ridge_sites[ridges_are_kept]
+
+    used_vertices, ridges = unique(ridges, return_inverse=True)
+    vertices = voronoi_diagram.vertices[used_vertices]
+    return vertices, ridges.reshape(-1, 2), ridge_sites
+
 
-    def _create_point_with_reduced_coordinates(self, x, y):
-        return (x - self._min_x, y - self._min_y)
+def _get_distances_to_segments(points, starts, ends):
+    """Get the distance of every point to its corresponding segment."""
+    directions = ends - starts
+    squared_lengths = (directions * directions).sum(axis=1)
+    projections = ((points - starts) * directions).sum(axis=1)
+    ratios = projections / where(squared_lengths > 0, squared_lengths, 1)
+    clip(ratios, 0.0, 1.0, out=ratios)
+    closest_points = starts + directions * ratios[:, None]
+    return hypot(*(points - closest_points).T)
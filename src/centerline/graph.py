@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from numpy import (
+    arange,
+    argsort,
+    bincount,
+    concatenate,
+    diff,
+    hypot,
+    intp,
+    sort,
+    unique,
+    zeros,
+)
+
+
+class RidgeGraph(object):
+    """Undirected graph of the ridges that form the centerline.
+
+    Coincident vertices are merged, while the degenerate and the
+    duplicate edges are dropped, so that every vertex of the graph
+    has a unique position.
+
+    :param vertices: coordinates of the vertices
+    :type vertices: :py:class:`numpy.ndarray` of shape (n, 2)
+    :param edges: pairs of the vertices' indices
+    :type edges: :py:class:`numpy.ndarray` of shape (m, 2)
+    """
+
+    def __init__(self, vertices, edges):
+        used_vertices, edges = unique(edges, return_inverse=True)
+        self.vertices, vertex_indices = unique(
+            vertices[used_vertices], axis=0, return_inverse=True
+        )
+        edges = vertex_indices.reshape(-1)[edges].reshape(-1, 2)
+        edges = sort(edges[edges[:, 0] != edges[:, 1]], axis=1)
+        self.edges = unique(edges, axis=0).reshape(-1, 2)
+
+        self.degrees = bincount(
+            self.edges.reshape(-1), minlength=len(self.vertices)
+        )
+        self._build_adjacency()
+
+    def _build_adjacency(self):
+        # Every edge is stored once in each direction, sorted by the
+        # vertex it leaves from, so that the edges incident to the vertex
+        # ``v`` are ``self._incident_edges[self._offsets[v]:...[v + 1]]``.
+        edge_indices = arange(len(self.edges))
+        sources = concatenate((self.edges[:, 0], self.edges[:, 1]))
+        targets = concatenate((self.edges[:, 1], self.edges[:, 0]))
+
+        order = argsort(sources, kind="stable")
+        self._neighbours = targets[order]
+        self._incident_edges = concatenate((edge_indices, edge_indices))[order]
+        self._offsets = zeros(len(self.vertices) + 1, dtype=intp)
+        self._offsets[1:] = self.degrees.cumsum()
+
+    def get_polylines(self, simplify_tolerance=None):
+        """Walk the graph into maximal polylines, which only start and
+        end at junctions and at endpoints, or form closed loops.
+
+        :param simplify_tolerance: simplify every polyline with the
+            Douglas-Peucker algorithm, so that no removed vertex is
+            further away from the simplified polyline than this
+            distance, defaults to None. The polylines' ends, and thus
+            the junctions, are kept in place.
+        :type simplify_tolerance: float, optional
+        :return: coordinates of the polylines
+        :rtype: list of :py:class:`numpy.ndarray` of shape (k, 2)
+        """
+        polylines = [
+            self.vertices[polyline] for polyline in self._walk_polylines()
+        ]
+        if simplify_tolerance:
+            polylines = [
+                simplify_polyline(polyline, simplify_tolerance)
+                for polyline in polylines
+            ]
+        return polylines
+
+    def prune(self, min_branch_length):
+        """Remove the branches that are shorter than the
+        ``min_branch_length``, i.e. the spurs toward the bumps of the
+        input geometry's boundary.
+
+        A branch is a polyline between an endpoint and a junction. The
+        shortest branches are removed first, but never all of the
+        branches of a junction, and the pruning is repeated until no
+        more branches can be removed, since removing a branch can turn
+        a longer polyline into a short branch.
+
+        :param min_branch_length: minimum length of the branches
+        :type min_branch_length: float
+        :return: pruned graph
+        :rtype: :py:class:`RidgeGraph`
+        """
+        graph = self
+        while True:
+            polylines = graph._walk_polylines()
+            degrees = graph.degrees.copy()
+            kept_polylines = []
+            for length, polyline in sorted(
+                zip(graph._get_lengths(polylines), polylines),
+                key=lambda item: item[0],
+            ):
+                if length < min_branch_length and graph._is_removable(
+                    polyline, degrees
+                ):
+                    degrees[polyline[0]] -= 1
+                    degrees[polyline[-1]] -= 1
+                else:
+                    kept_polylines.append(polyline)
+
+            if len(kept_polylines) == len(polylines):
+                return graph
+
+            edges = [
+                [polyline[:-1], polyline[1:]] for polyline in kept_polylines
+            ]
+            graph = RidgeGraph(
+                graph.vertices, concatenate(edges, axis=1).T.reshape(-1, 2)
+            )
+
+    def _is_removable(self, polyline, degrees):
+        # A branch ends at an endpoint on one side, and at a junction
+        # that keeps at least two other polylines on the other side.
+        first, last = degrees[polyline[0]], degrees[polyline[-1]]
+        return (first == 1 and last > 2) or (last == 1 and first > 2)
+
+    def _get_lengths(self, polylines):
+        return [
+            _get_polyline_length(self.vertices[polyline])
+            for polyline in polylines
+        ]
+
+    def _walk_polylines(self):
+        walker = _Walker(self)
+
+        # Open chains start at every vertex that is not in the middle of
+        # one, whereas the remaining edges form closed loops.
+        for vertex in (self.degrees != 2).nonzero()[0].tolist():
+            walker.walk_from(vertex)
+        for vertex in (self.degrees == 2).nonzero()[0].tolist():
+            walker.walk_from(vertex)
+
+        return walker.polylines
+
+
+def simplify_polyline(coordinates, tolerance):
+    """Simplify the polyline with the Douglas-Peucker algorithm.
+
+    :param coordinates: coordinates of the polyline's vertices
+    :type coordinates: :py:class:`numpy.ndarray` of shape (n, 2)
+    :param tolerance: largest distance between a removed vertex and
+        the simplified polyline
+    :type tolerance: float
+    :return: coordinates of the kept vertices, including the ends
+    :rtype: :py:class:`numpy.ndarray` of shape (k, 2)
+    """
+    if len(coordinates) < 3:
+        return coordinates
+
+    kept = zeros(len(coordinates), dtype=bool)
+    kept[0] = kept[-1] = True
+    # A closed polyline is split at its furthest vertex first, because
+    # the distances to a degenerate segment cannot be measured.
+    if (coordinates[0] == coordinates[-1]).all():
+        offsets = coordinates - coordinates[0]
+        middle = hypot(offsets[:, 0], offsets[:, 1]).argmax()
+        kept[middle] = True
+        sections = [(0, middle), (middle, len(coordinates) - 1)]
+    else:
+        sections = [(0, len(coordinates) - 1)]
+
+    while sections:
+        start, end = sections.pop()
+        if end - start < 2:
+            continue
+
+        distances = _get_distances_to_line(
+            coordinates[start:end][1:], coordinates[start], coordinates[end]
+        )
+        furthest = distances.argmax()
+        if distances[furthest] > tolerance:
+            furthest += start + 1
+            kept[furthest] = True
+            sections.append((start, furthest))
+            sections.append((furthest, end))
+
+    return coordinates[kept]
+
+
+def _get_polyline_length(coordinates):
+    segments = diff(coordinates, axis=0)
+    return hypot(segments[:, 0], segments[:, 1]).sum()
+
+
+def _get_distances_to_line(points, start, end):
+    direction = end - start
+    length = hypot(direction[0], direction[1])
+    offsets = points - start
+    if length == 0:
+        return hypot(offsets[:, 0], offsets[:, 1])
+    return (
+        abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0])
+        / length
+    )
+
+
+class _Walker(object):
+    # Plain lists are used instead of arrays, because they are much faster
+    # to index one element at a time.
+
+    def __init__(self, graph):
+        self.degrees = graph.degrees.tolist()
+        self.neighbours = graph._neighbours.tolist()
+        self.incident_edges = graph._incident_edges.tolist()
+        self.offsets = graph._offsets.tolist()
+        self.visited = [False] * len(graph.edges)
+        self.polylines = []
+
+    def walk_from(self, vertex):
+        for position in range(self.offsets[vertex], self.offsets[vertex + 1]):
+            if not self.visited[self.incident_edges[position]]:
+                self.polylines.append(self._walk(vertex, position))
+
+    def _walk(self, vertex, position):
+        polyline = [vertex]
+        while True:
+            edge = self.incident_edges[position]
+            self.visited[edge] = True
+            vertex = self.neighbours[position]
+            polyline.append(vertex)
+            if self.degrees[vertex] != 2:
+                return polyline
+
+            position = self.offsets[vertex]
+            if self.incident_edges[position] == edge:
+                position += 1
+            if self.visited[self.incident_edges[position]]:
+                return polyline
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import hashlib
+import itertools
+import json
+import numbers
+
+from collections import Counter, deque
+
+from shapely.geometry import shape
+
+from .processing import CenterlineFeature, iter_centerlines
+
+
+class PreviousOutput(object):
+    """Centerlines of a previous run, which are matched to the current
+    features, so that they do not have to be constructed again.
+
+    A feature is matched to its previous version by its FID, and is
+    unchanged if the fingerprints of their geometries and properties
+    are equal. If the previous run wrote the features' FIDs to the
+    ``fid_field`` of the centerlines, the previous centerline is found
+    by the FID. Otherwise it is found by the feature's properties,
+    which were copied to it, and if the properties of several previous
+    features are equal, their centerlines are ambiguous and are
+    constructed again.
+
+    The counters of the ``reused`` and the ``recomputed`` centerlines,
+    as well as of the ``deleted`` features, are updated while the
+    current features are matched. The ``unmatched`` counter includes
+    the unchanged features that were recomputed, because their
+    previous centerlines were not found.
+
+    :param source: previous input features, e.g. an open
+        :py:class:`fiona.Collection`
+    :type source: iterable
+    :param destination: previous centerlines, which can be retrieved by
+        their FID, e.g. an open :py:class:`fiona.Collection`
+    :type destination: :py:class:`fiona.Collection`
+    :param fid_field: property of the centerlines that holds the FIDs
+        of their features, which is not part of the fingerprints,
+        defaults to None
+    :type fid_field: str, optional
+    """
+
+    def __init__(self, source, destination, fid_field=None):
+        self.reused = 0
+        self.recomputed = 0
+        self.unmatched = 0
+        self._destination = destination
+        self._fid_field = fid_field
+        self._matched_ids = set()
+
+        self._fingerprints = {}
+        properties_counts = Counter()
+        for feature in source:
+            properties_fingerprint = self._get_properties_fingerprint(feature)
+            self._fingerprints[feature["id"]] = _get_feature_fingerprint(
+                feature, properties_fingerprint
+            )
+            properties_counts[properties_fingerprint] += 1
+
+        self._destination_ids = {}
+        if fid_field is not None:
+            for record in destination:
+                fid = record["properties"].get(fid_field)
+                if isinstance(fid, numbers.Integral):
+                    self._destination_ids[str(fid)] = int(record["id"])
+            return
+
+        for record in destination:
+            properties_fingerprint = self._get_properties_fingerprint(record)
+            if properties_counts[properties_fingerprint] != 1:
+                continue
+            if properties_fingerprint in self._destination_ids:
+                self._destination_ids[properties_fingerprint] = None
+            else:
+                self._destination_ids[properties_fingerprint] = int(
+                    record["id"]
+                )
+
+    @property
+    def deleted(self):
+        """Number of the previous features that were not matched by any
+        of the current features' FIDs.
+
+        :rtype: int
+        """
+        return len(self._fingerprints) - len(self._matched_ids)
+
+    def get_destination_id(self, feature):
+        """Get the FID of the previous centerline of the ``feature``.
+
+        :param feature: current GeoJSON-like feature
+        :type feature: dict
+        :return: FID of the previous centerline, or ``None`` if it has
+            to be constructed again
+        :rtype: int
+        """
+        destination_id = None
+        previous_fingerprint = self._fingerprints.get(feature["id"])
+        if previous_fingerprint is not None:
+            self._matched_ids.add(feature["id"])
+            properties_fingerprint = self._get_properties_fingerprint(feature)
+            fingerprint = _get_feature_fingerprint(
+                feature, properties_fingerprint
+            )
+            if fingerprint == previous_fingerprint:
+                destination_id = self._destination_ids.get(
+                    properties_fingerprint
+                    if self._fid_field is None
+                    else feature["id"]
+                )
+                if destination_id is None:
+                    self.unmatched += 1
+
+        if destination_id is None:
+            self.recomputed += 1
+        else:
+            self.reused += 1
+        return destination_id
+
+    def get_centerline_feature(self, index, destination_id):
+        """Get the previous centerline as a
+        :py:class:`centerline.processing.CenterlineFeature`.
+
+        :param index: position of the current feature
+        :type index: int
+        :param destination_id: FID of the previous centerline
+        :type destination_id: int
+        :rtype: :py:class:`centerline.processing.CenterlineFeature`
+        """
+        record = self._destination[destination_id]
+        geometry = record["geometry"]
+        # Shapefiles return the single-part centerlines as LineStrings.
+        if geometry["type"] == "LineString":
+            geometry = {
+                "type": "MultiLineString",
+                "coordinates": [geometry["coordinates"]],
+            }
+        return CenterlineFeature(
+            index, geometry, dict(record["properties"]), None
+        )
+
+    def _get_properties_fingerprint(self, feature):
+        properties = dict(feature["properties"] or {})
+        properties.pop(self._fid_field, None)
+        return _get_properties_fingerprint(properties)
+
+
+def iter_incremental_centerlines(features, previous_output, **options):
+    """Lazily construct the centerlines of the ``features`` that have
+    changed since the ``previous_output``, and reuse the others.
+
+    The centerlines are yielded in the order of the ``features``,
+    unless the ``ordered`` option is set to False. The other
+    ``options`` are those of
+    :py:func:`centerline.processing.iter_centerlines`.
+
+    :param features: input features, each of which has an ``"id"``
+    :type features: iterable
+    :param previous_output: centerlines of the previous run
+    :type previous_output: :py:class:`PreviousOutput`
+    :return: centerlines of the features
+    :rtype: generator of :py:class:`centerline.processing.CenterlineFeature`
+    """
+    # Only the positions of the reused centerlines are kept in memory
+    # until the preceding changed features' centerlines are constructed.
+    reused = deque()
+    positions = {}
+    indices = itertools.count()
+
+    def changed_features():
+        for position, feature in enumerate(features):
+            destination_id = previous_output.get_destination_id(feature)
+            if destination_id is None:
+                positions[next(indices)] = position
+                yield feature
+            else:
+                reused.append((position, destination_id))
+
+    def reused_features(before=None):
+        while reused and (before is None or reused[0][0] < before):
+            position, destination_id = reused.popleft()
+            yield previous_output.get_centerline_feature(
+                position, destination_id
+            )
+
+    for centerline_feature in iter_centerlines(changed_features(), **options):
+        position = positions.pop(centerline_feature.index)
+        for reused_feature in reused_features(before=position):
+            yield reused_feature
+        yield centerline_feature._replace(index=position)
+
+    for reused_feature in reused_features():
+        yield reused_feature
+
+
+def _get_properties_fingerprint(properties):
+    properties = json.dumps(properties, sort_keys=True, default=str)
+    return hashlib.sha256(properties.encode("utf-8")).digest()
+
+
+def _get_feature_fingerprint(feature, properties_fingerprint):
+    digest = hashlib.sha256(properties_fingerprint)
+    if feature["geometry"] is not None:
+        digest.update(shape(feature["geometry"]).wkb)
+    return digest.digest()
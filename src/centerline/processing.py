@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import multiprocessing
+import threading
+
+from collections import namedtuple
+
+from shapely.geometry import mapping, shape
+
+from .exceptions import InvalidInputTypeError, TooFewRidgesError
+from .geometry import VORONOI_ENGINE, CenterlineBuilder, _import_qhull_error
+
+
+CenterlineFeature = namedtuple(
+    "CenterlineFeature", ["index", "geometry", "properties", "error", "stats"]
+)
+CenterlineFeature.__new__.__defaults__ = (None,)
+CenterlineFeature.__doc__ = """Centerline constructed from an input feature.
+
+:param index: position of the input feature in the iterable
+:type index: int
+:param geometry: GeoJSON-like mapping of the centerline, or ``None``
+    if it could not be constructed
+:type geometry: dict
+:param properties: input feature's properties
+:type properties: dict
+:param error: error raised while constructing the centerline, or
+    ``None``
+:type error: :py:class:`centerline.exceptions.CenterlineError`
+:param stats: statistics of the centerline's construction, or ``None``
+    if they were not recorded
+:type stats: :py:class:`centerline.stats.FeatureStats`
+"""
+
+
+def iter_centerlines(
+    features,
+    interpolation_distance=0.5,
+    workers=1,
+    ordered=True,
+    max_pending=None,
+    min_branch_length=None,
+    simplify_tolerance=None,
+    cache=None,
+    stats=None,
+    engine=VORONOI_ENGINE,
+):
+    """Lazily construct the centerlines of the ``features``.
+
+    The ``features`` can be any iterable, e.g. a database cursor or a
+    message queue consumer, of ``(geometry, properties)`` pairs or of
+    GeoJSON-like feature mappings. The geometries can be Shapely
+    geometries or GeoJSON-like mappings. Only a bounded number of
+    features is read ahead, so the memory usage does not depend on the
+    number of features.
+
+    A :py:class:`CenterlineFeature` is yielded for every feature. If
+    the feature's centerline could not be constructed, its ``error``
+    holds the :py:class:`centerline.exceptions.InvalidInputTypeError`
+    or the :py:class:`centerline.exceptions.TooFewRidgesError` instead
+    of it being raised. The missing and the empty geometries are
+    invalid, and the polygons too small for a Voronoi diagram have too
+    few ridges.
+
+    :param features: input features
+    :type features: iterable
+    :param interpolation_distance: densify the input geometry's
+        border by placing additional points at this distance,
+        defaults to 0.5 [meter], or ``"auto"``
+    :type interpolation_distance: float or str, optional
+    :param workers: number of processes used to construct the
+        centerlines, defaults to 1
+    :type workers: int, optional
+    :param ordered: yield the centerlines in the order of the
+        ``features``, defaults to True
+    :type ordered: bool, optional
+    :param max_pending: maximum number of features being processed at
+        once, defaults to four times the number of ``workers``
+    :type max_pending: int, optional
+    :param min_branch_length: remove the centerlines' branches that are
+        shorter than this length, defaults to None
+    :type min_branch_length: float, optional
+    :param simplify_tolerance: simplify the centerlines' lines with
+        this tolerance, defaults to None
+    :type simplify_tolerance: float, optional
+    :param cache: reuse the centerlines constructed earlier, and cache
+        the new ones, defaults to None
+    :type cache: :py:class:`centerline.cache.CenterlineCache`, optional
+    :param stats: add the statistics of every constructed centerline,
+        which are also set as the features' ``stats``, defaults to None
+    :type stats: :py:class:`centerline.stats.CenterlineStats`, optional
+    :param engine: construct the centerlines from the Voronoi diagram
+        (``"voronoi"``) or from the chordal axis of a Delaunay
+        triangulation (``"delaunay"``), defaults to ``"voronoi"``
+    :type engine: str, optional
+    :return: centerlines of the features
+    :rtype: generator of :py:class:`CenterlineFeature`
+    """
+    builder_options = {
+        "min_branch_length": min_branch_length,
+        "simplify_tolerance": simplify_tolerance,
+        "engine": engine,
+    }
+    return _iter_centerline_features(
+        features,
+        interpolation_distance,
+        builder_options,
+        cache,
+        stats,
+        as_mapping=True,
+        workers=workers,
+        ordered=ordered,
+        max_pending=max_pending,
+    )
+
+
+def _iter_centerline_results(
+    features,
+    interpolation_distance=0.5,
+    workers=1,
+    ordered=True,
+    max_pending=None,
+    cache=None,
+    stats=None,
+    **builder_options
+):
+    # Like iter_centerlines, but the features' geometries are the
+    # CenterlineResult arrays, for the writers that encode them
+    # directly instead of going through the GeoJSON-like mappings.
+    return _iter_centerline_features(
+        features,
+        interpolation_distance,
+        builder_options,
+        cache,
+        stats,
+        as_mapping=False,
+        workers=workers,
+        ordered=ordered,
+        max_pending=max_pending,
+    )
+
+
+def _iter_centerline_features(
+    features,
+    interpolation_distance,
+    builder_options,
+    cache,
+    stats,
+    as_mapping,
+    **pool_options
+):
+    if cache is not None:
+        centerline_features = _iter_cached_centerlines(
+            features,
+            interpolation_distance,
+            builder_options,
+            cache,
+            stats,
+            as_mapping,
+            **pool_options
+        )
+    else:
+        tasks = (
+            (
+                index,
+                feature,
+                interpolation_distance,
+                builder_options,
+                _create_feature_stats(stats, index, feature),
+                as_mapping,
+            )
+            for index, feature in enumerate(features)
+        )
+        centerline_features = map_in_pool(
+            _create_centerline_feature, tasks, **pool_options
+        )
+
+    if stats is None:
+        return centerline_features
+    return _iter_with_stats(centerline_features, stats)
+
+
+def _create_centerline_feature(task):
+    (
+        index,
+        feature,
+        interpolation_distance,
+        builder_options,
+        feature_stats,
+        as_mapping,
+    ) = task
+    input_geom, attributes = _parse_feature(feature)
+
+    try:
+        builder = CenterlineBuilder(
+            input_geom,
+            interpolation_distance,
+            stats=feature_stats,
+            **builder_options
+        )
+    except InvalidInputTypeError as error:
+        return CenterlineFeature(index, None, attributes, error)
+
+    try:
+        result = builder.build(attributes)
+    except (TooFewRidgesError, _import_qhull_error()) as error:
+        return CenterlineFeature(
+            index,
+            None,
+            attributes,
+            _get_construction_error(error),
+            feature_stats,
+        )
+
+    return CenterlineFeature(
+        index,
+        _get_geometry(result, as_mapping),
+        result.properties,
+        None,
+        feature_stats,
+    )
+
+
+def _iter_cached_centerlines(
+    features,
+    interpolation_distance,
+    builder_options,
+    cache,
+    stats,
+    as_mapping,
+    **pool_options
+):
+    # The cache is only queried and updated in this process, whereas the
+    # pool only constructs the centerlines that are not cached.
+    def tasks():
+        for index, feature in enumerate(features):
+            input_geom, attributes = _parse_feature(feature)
+            feature_stats = _create_feature_stats(stats, index, feature)
+            try:
+                builder = CenterlineBuilder(
+                    input_geom,
+                    interpolation_distance,
+                    stats=feature_stats,
+                    **builder_options
+                )
+            except InvalidInputTypeError:
+                yield index, attributes, None, None, None, None, as_mapping
+                continue
+
+            key = builder.get_cache_key()
+            try:
+                cached_result = cache.get(key)
+            except TooFewRidgesError as error:
+                # The failures are cached as well.
+                cached_result = error
+            yield (
+                index,
+                attributes,
+                builder,
+                feature_stats,
+                key,
+                cached_result,
+                as_mapping,
+            )
+
+    for centerline_feature, key, result in map_in_pool(
+        _create_cached_centerline_feature, tasks(), **pool_options
+    ):
+        if isinstance(result, TooFewRidgesError):
+            cache.set_failed(key)
+        elif result is not None:
+            cache.set(key, result)
+        yield centerline_feature
+
+
+def _create_cached_centerline_feature(task):
+    # Only the newly constructed centerlines and the new failures are
+    # returned for caching.
+    (
+        index,
+        attributes,
+        builder,
+        feature_stats,
+        key,
+        cached_result,
+        as_mapping,
+    ) = task
+    if builder is None:
+        error = InvalidInputTypeError()
+        return CenterlineFeature(index, None, attributes, error), key, None
+
+    if isinstance(cached_result, TooFewRidgesError):
+        centerline_feature = CenterlineFeature(
+            index, None, attributes, cached_result
+        )
+        return centerline_feature, key, None
+
+    if cached_result is not None:
+        geometry = _get_geometry(cached_result, as_mapping)
+        return CenterlineFeature(index, geometry, attributes, None), key, None
+
+    try:
+        result = builder.build()
+    except (TooFewRidgesError, _import_qhull_error()) as error:
+        error = _get_construction_error(error)
+        centerline_feature = CenterlineFeature(
+            index, None, attributes, error, feature_stats
+        )
+        return centerline_feature, key, error
+
+    centerline_feature = CenterlineFeature(
+        index,
+        _get_geometry(result, as_mapping),
+        attributes,
+        None,
+        feature_stats,
+    )
+    return centerline_feature, key, result
+
+
+def _get_geometry(result, as_mapping):
+    if as_mapping:
+        return mapping(result)
+    return result
+
+
+def _get_construction_error(error):
+    # Qhull fails if the polygon is too small for a Voronoi diagram of
+    # its densified border, i.e. it has too few ridges as well.
+    if isinstance(error, TooFewRidgesError):
+        return error
+    return TooFewRidgesError()
+
+
+def _create_feature_stats(stats, index, feature):
+    if stats is None:
+        return None
+
+    # The features read by Fiona have IDs, the other ones are identified
+    # by their position.
+    feature_id = index
+    if not isinstance(feature, (tuple, list)):
+        feature_id = feature.get("id", index)
+    return stats.create_feature_stats(feature_id)
+
+
+def _iter_with_stats(centerline_features, stats):
+    for centerline_feature in centerline_features:
+        if centerline_feature.stats is not None:
+            stats.add(centerline_feature.stats)
+        yield centerline_feature
+
+
+def _parse_feature(feature):
+    if isinstance(feature, (tuple, list)):
+        geom, attributes = feature
+    else:
+        geom = feature.get("geometry")
+        attributes = feature.get("properties")
+
+    # The missing geometries are left to the builder, which rejects
+    # them as it rejects the other invalid inputs.
+    if geom is not None and not hasattr(geom, "geom_type"):
+        geom = shape(geom)
+
+    return geom, dict(attributes or {})
+
+
+def map_in_pool(function, iterable, workers=1, ordered=True, max_pending=None):
+    """Apply the ``function`` to every item of the ``iterable`` in a pool
+    of ``workers`` processes and lazily yield the results.
+
+    At most ``max_pending`` items are handed over to the pool without
+    their results having been consumed, so the ``iterable`` is never
+    read ahead of the consumer by more than that.
+
+    :param function: picklable function of a single argument
+    :type function: callable
+    :param iterable: items the ``function`` is applied to
+    :type iterable: iterable
+    :param workers: number of processes, defaults to 1 in which case
+        no pool is created
+    :type workers: int, optional
+    :param ordered: yield the results in the order of the ``iterable``,
+        otherwise in the order they are produced in, defaults to True
+    :type ordered: bool, optional
+    :param max_pending: maximum number of items being processed,
+        defaults to four times the number of ``workers``
+    :type max_pending: int, optional
+    :return: results of the ``function``
+    :rtype: generator
+    """
+    if workers <= 1:
+        for item in iterable:
+            yield function(item)
+        return
+
+    pending = threading.Semaphore(max_pending or 4 * workers)
+    stopped = threading.Event()
+
+    def throttled_iterable():
+        for item in iterable:
+            pending.acquire()
+            if stopped.is_set():
+                return
+            yield item
+
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for result in imap(function, throttled_iterable()):
+            pending.release()
+            yield result
+        pool.close()
+    finally:
+        # Wake the pool's task handler up in case it waits for a slot.
+        stopped.set()
+        pending.release()
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,600 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import logging
+import multiprocessing
+import sys
+import threading
+import timeit
+
+import click
+
+from shapely.geometry import Polygon, mapping, shape
+
+from .converters import InterpolationDistance
+from .exceptions import CenterlineError
+from .geometry import (
+    AUTO_INTERPOLATION_DISTANCE,
+    CenterlineBuilder,
+    _import_qhull_error,
+)
+
+
+try:
+    import queue
+
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+# Seconds a request waits for its centerline before it times out.
+DEFAULT_TIMEOUT = 30.0
+# Largest number of the points a request's border may be densified to.
+DEFAULT_MAX_POINTS = 1000000
+# Options of the centerline that every request can set.
+REQUEST_OPTIONS = (
+    "interpolation_distance",
+    "min_branch_length",
+    "simplify_tolerance",
+    "engine",
+)
+
+
+class CenterlineService(object):
+    """Construct the centerlines of the requests in a pool of worker
+    processes, which are started and warmed up in advance, so that the
+    requests do not pay for the interpreter's and SciPy's startup.
+
+    A request is a GeoJSON-like feature whose polygon is converted to a
+    centerline. It may also set any of the :py:data:`REQUEST_OPTIONS`,
+    and its ``id`` and ``properties`` are copied to the response. The
+    response has either the centerline's ``geometry``, or an ``error``.
+
+    Every request is answered within the ``timeout`` after it is
+    submitted. A request that is still waiting for a worker by then is
+    never processed, and the worker that is still processing one is
+    killed and replaced by a new one, so that the slow requests do not
+    hold up the following ones.
+
+    :param workers: number of the worker processes, defaults to 1
+    :type workers: int, optional
+    :param max_pending: maximum number of the requests being processed
+        at once, defaults to four times the number of ``workers``
+    :type max_pending: int, optional
+    :param timeout: seconds a request is processed for at most,
+        defaults to 30, or None for no limit
+    :type timeout: float, optional
+    :param interpolation_distance: interpolation distance of the
+        requests that do not set it, defaults to 0.5 [meter]
+    :type interpolation_distance: float or str, optional
+    :param max_points: largest number of the points a request's border
+        is densified to, i.e. its length divided by its interpolation
+        distance, defaults to 1000000
+    :type max_points: int, optional
+    """
+
+    def __init__(
+        self,
+        workers=1,
+        max_pending=None,
+        timeout=DEFAULT_TIMEOUT,
+        interpolation_distance=0.5,
+        max_points=DEFAULT_MAX_POINTS,
+    ):
+        self.timeout = timeout
+        self.interpolation_distance = interpolation_distance
+        self.max_points = max_points
+        self._pending = threading.BoundedSemaphore(max_pending or 4 * workers)
+        self._jobs = queue.Queue()
+        self._threads = []
+        for worker in [_Worker() for _ in range(workers)]:
+            thread = threading.Thread(target=self._supervise, args=(worker,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, request, callback, block=True):
+        """Construct the centerline of the ``request`` asynchronously.
+
+        The ``callback`` is called with the response's HTTP status code
+        and the response itself from another thread, within the
+        ``timeout``.
+
+        :param request: GeoJSON-like feature
+        :type request: dict
+        :param callback: function of the status code and the response
+        :type callback: callable
+        :param block: wait until fewer than ``max_pending`` requests are
+            processed, otherwise reject the request, defaults to True
+        :type block: bool, optional
+        :return: request was accepted
+        :rtype: bool
+        """
+        if not self._pending.acquire(block):
+            return False
+
+        deadline = None
+        if self.timeout is not None:
+            deadline = timeit.default_timer() + self.timeout
+        self._jobs.put(_Job(request, callback, deadline))
+        return True
+
+    def handle(self, request):
+        """Construct the centerline of the ``request`` and wait for it.
+
+        The request is rejected right away if ``max_pending`` requests
+        are already processed, and it times out after the ``timeout``.
+
+        :param request: GeoJSON-like feature
+        :type request: dict
+        :return: HTTP status code and the response
+        :rtype: tuple
+        """
+        finished = threading.Event()
+        results = []
+
+        def callback(status, response):
+            results.append((status, response))
+            finished.set()
+
+        if not self.submit(request, callback, block=False):
+            return _get_error(request, 503, "Too many pending requests.")
+        # The workers' threads time the request out.
+        finished.wait()
+        return results[0]
+
+    def close(self):
+        """Wait for the pending requests and stop the worker processes."""
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _supervise(self, worker):
+        # Every worker process is fed by its own thread, which waits for
+        # the job's result until the job's deadline.
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                worker.stop()
+                return
+
+            try:
+                result = self._run(worker, job)
+            except Exception as error:
+                result = _get_error(job.request, 500, str(error))
+            finally:
+                self._pending.release()
+
+            try:
+                job.callback(*result)
+            except Exception:
+                logging.exception("The response could not be delivered.")
+
+    def _run(self, worker, job):
+        timeout = None
+        if job.deadline is not None:
+            timeout = job.deadline - timeit.default_timer()
+        if timeout is not None and timeout <= 0:
+            # The request is not processed once it has timed out.
+            return _get_timeout_error(job.request)
+
+        task = (job.request, self.interpolation_distance, self.max_points)
+        result = worker.run(task, timeout)
+        if result is None:
+            return _get_timeout_error(job.request)
+        return result
+
+
+class _Job(object):
+    def __init__(self, request, callback, deadline):
+        self.request = request
+        self.callback = callback
+        self.deadline = deadline
+
+
+class _Worker(object):
+    # Worker process, which is replaced by a new one if it does not
+    # finish its task in time.
+
+    def __init__(self):
+        self._start()
+
+    def run(self, task, timeout):
+        """Run the ``task`` and get its result, or None if it is not
+        finished within the ``timeout``."""
+        if self._is_stopped:
+            self._start()
+        try:
+            # A process that dies while it warms up is replaced as well.
+            self._wait_until_ready()
+            self._connection.send(task)
+            if self._connection.poll(timeout):
+                return self._connection.recv()
+        except (EOFError, IOError):
+            self._terminate()
+            return _get_error(task[0], 500, "The worker has crashed.")
+
+        # The replacement is only started when it is needed, so that the
+        # task's response is not delayed.
+        self._terminate()
+        return None
+
+    def stop(self):
+        if self._is_stopped:
+            return
+        try:
+            self._connection.send(None)
+        except (EOFError, IOError):
+            pass
+        self._process.join()
+        self._connection.close()
+        self._is_stopped = True
+
+    def _start(self):
+        self._connection, worker_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve_tasks, args=(worker_connection,)
+        )
+        self._process.daemon = True
+        self._process.start()
+        worker_connection.close()
+        self._is_ready = False
+        self._is_stopped = False
+
+    def _terminate(self):
+        self._process.terminate()
+        self._process.join()
+        self._connection.close()
+        self._is_stopped = True
+
+    def _wait_until_ready(self):
+        # The new process announces that it has warmed up, so that the
+        # warm-up does not count toward the task's timeout.
+        if not self._is_ready:
+            self._connection.recv()
+            self._is_ready = True
+
+
+def serve_json_lines(service, input_file, output_file):
+    """Read a JSON request from every line of the ``input_file`` and
+    write the responses as JSON lines to the ``output_file``.
+
+    The requests are processed concurrently, so the responses are
+    written in the order they are completed in and have to be matched
+    to the requests by their ``id``. The ``input_file`` is not read
+    ahead while ``max_pending`` requests are processed.
+
+    :param service: service that processes the requests
+    :type service: :py:class:`CenterlineService`
+    :param input_file: file of the requests
+    :type input_file: file
+    :param output_file: file of the responses
+    :type output_file: file
+    """
+    lock = threading.Lock()
+
+    def write(status, response):
+        with lock:
+            output_file.write(json.dumps(response) + "\n")
+            output_file.flush()
+
+    for line in input_file:
+        if not line.strip():
+            continue
+
+        request, error = _parse_request(line)
+        if error is not None:
+            write(*error)
+        else:
+            service.submit(request, write)
+
+    service.close()
+
+
+def create_http_server(service, host="127.0.0.1", port=0):
+    """Create an HTTP server of the ``service``.
+
+    The requests are POSTed as JSON to any path, and the responses are
+    returned as JSON with their status codes: 400 if the request is
+    invalid, 422 if its centerline cannot be constructed, 503 if too
+    many requests are pending and 504 if the request has timed out.
+    ``GET /health`` responds once the server is running.
+
+    :param service: service that processes the requests
+    :type service: :py:class:`CenterlineService`
+    :param host: host the server listens on, defaults to 127.0.0.1
+    :type host: str, optional
+    :param port: port the server listens on, defaults to 0, i.e. any
+        free port, which is available as ``server.server_port``
+    :type port: int, optional
+    :return: server, which is started with ``serve_forever``
+    :rtype: :py:class:`http.server.HTTPServer`
+    """
+    server = _ThreadingHTTPServer((host, port), _RequestHandler)
+    server.service = service
+    return server
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/health":
+            self._respond(200, {"status": "ok"})
+        else:
+            self._respond(404, {"error": "Not found."})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be read, so the connection is not reused.
+            self.close_connection = True
+            self._respond(*_get_error({}, 400, "Invalid Content-Length."))
+            return
+
+        request, error = _parse_request(self.rfile.read(length))
+        if error is None:
+            self._respond(*self.server.service.handle(request))
+        else:
+            self._respond(*error)
+
+    def _respond(self, status, response):
+        body = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(format, *args)
+
+
+def _parse_request(data):
+    try:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        request = json.loads(data)
+    except ValueError as error:
+        # The invalid UTF-8 is a ValueError as well.
+        return None, _get_error({}, 400, "Invalid JSON: {}".format(error))
+
+    if not isinstance(request, dict):
+        return None, _get_error({}, 400, "The request must be an object.")
+    return request, None
+
+
+def _get_error(request, status, message):
+    return status, {"id": request.get("id"), "error": message}
+
+
+def _get_timeout_error(request):
+    return _get_error(request, 504, "The request has timed out.")
+
+
+def _serve_tasks(connection):
+    _warm_up()
+    connection.send(None)
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        connection.send(_construct_response(*task))
+
+
+def _warm_up():
+    # SciPy is imported and the whole construction runs once before the
+    # first request arrives.
+    CenterlineBuilder(Polygon([(0, 0), (0, 4), (4, 4), (4, 0)])).build()
+
+
+def _construct_response(
+    request, interpolation_distance, max_points=DEFAULT_MAX_POINTS
+):
+    options = {"interpolation_distance": interpolation_distance}
+    options.update(
+        (name, request[name]) for name in REQUEST_OPTIONS if name in request
+    )
+
+    try:
+        input_geometry = shape(request["geometry"])
+        if not _has_valid_interpolation_distance(
+            input_geometry, options["interpolation_distance"], max_points
+        ):
+            return _get_error(
+                request,
+                400,
+                "The interpolation_distance must be positive, and it must "
+                "not densify the border to more than {} points.".format(
+                    max_points
+                ),
+            )
+        builder = CenterlineBuilder(input_geometry, **options)
+        result = builder.build()
+    except (CenterlineError, _import_qhull_error()) as error:
+        # Qhull fails if there are too few points for a Voronoi diagram.
+        return _get_error(request, 422, str(error))
+    except (AttributeError, KeyError, TypeError, ValueError) as error:
+        return _get_error(request, 400, "Invalid request: {!r}".format(error))
+    except Exception as error:
+        # The workers must always respond, e.g. to Qhull's errors.
+        return _get_error(request, 500, str(error))
+
+    response = {"id": request.get("id"), "geometry": mapping(result)}
+    if "properties" in request:
+        response["properties"] = request["properties"]
+    return 200, response
+
+
+def _has_valid_interpolation_distance(
+    input_geometry, interpolation_distance, max_points
+):
+    if interpolation_distance == AUTO_INTERPOLATION_DISTANCE:
+        return True
+
+    interpolation_distance = abs(float(interpolation_distance))
+    # The NaN is neither positive nor too small.
+    return interpolation_distance > 0 and (
+        input_geometry.length <= max_points * interpolation_distance
+    )
+
+
+class PositiveFloat(click.ParamType):
+    """Number that is greater than zero."""
+
+    name = "float"
+
+    def convert(self, value, param, ctx):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            self.fail("{!r} is not a number".format(value), param, ctx)
+        # The NaN is not positive either.
+        if not number > 0:
+            self.fail("{!r} is not greater than 0".format(value), param, ctx)
+        return number
+
+
+@click.command()
+@click.option(
+    "--port",
+    type=click.IntRange(min=0),
+    help=(
+        "Serve the requests over HTTP on this port, instead of reading "
+        "them from the standard input"
+    ),
+)
+@click.option(
+    "--host",
+    default="127.0.0.1",
+    show_default=True,
+    help="Host the HTTP server listens on",
+)
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of the worker processes",
+)
+@click.option(
+    "--max-pending",
+    type=click.IntRange(min=1),
+    help=(
+        "Maximum number of the requests processed at once, defaults to "
+        "four times the number of the workers"
+    ),
+)
+@click.option(
+    "--timeout",
+    default=DEFAULT_TIMEOUT,
+    show_default=True,
+    type=PositiveFloat(),
+    help=(
+        "Seconds a request is processed for at most, after which its "
+        "worker is replaced"
+    ),
+)
+@click.option(
+    "--interpolation-distance",
+    default=0.5,
+    show_default=True,
+    type=InterpolationDistance(),
+    help="Interpolation distance of the requests that do not set it",
+)
+@click.option(
+    "--max-points",
+    default=DEFAULT_MAX_POINTS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help=(
+        "Reject the requests whose interpolation distance densifies "
+        "their border to more points"
+    ),
+)
+def serve_centerlines(
+    port=None,
+    host="127.0.0.1",
+    workers=1,
+    max_pending=None,
+    timeout=DEFAULT_TIMEOUT,
+    interpolation_distance=0.5,
+    max_points=DEFAULT_MAX_POINTS,
+):
+    """Serve the centerlines of the GeoJSON polygons from a pool of
+    warm worker processes.
+
+    By default, a JSON request is read from every line of the standard
+    input and its response is written as a JSON line to the standard
+    output, as soon as it is ready. If the ``port`` is set, the
+    requests are POSTed to an HTTP server instead.
+
+    A request is a GeoJSON feature, which may also set the
+    ``interpolation_distance``, the ``min_branch_length``, the
+    ``simplify_tolerance`` and the ``engine``. Its ``id`` and
+    ``properties`` are copied to the response, which has either the
+    centerline's ``geometry`` or an ``error``.
+
+    :param port: port of the HTTP server, defaults to None
+    :type port: int, optional
+    :param host: host of the HTTP server, defaults to 127.0.0.1
+    :type host: str, optional
+    :param workers: number of the worker processes, defaults to 1
+    :type workers: int, optional
+    :param max_pending: maximum number of the requests processed at
+        once, defaults to four times the number of ``workers``
+    :type max_pending: int, optional
+    :param timeout: seconds a request is processed for at most,
+        defaults to 30
+    :type timeout: float, optional
+    :param interpolation_distance: default interpolation distance,
+        defaults to 0.5 [meter]
+    :type interpolation_distance: float or str, optional
+    :param max_points: largest number of the points a request's border
+        is densified to, defaults to 1000000
+    :type max_points: int, optional
+    """
+    service = CenterlineService(
+        workers, max_pending, timeout, interpolation_distance, max_points
+    )
+    if port is None:
+        serve_json_lines(service, click.get_text_stream("stdin"), sys.stdout)
+        return
+
+    server = create_http_server(service, host, port)
+    click.echo(
+        "Serving on http://{}:{}".format(host, server.server_port), err=True
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    serve_centerlines()
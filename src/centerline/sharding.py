@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from numpy import (
+    array_split,
+    asarray,
+    float64,
+    int64,
+    isfinite,
+    lexsort,
+    nan,
+    where,
+    zeros,
+)
+from shapely.geometry import shape
+
+
+# Number of the bits of each coordinate on the Hilbert curve's grid.
+HILBERT_ORDER = 16
+
+
+def get_spatial_shard_ids(features, index, count):
+    """Get the FIDs of a spatially balanced shard of the ``features``.
+
+    The features are sorted along a Hilbert curve through the centers
+    of their bounding boxes, and split into ``count`` runs of equal
+    lengths, so that every shard gets a compact region with the same
+    number of features. The shards only depend on the features, so
+    they are the same on every machine that reads the same features.
+
+    :param features: GeoJSON-like features, each of which has an
+        ``"id"``
+    :type features: iterable
+    :param index: zero-based index of the shard
+    :type index: int
+    :param count: number of the shards
+    :type count: int
+    :return: FIDs of the shard's features
+    :rtype: set of int
+    """
+    ids = []
+    centers = []
+    for feature in features:
+        ids.append(int(feature["id"]))
+        centers.append(_get_center(feature["geometry"]))
+
+    ids = asarray(ids, dtype=int64)
+    keys = get_hilbert_keys(asarray(centers, dtype=float64).reshape(-1, 2))
+    # The ties are broken by the FIDs, so the order is deterministic.
+    order = lexsort((ids, keys))
+    return set(ids[array_split(order, count)[index]].tolist())
+
+
+def get_hilbert_keys(points, order=HILBERT_ORDER):
+    """Get the positions of the points along a Hilbert curve through
+    their bounding box.
+
+    The points are snapped to a grid of ``2 ** order`` cells in each
+    direction. The points with non-finite coordinates get the first
+    position.
+
+    :param points: coordinates of the points
+    :type points: numpy.ndarray
+    :param order: number of the bits of each coordinate, defaults to 16
+    :type order: int, optional
+    :return: positions of the points
+    :rtype: numpy.ndarray
+    """
+    size = 1 << order
+    is_finite = isfinite(points).all(axis=1)
+    cells = zeros(points.shape, dtype=int64)
+    if is_finite.any():
+        finite_points = points[is_finite]
+        min_coordinates = finite_points.min(axis=0)
+        extents = finite_points.max(axis=0) - min_coordinates
+        extents[extents == 0] = 1
+        cells[is_finite] = (
+            (finite_points - min_coordinates) / extents * (size - 1)
+        ).astype(int64)
+
+    x = cells[:, 0]
+    y = cells[:, 1]
+    keys = zeros(len(points), dtype=int64)
+    step = size // 2
+    while step > 0:
+        rx = ((x & step) > 0).astype(int64)
+        ry = ((y & step) > 0).astype(int64)
+        keys += step * step * ((3 * rx) ^ ry)
+        # The quadrant is rotated, so that the curve is continuous.
+        is_flipped = (ry == 0) & (rx == 1)
+        x = where(is_flipped, size - 1 - x, x)
+        y = where(is_flipped, size - 1 - y, y)
+        x, y = where(ry == 0, y, x), where(ry == 0, x, y)
+        step //= 2
+    return keys
+
+
+def _get_center(geometry):
+    if not geometry:
+        return nan, nan
+
+    bounds = shape(geometry).bounds
+    if not bounds:
+        # The empty geometries of Shapely 1 have no bounds.
+        return nan, nan
+    min_x, min_y, max_x, max_y = bounds
+    return (min_x + max_x) / 2, (min_y + max_y) / 2
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import heapq
+import itertools
+import timeit
+
+
+# Stages of the centerline's construction, in the order they run in.
+STAGES = ("densification", "voronoi", "ridge_filtering", "assembly")
+
+
+def measure_stage(feature_stats, stage):
+    """Measure the code run within the returned context manager as the
+    ``stage`` of the ``feature_stats``, if there are any.
+
+    :param feature_stats: statistics the stage is recorded in, or
+        ``None``
+    :type feature_stats: :py:class:`FeatureStats`
+    :param stage: stage's name
+    :type stage: str
+    :rtype: context manager
+    """
+    if feature_stats is None:
+        return _NoMeasurement()
+    return feature_stats.measure(stage)
+
+
+class FeatureStats(object):
+    """Statistics of a single centerline's construction.
+
+    The durations and the peak memory allocations are recorded for every
+    stage in :py:data:`STAGES`. If the stages run several times, e.g.
+    while the interpolation distance is searched for, their durations
+    are summed up, the largest peak is kept, and the counts are those
+    of the last run. The ``fallbacks`` count the constructions with the
+    Delaunay engine that fell back to the Voronoi diagram.
+
+    :param feature_id: ID of the input feature, defaults to None
+    :type feature_id: str or int, optional
+    :param trace_memory: trace the peak memory allocations with
+        :py:mod:`tracemalloc`, which slows the stages down, defaults to
+        False
+    :type trace_memory: bool, optional
+    """
+
+    __slots__ = (
+        "feature_id",
+        "trace_memory",
+        "points",
+        "ridges",
+        "kept_ridges",
+        "fallbacks",
+        "durations",
+        "peak_bytes",
+    )
+
+    def __init__(self, feature_id=None, trace_memory=False):
+        self.feature_id = feature_id
+        self.trace_memory = trace_memory
+        self.points = 0
+        self.ridges = 0
+        self.kept_ridges = 0
+        self.fallbacks = 0
+        self.durations = {}
+        self.peak_bytes = {}
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    @property
+    def total_duration(self):
+        """Sum of the stages' durations [second].
+
+        :rtype: float
+        """
+        return sum(self.durations.values())
+
+    def add(self, feature_stats):
+        """Add the counts, the durations and the peaks of another
+        construction, e.g. of a part of a multipolygon.
+
+        :param feature_stats: statistics of the other construction
+        :type feature_stats: :py:class:`FeatureStats`
+        """
+        self.points += feature_stats.points
+        self.ridges += feature_stats.ridges
+        self.kept_ridges += feature_stats.kept_ridges
+        self.fallbacks += feature_stats.fallbacks
+        for stage, duration in feature_stats.durations.items():
+            self.durations[stage] = self.durations.get(stage, 0) + duration
+        for stage, peak in feature_stats.peak_bytes.items():
+            self.peak_bytes[stage] = max(self.peak_bytes.get(stage, 0), peak)
+
+    def measure(self, stage):
+        """Measure the code run within the returned context manager as
+        the ``stage``.
+
+        :param stage: stage's name
+        :type stage: str
+        :rtype: context manager
+        """
+        return _StageMeasurement(self, stage)
+
+    def to_dict(self):
+        """Convert the statistics to a JSON serializable dictionary.
+
+        :rtype: dict
+        """
+        return {
+            "feature_id": self.feature_id,
+            "points": self.points,
+            "ridges": self.ridges,
+            "kept_ridges": self.kept_ridges,
+            "fallbacks": self.fallbacks,
+            "durations": dict(self.durations),
+            "peak_bytes": dict(self.peak_bytes),
+            "total_duration": self.total_duration,
+        }
+
+
+class _StageMeasurement(object):
+    def __init__(self, feature_stats, stage):
+        self._feature_stats = feature_stats
+        self._stage = stage
+        self._started_tracing = False
+        self._traced_bytes = 0
+
+    def __enter__(self):
+        if self._feature_stats.trace_memory:
+            import tracemalloc
+
+            # The caller's tracing is left running, and only its peak is
+            # reset where it can be (Python 3.9+).
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            self._traced_bytes = tracemalloc.get_traced_memory()[0]
+        self._start = timeit.default_timer()
+
+    def __exit__(self, *args):
+        duration = timeit.default_timer() - self._start
+        durations = self._feature_stats.durations
+        durations[self._stage] = durations.get(self._stage, 0) + duration
+
+        if self._feature_stats.trace_memory:
+            import tracemalloc
+
+            _, peak = tracemalloc.get_traced_memory()
+            if self._started_tracing:
+                tracemalloc.stop()
+            # Only the memory allocated within the stage is counted.
+            peak = max(peak - self._traced_bytes, 0)
+            peak_bytes = self._feature_stats.peak_bytes
+            peak_bytes[self._stage] = max(peak_bytes.get(self._stage, 0), peak)
+
+
+class _NoMeasurement(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+
+class CenterlineStats(object):
+    """Aggregated statistics of many centerlines' construction.
+
+    Only the totals and the ``slowest_count`` slowest features are kept,
+    so the memory usage does not depend on the number of the features.
+
+    :param trace_memory: trace the peak memory allocations of the
+        stages, defaults to False
+    :type trace_memory: bool, optional
+    :param slowest_count: number of the slowest features that are kept,
+        defaults to 10
+    :type slowest_count: int, optional
+    """
+
+    def __init__(self, trace_memory=False, slowest_count=10):
+        self.trace_memory = trace_memory
+        self.slowest_count = slowest_count
+        self.features = 0
+        self.points = 0
+        self.ridges = 0
+        self.kept_ridges = 0
+        self.fallbacks = 0
+        self.durations = dict.fromkeys(STAGES, 0.0)
+        self.peak_bytes = dict.fromkeys(STAGES, 0)
+        self._slowest = []
+        # Breaks the ties between equally slow features.
+        self._counter = itertools.count()
+
+    def create_feature_stats(self, feature_id=None):
+        """Create the statistics of a feature with the same options.
+
+        :param feature_id: ID of the input feature, defaults to None
+        :type feature_id: str or int, optional
+        :rtype: :py:class:`FeatureStats`
+        """
+        return FeatureStats(feature_id, trace_memory=self.trace_memory)
+
+    def add(self, feature_stats):
+        """Add the statistics of a feature.
+
+        :param feature_stats: feature's statistics
+        :type feature_stats: :py:class:`FeatureStats`
+        """
+        self.features += 1
+        self.points += feature_stats.points
+        self.ridges += feature_stats.ridges
+        self.kept_ridges += feature_stats.kept_ridges
+        self.fallbacks += feature_stats.fallbacks
+        for stage, duration in feature_stats.durations.items():
+            self.durations[stage] = self.durations.get(stage, 0) + duration
+        for stage, peak in feature_stats.peak_bytes.items():
+            self.peak_bytes[stage] = max(self.peak_bytes.get(stage, 0), peak)
+
+        item = (
+            feature_stats.total_duration,
+            next(self._counter),
+            feature_stats,
+        )
+        if len(self._slowest) < self.slowest_count:
+            heapq.heappush(self._slowest, item)
+        elif self.slowest_count:
+            heapq.heappushpop(self._slowest, item)
+
+    @property
+    def slowest(self):
+        """Slowest features, the slowest first.
+
+        :rtype: list of :py:class:`FeatureStats`
+        """
+        return [item[-1] for item in sorted(self._slowest, reverse=True)]
+
+    def to_dict(self):
+        """Convert the statistics to a JSON serializable dictionary.
+
+        :rtype: dict
+        """
+        report = {
+            "features": self.features,
+            "points": self.points,
+            "ridges": self.ridges,
+            "kept_ridges": self.kept_ridges,
+            "fallbacks": self.fallbacks,
+            "durations": dict(self.durations),
+            "slowest": [
+                feature_stats.to_dict() for feature_stats in self.slowest
+            ],
+        }
+        if self.trace_memory:
+            report["peak_bytes"] = dict(self.peak_bytes)
+        return report
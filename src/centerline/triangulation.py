@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from numpy import (
+    arange,
+    ceil,
+    clip,
+    column_stack,
+    concatenate,
+    cumsum,
+    empty,
+    full,
+    hypot,
+    int64,
+    intp,
+    isin,
+    maximum,
+    minimum,
+    ones,
+    repeat,
+    searchsorted,
+    sort,
+    unique,
+    where,
+)
+
+from .exceptions import RefinementLimitError
+
+
+# SciPy is only imported where it is used, because importing it takes
+# longer than importing the rest of the package.
+
+# Number of times the boundary segments are split before the
+# triangulation is used as it is.
+MAX_REFINEMENT_ITERATIONS = 10
+# Boundary segments longer than this multiple of the distance to their
+# inner triangle's opposite vertex are split, so that the chords cross
+# the polygon.
+MAX_SEGMENT_ASPECT = 2.0
+# Largest number of the pieces a segment is split into at once.
+MAX_SEGMENT_PIECES = 64
+# The refined border has at most this multiple of the input vertices,
+# or the minimum number of the points, whichever is larger. Sharp
+# corners are never wide enough for their segments, so their
+# refinement would not stop otherwise.
+MAX_REFINEMENT_FACTOR = 16
+MIN_REFINEMENT_POINTS = 1000
+# Cosine of the largest angle between the two segments of an ear, i.e.
+# of a triangle cut off by a single chord, that is a corner of the
+# polygon rather than a bend of a smooth boundary (120 degrees).
+MIN_CORNER_COSINE = -0.5
+
+
+def get_ring_segments(rings):
+    """Get the vertices and the segments of the closed rings.
+
+    The repeated vertices are merged and the degenerate segments are
+    dropped, so that every vertex has a unique position.
+
+    :param rings: coordinates of the closed rings
+    :type rings: list of :py:class:`numpy.ndarray` of shape (n, 2)
+    :return: coordinates of the vertices, which are always copied, and
+        the pairs of the vertices' indices
+    :rtype: tuple of :py:class:`numpy.ndarray`
+    """
+    ring_points = []
+    ring_segments = []
+    offset = 0
+    for ring in rings:
+        # The ring's last point repeats its first one.
+        is_distinct = (ring[1:] != ring[:-1]).any(axis=1)
+        points = ring[1:][is_distinct]
+        if len(points) < 3:
+            continue
+
+        indices = offset + arange(len(points))
+        ring_points.append(points)
+        ring_segments.append(
+            column_stack((indices, concatenate((indices[1:], indices[:1]))))
+        )
+        offset += len(points)
+
+    if not ring_points:
+        return empty((0, 2)), empty((0, 2), dtype=intp)
+
+    points, indices = unique(
+        concatenate(ring_points), axis=0, return_inverse=True
+    )
+    segments = indices.reshape(-1)[concatenate(ring_segments)]
+    segments = sort(segments[segments[:, 0] != segments[:, 1]], axis=1)
+    return points, unique(segments, axis=0).reshape(-1, 2)
+
+
+def triangulate_conforming(
+    points, segments, is_inside, max_iterations=MAX_REFINEMENT_ITERATIONS
+):
+    """Triangulate the points, so that the triangles do not cross the
+    boundary segments.
+
+    The Delaunay triangulation is computed and the boundary segments
+    that are not its edges are split at their midpoints, until every
+    segment is made of the triangulation's edges. The segments that are
+    much longer than the distance to the opposite vertex of their inner
+    triangle are split as well, so that the triangles span the polygon
+    from one side to the other. The distance is measured to the segment
+    rather than to its line, so the slivers between the vertices of a
+    round cap or of another smooth curve do not count as narrow parts.
+    The number of the points therefore depends on the local feature
+    size, e.g. the polygon's width where it is narrow, not on the
+    length of its boundary, and it is bounded by a multiple of the
+    number of the input points.
+
+    :param points: coordinates of the boundary's vertices
+    :type points: :py:class:`numpy.ndarray` of shape (n, 2)
+    :param segments: pairs of the vertices' indices
+    :type segments: :py:class:`numpy.ndarray` of shape (m, 2)
+    :param is_inside: function that tests which points lie within the
+        polygon
+    :type is_inside: callable
+    :param max_iterations: number of times the segments are split at
+        most, defaults to 10
+    :type max_iterations: int, optional
+    :return: coordinates of the refined points, the triangles' vertex
+        indices, the indices of the triangles' neighbours opposite to
+        their vertices (``-1`` on the convex hull), and which triangles
+        lie within the polygon
+    :rtype: tuple of :py:class:`numpy.ndarray`
+    :raises exceptions.RefinementLimitError: the segments would have
+        to be split into too many points
+    """
+    from scipy.spatial import Delaunay
+
+    max_points = max(
+        MAX_REFINEMENT_FACTOR * len(points), MIN_REFINEMENT_POINTS
+    )
+    for iteration in range(max_iterations + 1):
+        triangulation = Delaunay(points)
+        triangles = triangulation.simplices
+        triangles_are_inside = is_inside(points[triangles].mean(axis=1))
+        if iteration == max_iterations:
+            break
+
+        pieces = _get_segment_pieces(
+            points, segments, triangles, triangles_are_inside
+        )
+        if (pieces == 1).all():
+            break
+        if len(points) + (pieces - 1).sum() > max_points:
+            raise RefinementLimitError
+        points, segments = _split_segments(points, segments, pieces)
+
+    return points, triangles, triangulation.neighbors, triangles_are_inside
+
+
+def get_chordal_axis(points, triangles, neighbours, triangles_are_inside):
+    """Get the chordal axis of the triangles that lie within the
+    polygon.
+
+    The chords are the triangles' edges between two inner triangles.
+    The ears, i.e. the triangles cut off by a single chord, are left
+    out first, so that the axis does not branch toward every vertex of
+    a smooth boundary. The midpoints of the two chords of a triangle
+    are then connected, and the midpoints of the chords of a triangle
+    with three or only one chord are connected to its centroid.
+
+    :param points: coordinates of the triangles' vertices
+    :type points: :py:class:`numpy.ndarray` of shape (n, 2)
+    :param triangles: triangles' vertex indices
+    :type triangles: :py:class:`numpy.ndarray` of shape (m, 3)
+    :param neighbours: indices of the neighbours opposite to the
+        triangles' vertices, ``-1`` where there is none
+    :type neighbours: :py:class:`numpy.ndarray` of shape (m, 3)
+    :param triangles_are_inside: which triangles lie within the polygon
+    :type triangles_are_inside: :py:class:`numpy.ndarray` of bool
+    :return: coordinates of the axis' vertices, and the pairs of their
+        indices
+    :rtype: tuple of :py:class:`numpy.ndarray`
+    """
+    neighbours = neighbours[triangles_are_inside]
+    triangles = triangles[triangles_are_inside]
+    is_chord = (neighbours != -1) & triangles_are_inside[
+        where(neighbours == -1, 0, neighbours)
+    ]
+
+    starts, ends = _get_edges(triangles)
+    keys = _get_edge_keys(starts, ends, len(points))
+    is_ear = is_chord.sum(axis=1) == 1
+    is_chord &= ~isin(keys, keys[is_ear][is_chord[is_ear]])
+
+    chord_keys, first_indices, chord_indices = unique(
+        keys[is_chord], return_index=True, return_inverse=True
+    )
+    midpoints = (
+        points[starts[is_chord][first_indices]]
+        + points[ends[is_chord][first_indices]]
+    ) / 2
+    # Every chord is a vertex of the axis, and it is shared by the two
+    # triangles on its sides.
+    chord_vertices = full(triangles.shape, -1, dtype=intp)
+    chord_vertices[is_chord] = chord_indices.reshape(-1)
+
+    chord_counts = is_chord.sum(axis=1)
+    sleeve_chords = sort(chord_vertices[chord_counts == 2], axis=1)[:, 1:]
+
+    is_centred = (chord_counts == 1) | (chord_counts == 3)
+    centroids = points[triangles[is_centred]].mean(axis=1)
+    centroid_vertices = len(midpoints) + arange(len(centroids))
+    centred_chords = chord_vertices[is_centred]
+    has_chord = centred_chords != -1
+    centroid_chords = column_stack(
+        (
+            repeat(centroid_vertices, has_chord.sum(axis=1)),
+            centred_chords[has_chord],
+        )
+    )
+
+    vertices = concatenate((midpoints, centroids))
+    ridges = concatenate((sleeve_chords, centroid_chords)).astype(intp)
+    return vertices, ridges.reshape(-1, 2)
+
+
+def _get_edges(triangles):
+    # The edge ``i`` of a triangle is opposite to its vertex ``i``, like
+    # its neighbour ``i``.
+    starts = triangles[:, [1, 2, 0]]
+    ends = triangles[:, [2, 0, 1]]
+    return starts, ends
+
+
+def _get_edge_keys(starts, ends, point_count):
+    starts = starts.astype(int64)
+    ends = ends.astype(int64)
+    return minimum(starts, ends) * point_count + maximum(starts, ends)
+
+
+def _get_segment_pieces(points, segments, triangles, triangles_are_inside):
+    starts, ends = _get_edges(triangles)
+    keys = _get_edge_keys(starts, ends, len(points))
+    segment_keys = _get_edge_keys(segments[:, 0], segments[:, 1], len(points))
+    lengths = hypot(*(points[segments[:, 1]] - points[segments[:, 0]]).T)
+
+    # The distance of a triangle's vertex ``i`` to its opposite edge,
+    # which is the triangle's height only if the foot of the height
+    # lies on the edge.
+    edge_starts = points[starts]
+    edges = points[ends] - edge_starts
+    offsets = points[triangles] - edge_starts
+    fractions = clip(
+        (offsets * edges).sum(axis=2)
+        / maximum((edges * edges).sum(axis=2), 1e-300),
+        0,
+        1,
+    )
+    heights = hypot(
+        *(offsets - edges * fractions[:, :, None]).transpose(2, 0, 1)
+    )
+
+    # The ears, whose two edges are segments, are as flat as the
+    # boundary is smooth, so only those in the corners tell the
+    # polygon's width.
+    is_segment = isin(keys, segment_keys)
+    segment_counts = is_segment.sum(axis=1)
+    is_measured = triangles_are_inside & (
+        (segment_counts == 1)
+        | (
+            (segment_counts == 2)
+            & _ears_are_corners(points, triangles, is_segment)
+        )
+    )
+    inner_keys = keys[is_measured][is_segment[is_measured]]
+    inner_heights = heights[is_measured][is_segment[is_measured]]
+    order = inner_keys.argsort()
+    inner_keys = inner_keys[order]
+    inner_heights = inner_heights[order]
+    positions = clip(
+        searchsorted(inner_keys, segment_keys), 0, max(len(inner_keys) - 1, 0)
+    )
+
+    pieces = ones(len(segments), dtype=intp)
+    if len(inner_keys):
+        has_inner_triangle = inner_keys[positions] == segment_keys
+        max_lengths = maximum(
+            MAX_SEGMENT_ASPECT * inner_heights[positions],
+            lengths / MAX_SEGMENT_PIECES,
+        )
+        pieces[has_inner_triangle] = ceil(
+            lengths[has_inner_triangle] / max_lengths[has_inner_triangle]
+        )
+
+    all_keys = unique(keys)
+    positions = clip(
+        searchsorted(all_keys, segment_keys), 0, len(all_keys) - 1
+    )
+    is_missing = all_keys[positions] != segment_keys
+    pieces[is_missing] = maximum(pieces[is_missing], 2)
+    return pieces
+
+
+def _ears_are_corners(points, triangles, is_segment):
+    # The apex of an ear is opposite to its only edge that is not a
+    # segment.
+    apex_indices = (~is_segment).argmax(axis=1)
+    rows = arange(len(triangles))
+    apexes = points[triangles[rows, apex_indices]]
+    first = points[triangles[rows, (apex_indices + 1) % 3]] - apexes
+    second = points[triangles[rows, (apex_indices + 2) % 3]] - apexes
+    cosines = (first * second).sum(axis=1) / maximum(
+        hypot(*first.T) * hypot(*second.T), 1e-300
+    )
+    return cosines >= MIN_CORNER_COSINE
+
+
+def _split_segments(points, segments, pieces):
+    is_split = pieces > 1
+    split_segments = segments[is_split]
+    counts = pieces[is_split] - 1
+    first_new_indices = cumsum(counts) - counts
+    segment_indices = repeat(arange(len(split_segments)), counts)
+    # Position of every new point within its segment, starting at 1.
+    steps = arange(counts.sum()) - first_new_indices[segment_indices] + 1
+
+    starts = points[split_segments[segment_indices, 0]]
+    ends = points[split_segments[segment_indices, 1]]
+    fractions = steps / pieces[is_split][segment_indices].astype(float)
+    new_points = starts + (ends - starts) * fractions[:, None]
+
+    new_indices = len(points) + arange(len(new_points))
+    previous_indices = new_indices - 1
+    is_first = steps == 1
+    previous_indices[is_first] = split_segments[
+        segment_indices[is_first], 0
+    ]
+    is_last = steps == counts[segment_indices]
+    new_segments = concatenate(
+        (
+            segments[~is_split],
+            column_stack((previous_indices, new_indices)),
+            column_stack(
+                (
+                    new_indices[is_last],
+                    split_segments[segment_indices[is_last], 1],
+                )
+            ),
+        )
+    )
+    return concatenate((points, new_points)), new_segments
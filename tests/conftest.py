@@ -68,6 +68,32 @@ def complex_polygon(create_polygon):
     return create_polygon(exterior, [interior])
 
 
+@pytest.fixture
+def star_polygon(create_polygon):
+    # A random star, whose sharp corners are never wide enough for the
+    # triangulation's boundary segments.
+    return create_polygon(
+        exterior=[
+            (4.0253601231751635, 0.5703859705694204),
+            (1.562068014756853, 0.5542590889933995),
+            (3.113170564847762, 1.1492759711918032),
+            (3.7858522578227345, 2.5149776735340494),
+            (1.8301123142678892, 2.2532055086317273),
+            (2.7774625625137714, 3.436146875038132),
+            (0.9162960481887302, 1.1637748599592062),
+            (0.6481413226338084, 4.807677677498091),
+            (-0.1395081632697132, 0.8472067331977295),
+            (-3.722534303357231, 1.2442934412931899),
+            (-1.3824615773471005, -0.26555036977668817),
+            (-0.8664743759242131, -0.5494426227010103),
+            (-1.1883000889261148, -2.771621714897366),
+            (-0.3105814415515518, -1.9014015291528985),
+            (0.3221033525278743, -1.4663800898073003),
+            (1.376578019259738, -2.058125445216936),
+        ]
+    )
+
+
 @pytest.fixture
 def create_polygon():
     def _create_polygon(exterior, holes=None):
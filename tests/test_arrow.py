@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import logging
+
+import pytest
+
+from click.testing import CliRunner
+from shapely import wkb
+from shapely.geometry import Point
+
+from centerline.arrow import write_arrow_centerlines
+from centerline.cache import CenterlineCache
+from centerline.converters import create_centerlines
+from centerline.exceptions import UnsupportedGeometryEncoding
+from centerline.geometry import CenterlineBuilder
+
+
+pyarrow = pytest.importorskip("pyarrow")
+pyarrow_ipc = pytest.importorskip("pyarrow.ipc")
+pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+
+CRS = {"id": {"authority": "EPSG", "code": 3857}}
+
+
+@pytest.fixture
+def polygons(simple_polygon, complex_polygon):
+    # The point cannot be converted to a centerline.
+    return [simple_polygon, Point(0, 0), complex_polygon, None]
+
+
+@pytest.fixture
+def polygons_table(polygons):
+    geo_metadata = {
+        "version": "1.0.0",
+        "primary_column": "geom",
+        "columns": {
+            "geom": {
+                "encoding": "WKB",
+                "geometry_types": ["Polygon"],
+                "crs": CRS,
+                "bbox": [0, 0, 4, 4],
+            }
+        },
+    }
+    return pyarrow.table(
+        {
+            "id": pyarrow.array([1, 2, 3, 4]),
+            "geom": pyarrow.array(
+                [
+                    None if polygon is None else polygon.wkb
+                    for polygon in polygons
+                ],
+                type=pyarrow.binary(),
+            ),
+            "name": pyarrow.array(["a", "b", "c", "d"]),
+        }
+    ).replace_schema_metadata({b"geo": json.dumps(geo_metadata)})
+
+
+@pytest.fixture
+def parquet_file(tmp_path, polygons_table):
+    path = str(tmp_path / "polygons.parquet")
+    pyarrow_parquet.write_table(polygons_table, path, row_group_size=2)
+    return path
+
+
+def test_parquet_columns_and_metadata_are_carried_over(
+    tmp_path, parquet_file, caplog
+):
+    dst = str(tmp_path / "centerlines.parquet")
+
+    with caplog.at_level(logging.WARNING):
+        write_arrow_centerlines(parquet_file, dst, batch_size=1)
+
+    table = pyarrow_parquet.read_table(dst)
+    assert table.column_names == ["id", "geom", "name"]
+    assert table.column("id").to_pylist() == [1, 3]
+    assert table.column("name").to_pylist() == ["a", "c"]
+    for centerline_wkb in table.column("geom").to_pylist():
+        assert wkb.loads(centerline_wkb).geom_type == "MultiLineString"
+    geo_metadata = json.loads(table.schema.metadata[b"geo"])
+    assert geo_metadata["primary_column"] == "geom"
+    assert geo_metadata["columns"]["geom"] == {
+        "encoding": "WKB",
+        "geometry_types": ["MultiLineString"],
+        "crs": CRS,
+    }
+    assert len(caplog.records) == 2
+
+
+def test_arrow_ipc_centerlines_match_the_parquet_ones(
+    tmp_path, polygons_table, parquet_file
+):
+    src = str(tmp_path / "polygons.arrow")
+    with pyarrow_ipc.new_file(src, polygons_table.schema) as writer:
+        for batch in polygons_table.to_batches(max_chunksize=3):
+            writer.write_batch(batch)
+    ipc_dst = str(tmp_path / "centerlines.feather")
+    parquet_dst = str(tmp_path / "centerlines.parquet")
+
+    write_arrow_centerlines(src, ipc_dst, workers=2, ordered=False)
+    write_arrow_centerlines(parquet_file, parquet_dst)
+
+    ipc_table = pyarrow_ipc.open_file(ipc_dst).read_all()
+    parquet_table = pyarrow_parquet.read_table(parquet_dst)
+    assert ipc_table.column("id").to_pylist() == [1, 3]
+    for ipc_wkb, parquet_wkb in zip(
+        ipc_table.column("geom").to_pylist(),
+        parquet_table.column("geom").to_pylist(),
+    ):
+        assert wkb.loads(ipc_wkb).equals(wkb.loads(parquet_wkb))
+
+
+def test_centerlines_are_encoded_from_the_constructed_and_cached_ones(
+    tmp_path, parquet_file, simple_polygon, complex_polygon
+):
+    expected = [
+        CenterlineBuilder(polygon).build().geometry
+        for polygon in (simple_polygon, complex_polygon)
+    ]
+
+    with CenterlineCache(str(tmp_path / "cache.sqlite")) as cache:
+        for name in ("constructed", "cached"):
+            dst = str(tmp_path / "{}.parquet".format(name))
+            write_arrow_centerlines(parquet_file, dst, cache=cache)
+
+            centerline_wkbs = pyarrow_parquet.read_table(dst).column("geom")
+            for centerline_wkb, centerline in zip(
+                centerline_wkbs.to_pylist(), expected
+            ):
+                assert wkb.loads(centerline_wkb).equals(centerline)
+
+        assert cache.hits == 2
+
+
+def test_geometry_column_must_be_wkb_encoded(tmp_path, polygons_table):
+    src = str(tmp_path / "polygons.parquet")
+    geo_metadata = json.loads(polygons_table.schema.metadata[b"geo"])
+    geo_metadata["columns"]["geom"]["encoding"] = "polygon"
+    pyarrow_parquet.write_table(
+        polygons_table.replace_schema_metadata(
+            {b"geo": json.dumps(geo_metadata)}
+        ),
+        src,
+    )
+
+    with pytest.raises(UnsupportedGeometryEncoding):
+        write_arrow_centerlines(src, str(tmp_path / "centerlines.parquet"))
+
+
+def test_create_centerlines_converts_parquet_to_parquet(
+    tmp_path, parquet_file
+):
+    dst = str(tmp_path / "centerlines.parquet")
+
+    result = CliRunner().invoke(
+        create_centerlines, [parquet_file, dst, "--write-batch-size", "3"]
+    )
+
+    assert result.exit_code == 0
+    assert pyarrow_parquet.read_table(dst).column("id").to_pylist() == [1, 3]
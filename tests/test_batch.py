@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import numpy
+import pytest
+
+from shapely import geometry
+
+from centerline import build_centerlines
+from centerline.batch import _as_object_array, _iter_vectorized_builders
+from centerline.densification import densify_rings_uniformly
+from centerline.exceptions import InvalidInputTypeError, TooFewRidgesError
+from centerline.geometry import CenterlineBuilder
+
+
+def test_centerlines_and_errors_are_aligned_with_the_geometries(
+    simple_polygon, complex_polygon, multipolygon, point
+):
+    geometries = [
+        simple_polygon,
+        None,
+        point,
+        multipolygon,
+        geometry.Polygon(),
+        complex_polygon,
+    ]
+
+    centerlines, errors = build_centerlines(geometries, 0.5)
+
+    assert [centerline is None for centerline in centerlines] == [
+        False,
+        True,
+        True,
+        False,
+        True,
+        False,
+    ]
+    assert errors[1] is None
+    assert isinstance(errors[2], InvalidInputTypeError)
+    assert isinstance(errors[4], InvalidInputTypeError)
+    for index in (0, 3, 5):
+        assert errors[index] is None
+        expected = CenterlineBuilder(geometries[index], 0.5).build()
+        assert numpy.allclose(
+            centerlines[index].coordinates, expected.coordinates
+        )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"interpolation_distance": "auto"},
+        {"adaptive": True},
+        {"min_branch_length": 1},
+    ],
+)
+def test_builder_options_are_passed_on(complex_polygon, options):
+    centerlines, errors = build_centerlines([complex_polygon], **options)
+
+    expected = CenterlineBuilder(complex_polygon, **options).build()
+    assert numpy.allclose(centerlines[0].coordinates, expected.coordinates)
+
+
+@pytest.mark.parametrize("interpolation_distance", [0.5, "auto"])
+def test_vectorized_builders_match_the_builders(
+    simple_polygon, complex_polygon, multipolygon, interpolation_distance
+):
+    pytest.importorskip("shapely.lib")  # only exists in Shapely 2
+    geometries = _as_object_array(
+        [
+            simple_polygon,
+            multipolygon,
+            geometry.MultiPolygon([complex_polygon]),
+            complex_polygon,
+        ]
+    )
+    errors = numpy.empty(len(geometries), dtype=object)
+
+    builders = dict(
+        _iter_vectorized_builders(geometries, interpolation_distance, errors)
+    )
+
+    assert sorted(builders) == [0, 1, 2, 3]
+    assert builders[1]._input_geometry.densified_borders is None
+    assert (builders[3]._input_geometry.densified_borders is None) == (
+        interpolation_distance == "auto"
+    )
+    for index, builder in builders.items():
+        expected = CenterlineBuilder(
+            geometries[index], interpolation_distance
+        ).build()
+        assert numpy.allclose(
+            builder.build().coordinates, expected.coordinates
+        )
+
+
+def test_too_large_interpolation_distance_is_an_error(
+    simple_polygon, complex_polygon
+):
+    centerlines, errors = build_centerlines(
+        [simple_polygon, complex_polygon], 4, workers=2
+    )
+
+    assert list(centerlines) == [None, None]
+    assert all(isinstance(error, TooFewRidgesError) for error in errors)
+
+
+def test_polygon_too_small_for_a_voronoi_diagram_is_an_error():
+    centerlines, errors = build_centerlines(
+        [geometry.box(0, 0, 10, 3), geometry.box(0, 0, 0.1, 0.1)], 0.5
+    )
+
+    assert centerlines[0] is not None
+    assert errors[0] is None
+    assert centerlines[1] is None
+    assert isinstance(errors[1], TooFewRidgesError)
+
+
+def test_rings_densified_at_once_match_the_builders_densification(
+    complex_polygon,
+):
+    builder = CenterlineBuilder(complex_polygon, 0.3)
+    rings = builder._get_boundaries()
+    ring_offsets = numpy.cumsum([0] + [len(ring) for ring in rings])
+
+    points, point_offsets = densify_rings_uniformly(
+        numpy.concatenate(rings), ring_offsets, 0.3
+    )
+
+    expected = [builder._get_interpolated_boundary(ring) for ring in rings]
+    assert (
+        point_offsets.tolist()
+        == numpy.cumsum(
+            [0] + [len(ring_points) for ring_points in expected]
+        ).tolist()
+    )
+    assert numpy.allclose(
+        points - (builder._min_x, builder._min_y), numpy.concatenate(expected)
+    )
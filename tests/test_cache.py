@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import numpy
+import pytest
+
+from centerline import iter_centerlines
+from centerline.cache import CenterlineCache
+from centerline.exceptions import TooFewRidgesError
+from centerline.geometry import Centerline, CenterlineResult
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with CenterlineCache(str(tmp_path / "cache.sqlite")) as cache:
+        yield cache
+
+
+def _create_result(number_of_points):
+    coordinates = numpy.arange(2.0 * number_of_points).reshape(-1, 2)
+    return CenterlineResult.from_lines([coordinates])
+
+
+def test_cached_centerline_matches_the_constructed_one(
+    complex_polygon, cache
+):
+    centerline = Centerline(complex_polygon, _cache=cache)
+
+    cached_centerline = Centerline(complex_polygon, _cache=cache)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cached_centerline.equals(centerline)
+
+
+def test_cache_key_depends_on_the_options_but_not_the_orientation(
+    simple_polygon, create_polygon, cache
+):
+    reversed_polygon = create_polygon(simple_polygon.exterior.coords[::-1])
+
+    Centerline(simple_polygon, _cache=cache)
+    Centerline(simple_polygon, 0.25, _cache=cache)
+    Centerline(reversed_polygon, _cache=cache)
+
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_persists_between_sessions(simple_polygon, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with CenterlineCache(path) as cache:
+        Centerline(simple_polygon, _cache=cache)
+
+    with CenterlineCache(path) as cache:
+        Centerline(simple_polygon, _cache=cache)
+
+        assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_failed_centerline_is_cached(create_polygon, cache):
+    polygon = create_polygon(exterior=[[0, 0], [10, 0], [10, 10], [0, 10]])
+    with pytest.raises(TooFewRidgesError):
+        Centerline(polygon, 10, _cache=cache)
+
+    with pytest.raises(TooFewRidgesError):
+        Centerline(polygon, 10, _cache=cache)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 1
+
+
+def test_centerlines_are_committed_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with CenterlineCache(path, commit_interval=2) as cache:
+        cache.set("a", _create_result(10))
+        with CenterlineCache(path) as other_cache:
+            assert len(other_cache) == 0
+
+        cache.set("b", _create_result(10))
+        cache.set("c", _create_result(10))
+        with CenterlineCache(path) as other_cache:
+            assert len(other_cache) == 2
+
+    with CenterlineCache(path) as cache:
+        assert len(cache) == 3
+
+
+def test_least_recently_used_centerlines_are_evicted(tmp_path):
+    # Every result takes 10 points * 16 bytes + 2 offsets * 8 bytes.
+    with CenterlineCache(str(tmp_path / "cache.sqlite"), 500) as cache:
+        cache.set("a", _create_result(10))
+        cache.set("b", _create_result(10))
+        cache.get("a")
+        cache.set("c", _create_result(10))
+
+        assert len(cache) == 2
+        assert cache.size == 352
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+
+
+def test_iter_centerlines_uses_the_cache(simple_polygon, point, cache):
+    features = [(simple_polygon, {"id": 1}), (point, {"id": 2})]
+
+    list(iter_centerlines(features, cache=cache))
+    centerline_features = list(iter_centerlines(features, cache=cache))
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert centerline_features[0].properties == {"id": 1}
+    assert centerline_features[0].geometry["type"] == "MultiLineString"
+    assert centerline_features[1].error is not None
+
+
+def test_iter_centerlines_uses_the_cached_failures(create_polygon, cache):
+    polygon = create_polygon(exterior=[[0, 0], [10, 0], [10, 10], [0, 10]])
+    features = [(polygon, {"id": 1})]
+
+    list(iter_centerlines(features, 10, cache=cache))
+    (centerline_feature,) = iter_centerlines(features, 10, cache=cache)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert isinstance(centerline_feature.error, TooFewRidgesError)
+    assert centerline_feature.properties == {"id": 1}
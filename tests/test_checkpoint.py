@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import os
+
+import pytest
+
+from centerline.checkpoint import Checkpoint
+from centerline.exceptions import InvalidCheckpoint
+
+
+ARGUMENTS = {"src": "polygons.shp", "filters": {"bbox": (0, 0, 1, 1)}}
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return str(tmp_path / "centerlines.gpkg.checkpoint")
+
+
+@pytest.mark.parametrize(
+    "records,expected_position", [(2, 3), (5, 7)], ids=["before", "after"]
+)
+def test_pending_batch_is_resumed_from_the_destination_records(
+    checkpoint_path, records, expected_position
+):
+    checkpoint = Checkpoint(checkpoint_path, ARGUMENTS)
+    checkpoint.begin(3, 2)
+    checkpoint.commit()
+    # The process dies after the checkpoint of the next batch is begun,
+    # before or after the batch is written.
+    checkpoint.begin(7, 5)
+
+    resumed = Checkpoint.load(checkpoint_path, ARGUMENTS, records)
+
+    assert resumed.position == expected_position
+    assert resumed.records == records
+
+
+def test_checkpoint_must_match_the_arguments_and_the_destination(
+    checkpoint_path,
+):
+    checkpoint = Checkpoint(checkpoint_path, ARGUMENTS)
+    checkpoint.begin(3, 2)
+    checkpoint.commit()
+
+    with pytest.raises(InvalidCheckpoint, match="other arguments"):
+        Checkpoint.load(checkpoint_path, dict(ARGUMENTS, src="other.shp"), 2)
+    with pytest.raises(InvalidCheckpoint, match="has 4 centerlines"):
+        Checkpoint.load(checkpoint_path, ARGUMENTS, 4)
+
+    checkpoint.remove()
+    assert not os.path.exists(checkpoint_path)
+    with pytest.raises(InvalidCheckpoint, match="cannot be read"):
+        Checkpoint.load(checkpoint_path, ARGUMENTS, 2)
@@ -2,12 +2,22 @@
 
 from __future__ import unicode_literals
 
+import logging
+import pickle
+
+import numpy
 import pytest
 
 from shapely import geometry
 
 from centerline.exceptions import InvalidInputTypeError, TooFewRidgesError
-from centerline.geometry import Centerline
+from centerline.geometry import (
+    DELAUNAY_ENGINE,
+    Centerline,
+    CenterlineBuilder,
+    CenterlineResult,
+)
+from centerline.stats import FeatureStats
 
 
 def test_creating_centerline_from_polygon_returns_centerline(simple_polygon):
@@ -74,6 +84,29 @@ def test_creating_centerline_using_too_large_interp_dist_raises_runtimeerror(
     assert isinstance(centerline, geometry.MultiLineString)
 
 
+def test_auto_interpolation_distance_constructs_centerline(create_polygon):
+    polygon = create_polygon(exterior=[[0, 0], [10, 0], [10, 10], [0, 10]])
+
+    centerline = Centerline(polygon, "auto")
+
+    assert isinstance(centerline, Centerline)
+    assert centerline.length > 0
+
+
+def test_auto_interpolation_distance_is_halved_until_it_suits(
+    create_polygon, monkeypatch
+):
+    polygon = create_polygon(exterior=[[0, 0], [10, 0], [10, 10], [0, 10]])
+    monkeypatch.setattr(
+        Centerline, "_get_initial_interpolation_distance", lambda self: 40
+    )
+
+    centerline = Centerline(polygon, "auto")
+
+    assert centerline._interpolation_distance == 5
+    assert centerline.length == pytest.approx(Centerline(polygon, 5).length)
+
+
 def test_centerline_has_attributes_assigned_to_it(simple_polygon):
     ATTRIBUTES = {"id": 1, "name": "polygon", "valid": True}
 
@@ -86,6 +119,43 @@ def test_centerline_has_attributes_assigned_to_it(simple_polygon):
     assert centerline.valid == ATTRIBUTES.get("valid")
 
 
+def test_builder_result_matches_centerline(complex_polygon):
+    centerline = Centerline(complex_polygon)
+
+    result = CenterlineBuilder(complex_polygon).build({"id": 1})
+
+    assert isinstance(result, CenterlineResult)
+    assert result.properties == {"id": 1}
+    assert len(result) == len(centerline.geoms)
+    assert result.geometry.equals(centerline)
+    assert geometry.shape(geometry.mapping(result)).equals(centerline)
+
+
+def test_result_stores_lines_in_contiguous_arrays():
+    lines = [numpy.array([[0, 0], [1, 0]]), numpy.array([[1, 0], [1, 2]])]
+
+    result = CenterlineResult.from_lines(lines)
+
+    assert not hasattr(result, "__dict__")
+    assert result.coordinates.flags["C_CONTIGUOUS"]
+    assert result.offsets.tolist() == [0, 2, 4]
+    assert [line.tolist() for line in result] == [
+        line.tolist() for line in lines
+    ]
+
+
+def test_result_is_picklable_without_its_geometry():
+    lines = [numpy.array([[0.0, 0.0], [1.0, 0.0], [1.0, 2.0]])]
+    result = CenterlineResult.from_lines(lines, {"id": 1})
+    result.geometry
+
+    unpickled = pickle.loads(pickle.dumps(result))
+
+    assert unpickled._geometry is None
+    assert unpickled.properties == {"id": 1}
+    assert unpickled.geometry.equals(result.geometry)
+
+
 def test_centerline_has_length_greater_than_zero(complex_polygon):
     centerline = Centerline(complex_polygon)
     assert centerline.length > 0
@@ -116,6 +186,97 @@ def test_polygon_contains_the_centerline(complex_polygon):
     assert complex_polygon.contains(centerline) is True
 
 
+def test_densified_borders_match_linestring_interpolation(complex_polygon):
+    INTERPOLATION_DISTANCE = 0.3
+    centerline = Centerline(complex_polygon, INTERPOLATION_DISTANCE)
+
+    expected_points = []
+    for ring in [complex_polygon.exterior] + list(complex_polygon.interiors):
+        line = geometry.LineString(ring)
+        distance = INTERPOLATION_DISTANCE
+        expected_points.append(line.coords[0])
+        while distance < line.length:
+            expected_points.append(line.interpolate(distance).coords[0])
+            distance += INTERPOLATION_DISTANCE
+        expected_points.append(line.coords[-1])
+
+    numpy.testing.assert_allclose(
+        centerline._get_densified_borders(),
+        numpy.array(expected_points),
+        atol=1e-9,
+    )
+
+
+def test_ridge_filter_matches_exact_containment_test(complex_polygon):
+    centerline = Centerline(complex_polygon, 0.1)
+    vertices, ridges, sites = centerline._get_voronoi_vertices_and_ridges(
+        centerline._get_densified_borders()
+    )
+    restored_vertices = vertices + (centerline._min_x, centerline._min_y)
+
+    expected_ridges = [
+        tuple(ridge)
+        for ridge in ridges
+        if -1 not in ridge
+        and geometry.LineString(restored_vertices[ridge]).within(
+            complex_polygon
+        )
+    ]
+    ridges = centerline._get_ridges_within_input_geometry(
+        vertices, ridges, sites
+    )
+
+    assert sorted(map(tuple, ridges)) == sorted(expected_ridges)
+
+
+def test_adaptive_densification_uses_fewer_points(create_polygon):
+    polygon = create_polygon(exterior=[[0, 0], [100, 0], [100, 10], [0, 10]])
+    centerline = Centerline(polygon, 0.5)
+    adaptive_centerline = Centerline(polygon, 0.5, _adaptive=True)
+
+    assert len(adaptive_centerline._get_densified_borders()) < (
+        len(centerline._get_densified_borders()) / 2
+    )
+    assert polygon.contains(adaptive_centerline) is True
+    for line in adaptive_centerline.geoms:
+        for coordinates in line.coords:
+            assert centerline.distance(geometry.Point(coordinates)) < 0.5
+
+
+def test_adaptive_densification_keeps_narrow_parts_dense(create_polygon):
+    # A 40 x 40 square with a 1 x 40 channel attached to it.
+    polygon = create_polygon(
+        exterior=[
+            [0, 0],
+            [40, 0],
+            [40, 20],
+            [80, 20],
+            [80, 21],
+            [40, 21],
+            [40, 40],
+            [0, 40],
+        ]
+    )
+    centerline = Centerline(polygon, 0.1, _adaptive=True)
+
+    channel = geometry.box(45, 20, 75, 21)
+    assert centerline.intersection(channel).length > 25
+
+
+@pytest.mark.parametrize("tile_workers", [1, 2])
+def test_tiled_centerline_matches_the_untiled_one(
+    complex_polygon, tile_workers
+):
+    centerline = Centerline(complex_polygon, 0.1)
+    tiled_centerline = Centerline(
+        complex_polygon, 0.1, _tile_size=0.5, _tile_workers=tile_workers
+    )
+
+    assert isinstance(tiled_centerline, geometry.MultiLineString)
+    assert tiled_centerline.length == pytest.approx(centerline.length)
+    assert tiled_centerline.hausdorff_distance(centerline) < 1e-6
+
+
 def test_qhull_error(create_polygon):
     # https://github.com/fitodic/centerline/issues/24
     polygon = create_polygon(
@@ -327,3 +488,175 @@ def test_qhull_error(create_polygon):
 
     assert isinstance(centerline, Centerline)
     assert isinstance(centerline, geometry.MultiLineString)
+
+
+def test_attributes_named_like_the_builder_options_are_kept(
+    simple_polygon,
+):
+    attributes = {"engine": "river", "stats": "foo", "cache": None}
+
+    centerline = Centerline(simple_polygon, **attributes)
+
+    assert centerline.engine == "river"
+    assert centerline.stats == "foo"
+    assert centerline.cache is None
+    assert centerline.equals(Centerline(simple_polygon))
+
+
+def test_pruned_centerline_has_fewer_lines(complex_polygon):
+    centerline = CenterlineBuilder(complex_polygon).build()
+    pruned = CenterlineBuilder(complex_polygon, min_branch_length=2).build()
+
+    assert len(pruned) < len(centerline)
+    assert complex_polygon.contains(pruned.geometry)
+
+
+def test_centerline_from_arrays_matches_the_polygons_one(complex_polygon):
+    exterior = numpy.array(complex_polygon.exterior.coords)
+    holes = [numpy.array(complex_polygon.interiors[0].coords)[:-1]]
+
+    centerline = Centerline.from_arrays(exterior, holes, id=1)
+
+    assert centerline.id == 1
+    assert centerline.equals(Centerline(complex_polygon))
+
+
+def test_builder_from_arrays_does_not_copy_a_memory_map(
+    tmp_path, simple_polygon
+):
+    path = str(tmp_path / "exterior.npy")
+    numpy.save(path, numpy.array(simple_polygon.exterior.coords))
+    exterior = numpy.load(path, mmap_mode="r")
+
+    builder = CenterlineBuilder.from_arrays(exterior, interpolation_distance=1)
+
+    assert numpy.shares_memory(builder._get_boundaries()[0], exterior)
+    assert builder.build().geometry.equals(
+        CenterlineBuilder(simple_polygon, 1).build().geometry
+    )
+
+
+@pytest.mark.parametrize(
+    "exterior", [numpy.arange(4.0), numpy.array([[0, 0], [1, 1], [0, 0]])]
+)
+def test_builder_from_invalid_arrays_raises_error(exterior):
+    with pytest.raises(InvalidInputTypeError):
+        CenterlineBuilder.from_arrays(exterior)
+
+
+def test_delaunay_centerline_is_close_to_the_voronoi_one(create_polygon):
+    # A 2 x 40 channel with a 2 x 20 branch, whose border has no
+    # intermediate vertices.
+    polygon = create_polygon(
+        exterior=[
+            [0, 0],
+            [40, 0],
+            [40, 2],
+            [21, 2],
+            [21, 22],
+            [19, 22],
+            [19, 2],
+            [0, 2],
+        ]
+    )
+    centerline = Centerline(polygon, 0.1, _min_branch_length=2)
+    delaunay_centerline = Centerline(
+        polygon, 0.1, _min_branch_length=2, _engine=DELAUNAY_ENGINE
+    )
+
+    assert polygon.contains(delaunay_centerline) is True
+    # The chordal axis stops short of the ends, by about the width.
+    assert delaunay_centerline.length == pytest.approx(
+        centerline.length, abs=6 * 2
+    )
+    for line in delaunay_centerline.geoms:
+        for coordinates in line.coords:
+            assert centerline.distance(geometry.Point(coordinates)) < 0.5
+
+
+def test_delaunay_centerline_of_a_polygon_with_holes(complex_polygon):
+    centerline = Centerline(complex_polygon, _engine=DELAUNAY_ENGINE)
+
+    assert centerline.is_valid
+    assert complex_polygon.contains(centerline) is True
+
+
+def test_delaunay_engine_is_a_part_of_the_cache_key(simple_polygon):
+    builder = CenterlineBuilder(simple_polygon)
+    delaunay_builder = CenterlineBuilder(
+        simple_polygon, engine=DELAUNAY_ENGINE
+    )
+
+    assert builder.get_cache_key() != delaunay_builder.get_cache_key()
+
+
+def test_unknown_engine_raises_error(simple_polygon):
+    with pytest.raises(ValueError):
+        CenterlineBuilder(simple_polygon, engine="skeleton")
+
+
+@pytest.mark.parametrize("part_workers", [1, 2])
+def test_multipolygon_parts_are_constructed_separately(
+    multipolygon, part_workers
+):
+    centerline = Centerline(multipolygon, _part_workers=part_workers)
+
+    assert centerline.equals(
+        geometry.MultiLineString(
+            [
+                line
+                for polygon in multipolygon.geoms
+                for line in Centerline(polygon).geoms
+            ]
+        )
+    )
+    for line in centerline.geoms:
+        assert any(polygon.contains(line) for polygon in multipolygon.geoms)
+
+
+def test_multipolygon_parts_without_a_centerline_are_left_out(multipolygon):
+    sliver = geometry.Polygon([[20, 0], [20.01, 0], [20, 0.01]])
+    polygon = geometry.MultiPolygon(list(multipolygon.geoms) + [sliver])
+
+    centerline = Centerline(polygon, 1)
+
+    assert centerline.equals(Centerline(multipolygon, 1))
+    with pytest.raises(TooFewRidgesError):
+        Centerline(geometry.MultiPolygon([sliver, sliver]), 1)
+
+
+def test_delaunay_engine_falls_back_to_the_voronoi_diagram(
+    star_polygon, caplog
+):
+    stats = FeatureStats()
+
+    with caplog.at_level(logging.WARNING):
+        centerline = Centerline(
+            star_polygon, _engine=DELAUNAY_ENGINE, _stats=stats
+        )
+
+    voronoi_centerline = Centerline(star_polygon)
+    assert centerline.equals(voronoi_centerline)
+    assert stats.points == len(voronoi_centerline._get_densified_borders())
+    assert stats.fallbacks == 1
+    assert "Voronoi" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "polygon",
+    [
+        geometry.LineString([(0, 0), (1000, 0)]).buffer(8),
+        geometry.Point(0, 0).buffer(20),
+        geometry.LineString(
+            [(x, 60 * numpy.sin(x / 40.0)) for x in range(0, 1001, 2)]
+        ).buffer(8),
+    ],
+    ids=["round_caps", "disc", "round_river"],
+)
+def test_delaunay_engine_handles_round_borders(polygon):
+    stats = FeatureStats()
+
+    centerline = Centerline(polygon, _engine=DELAUNAY_ENGINE, _stats=stats)
+
+    assert stats.fallbacks == 0
+    assert polygon.contains(centerline) is True
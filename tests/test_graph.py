@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import numpy
+
+from centerline.graph import RidgeGraph
+
+
+def _as_sets(polylines):
+    return sorted(
+        sorted(tuple(map(tuple, polyline.tolist())))
+        for polyline in polylines
+    )
+
+
+def test_path_is_walked_into_a_single_polyline():
+    vertices = numpy.array([[0, 0], [1, 0], [2, 0], [3, 0]], dtype=float)
+    edges = numpy.array([[2, 3], [0, 1], [1, 2]])
+
+    polylines = RidgeGraph(vertices, edges).get_polylines()
+
+    assert len(polylines) == 1
+    assert polylines[0].tolist() in (
+        vertices.tolist(),
+        vertices[::-1].tolist(),
+    )
+
+
+def test_polylines_are_split_at_junctions():
+    vertices = numpy.array(
+        [[0, 0], [1, 0], [2, 0], [3, 1], [4, 1], [3, -1]], dtype=float
+    )
+    edges = numpy.array([[0, 1], [1, 2], [2, 3], [3, 4], [2, 5]])
+
+    polylines = RidgeGraph(vertices, edges).get_polylines()
+
+    assert _as_sets(polylines) == _as_sets(
+        [vertices[[0, 1, 2]], vertices[[2, 3, 4]], vertices[[2, 5]]]
+    )
+
+
+def test_loop_is_walked_into_a_closed_polyline():
+    vertices = numpy.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=float)
+    edges = numpy.array([[0, 1], [1, 2], [2, 3], [3, 0]])
+
+    polylines = RidgeGraph(vertices, edges).get_polylines()
+
+    assert len(polylines) == 1
+    assert len(polylines[0]) == 5
+    assert polylines[0][0].tolist() == polylines[0][-1].tolist()
+
+
+def test_coincident_vertices_and_duplicate_edges_are_merged():
+    vertices = numpy.array([[0, 0], [1, 0], [1, 0], [2, 0]], dtype=float)
+    edges = numpy.array([[0, 1], [1, 2], [2, 3], [3, 2], [1, 0]])
+
+    polylines = RidgeGraph(vertices, edges).get_polylines()
+
+    assert _as_sets(polylines) == _as_sets([vertices[[0, 1, 3]]])
+
+
+def test_short_spur_is_pruned():
+    vertices = numpy.array(
+        [[0, 0], [5, 0], [10, 0], [5, 1], [5, 2]], dtype=float
+    )
+    edges = numpy.array([[0, 1], [1, 2], [1, 3], [3, 4]])
+
+    polylines = RidgeGraph(vertices, edges).prune(3).get_polylines()
+
+    assert _as_sets(polylines) == _as_sets([vertices[[0, 1, 2]]])
+
+
+def test_pruning_keeps_two_branches_of_a_junction():
+    vertices = numpy.array([[0, 0], [1, 0], [2, 0], [1, 1]], dtype=float)
+    edges = numpy.array([[0, 1], [1, 2], [1, 3]])
+
+    polylines = RidgeGraph(vertices, edges).prune(10).get_polylines()
+
+    assert len(polylines) == 1
+    assert len(polylines[0]) == 3
+
+
+def test_simplification_keeps_the_ends_and_the_junctions():
+    vertices = numpy.array(
+        [[0, 0], [1, 0.01], [2, 0], [3, 1], [4, 2.01], [5, 3], [2, -1]],
+        dtype=float,
+    )
+    edges = numpy.array([[0, 1], [1, 2], [2, 3], [3, 4], [4, 5], [2, 6]])
+
+    polylines = RidgeGraph(vertices, edges).get_polylines(
+        simplify_tolerance=0.1
+    )
+
+    assert _as_sets(polylines) == _as_sets(
+        [vertices[[0, 2]], vertices[[2, 5]], vertices[[2, 6]]]
+    )
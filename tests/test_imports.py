@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import subprocess
+import sys
+
+import pytest
+
+
+HEAVY_MODULES = ("scipy", "fiona", "osgeo", "pyarrow")
+
+
+@pytest.mark.parametrize(
+    "module", ["centerline", "centerline.geometry", "centerline.converters"]
+)
+def test_importing_does_not_import_heavy_dependencies(module):
+    code = (
+        "import sys\n"
+        "import {}\n"
+        "print(' '.join(name for name in {!r} if name in sys.modules))"
+    ).format(module, list(HEAVY_MODULES))
+
+    output = subprocess.check_output([sys.executable, "-c", code])
+
+    assert output.decode().split() == []
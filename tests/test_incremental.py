@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from shapely import geometry
+
+from centerline import iter_centerlines
+from centerline.incremental import PreviousOutput, iter_incremental_centerlines
+
+
+def _create_features(polygons):
+    return [
+        {
+            "id": str(index),
+            "geometry": geometry.mapping(polygon),
+            "properties": {"name": name},
+        }
+        for index, (name, polygon) in enumerate(polygons)
+    ]
+
+
+def _create_destination(features):
+    return [
+        {
+            "id": str(index),
+            "geometry": feature.geometry,
+            "properties": feature.properties,
+        }
+        for index, feature in enumerate(iter_centerlines(features))
+    ]
+
+
+def test_unchanged_centerlines_are_reused(create_polygon):
+    square = create_polygon([[0, 0], [0, 4], [4, 4], [4, 0]])
+    rectangle = create_polygon([[0, 0], [0, 4], [8, 4], [8, 0]])
+    previous_features = _create_features(
+        [("a", square), ("b", square), ("c", square)]
+    )
+    features = _create_features(
+        [("a", square), ("b", rectangle), ("d", square)]
+    )
+    previous_output = PreviousOutput(
+        previous_features, _create_destination(previous_features)
+    )
+
+    centerline_features = list(
+        iter_incremental_centerlines(features, previous_output)
+    )
+
+    assert [feature.index for feature in centerline_features] == [0, 1, 2]
+    assert [feature.properties["name"] for feature in centerline_features] == [
+        "a",
+        "b",
+        "d",
+    ]
+    assert previous_output.reused == 1
+    assert previous_output.recomputed == 2
+    assert previous_output.deleted == 0
+    assert geometry.shape(centerline_features[1].geometry).length > (
+        geometry.shape(centerline_features[0].geometry).length
+    )
+
+
+def test_centerlines_with_ambiguous_properties_are_recomputed(
+    simple_polygon,
+):
+    previous_features = _create_features(
+        [("a", simple_polygon), ("a", simple_polygon)]
+    )
+    previous_output = PreviousOutput(
+        previous_features, _create_destination(previous_features)
+    )
+
+    list(iter_incremental_centerlines(previous_features[:1], previous_output))
+
+    assert previous_output.reused == 0
+    assert previous_output.recomputed == 1
+    assert previous_output.deleted == 1
+    assert previous_output.unmatched == 1
+
+
+def test_centerlines_with_duplicate_properties_are_found_by_fid_field(
+    simple_polygon,
+):
+    previous_features = _create_features(
+        [("a", simple_polygon), ("a", simple_polygon)]
+    )
+    destination = _create_destination(previous_features)
+    for record in destination:
+        record["properties"]["fid"] = int(record["id"])
+    previous_output = PreviousOutput(
+        previous_features, destination, fid_field="fid"
+    )
+
+    centerline_features = list(
+        iter_incremental_centerlines(previous_features, previous_output)
+    )
+
+    assert previous_output.reused == 2
+    assert previous_output.recomputed == 0
+    assert previous_output.unmatched == 0
+    assert [feature.properties["fid"] for feature in centerline_features] == [
+        0,
+        1,
+    ]
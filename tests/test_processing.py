@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import itertools
+
+import pytest
+
+from shapely import geometry
+
+from centerline import CenterlineFeature, iter_centerlines
+from centerline.exceptions import InvalidInputTypeError, TooFewRidgesError
+
+
+def test_iter_centerlines_accepts_geometry_and_properties_pairs(
+    simple_polygon,
+):
+    features = [(simple_polygon, {"id": 1})]
+
+    centerline_features = list(iter_centerlines(features))
+
+    assert len(centerline_features) == 1
+    assert isinstance(centerline_features[0], CenterlineFeature)
+    assert centerline_features[0].error is None
+    assert centerline_features[0].properties == {"id": 1}
+    assert centerline_features[0].geometry["type"] == "MultiLineString"
+
+
+def test_iter_centerlines_accepts_geojson_like_features(simple_polygon):
+    features = [
+        {
+            "type": "Feature",
+            "geometry": geometry.mapping(simple_polygon),
+            "properties": {"id": 1},
+        }
+    ]
+
+    centerline_features = list(iter_centerlines(features))
+
+    assert centerline_features[0].error is None
+    assert centerline_features[0].properties == {"id": 1}
+
+
+def test_iter_centerlines_yields_errors_instead_of_raising_them(
+    point, create_polygon
+):
+    polygon = create_polygon(exterior=[[0, 0], [10, 0], [10, 10], [0, 10]])
+    features = [(point, {"id": 1}), (polygon, {"id": 2})]
+
+    centerline_features = list(iter_centerlines(features, 10))
+
+    assert isinstance(centerline_features[0].error, InvalidInputTypeError)
+    assert isinstance(centerline_features[1].error, TooFewRidgesError)
+    assert centerline_features[0].geometry is None
+    assert centerline_features[1].properties == {"id": 2}
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_iter_centerlines_yields_errors_of_null_empty_and_tiny_features(
+    simple_polygon, tmp_path, cached
+):
+    from centerline.cache import CenterlineCache
+
+    features = [
+        {"type": "Feature", "geometry": None, "properties": {"id": 1}},
+        (geometry.Polygon(), {"id": 2}),
+        (geometry.box(0, 0, 0.1, 0.1), {"id": 3}),
+        (simple_polygon, {"id": 4}),
+    ]
+
+    with CenterlineCache(str(tmp_path / "cache.sqlite")) as cache:
+        centerline_features = list(
+            iter_centerlines(features, 0.5, cache=cache if cached else None)
+        )
+
+    assert isinstance(centerline_features[0].error, InvalidInputTypeError)
+    assert isinstance(centerline_features[1].error, InvalidInputTypeError)
+    assert isinstance(centerline_features[2].error, TooFewRidgesError)
+    assert centerline_features[3].error is None
+    assert [
+        centerline_feature.properties["id"]
+        for centerline_feature in centerline_features
+    ] == [1, 2, 3, 4]
+
+
+def test_iter_centerlines_consumes_the_features_lazily(simple_polygon):
+    consumed = []
+
+    def features():
+        for index in itertools.count():
+            consumed.append(index)
+            yield simple_polygon, {"id": index}
+
+    centerline_features = iter_centerlines(features())
+    next(centerline_features)
+    next(centerline_features)
+
+    assert consumed == [0, 1]
+
+
+def test_iter_centerlines_with_workers_keeps_the_order(simple_polygon):
+    features = ((simple_polygon, {"id": index}) for index in range(10))
+
+    centerline_features = list(iter_centerlines(features, workers=2))
+
+    assert [feature.index for feature in centerline_features] == list(
+        range(10)
+    )
+    assert [feature.properties["id"] for feature in centerline_features] == (
+        list(range(10))
+    )
+
+
+def test_iter_centerlines_unordered_yields_every_feature(simple_polygon):
+    features = ((simple_polygon, {"id": index}) for index in range(10))
+
+    centerline_features = iter_centerlines(
+        features, workers=2, ordered=False
+    )
+
+    assert sorted(feature.index for feature in centerline_features) == list(
+        range(10)
+    )
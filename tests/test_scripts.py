@@ -2,12 +2,22 @@
 
 from __future__ import unicode_literals
 
+import json
+import os
+
 import fiona
 import pytest
 
 from click.testing import CliRunner
-
-from centerline.converters import create_centerlines, get_ogr_driver
+from shapely.geometry import box, mapping, shape
+
+from centerline import converters
+from centerline.converters import (
+    create_centerlines,
+    get_ogr_driver,
+    get_ogr_driver_names,
+    merge_centerlines,
+)
 from centerline.exceptions import UnsupportedVectorType
 
 
@@ -38,6 +48,13 @@ def test__driver_name__with_geojson__returns_geojson(create_input_file):
     assert driver.GetName() == EXPECTED_DRIVER_NAME
 
 
+def test_ogr_driver_names_are_read_once():
+    driver_names = get_ogr_driver_names()
+
+    assert get_ogr_driver_names() is driver_names
+    assert driver_names["shp"] == "ESRI Shapefile"
+
+
 def test__with_unknown_extension__returns_valueerror():
     input_file = "example.unknown"
 
@@ -71,7 +88,10 @@ def test_shp_to_shp_too_large_density_raises_error(
 def test_shp_to_shp_records_geom_type_is_multilinestring(
     create_input_file, create_output_centerline_file
 ):
-    EXPECTED_TYPE = "MultiLineString"
+    # The Shapefile format does not distinguish between the single and
+    # the multi-part polylines, so the centerlines that consist of a
+    # single polyline are read back as LineStrings.
+    EXPECTED_TYPES = ("LineString", "MultiLineString")
 
     input_polygon_shp = create_input_file("polygons", "shp")
     output_centerline_shp = create_output_centerline_file("shp")
@@ -83,7 +103,7 @@ def test_shp_to_shp_records_geom_type_is_multilinestring(
 
     with fiona.open(output_centerline_shp) as dst:
         for record in dst:
-            assert record.get("geometry").get("type") == EXPECTED_TYPE
+            assert record.get("geometry").get("type") in EXPECTED_TYPES
 
 
 def test_shp_to_shp_record_count_is_3(
@@ -167,3 +187,706 @@ def test_input_file_does_not_contain_polygons(
 
     with fiona.open(output_centerline_geojson) as dst:
         assert len(list(dst)) == EXPECTED_COUNT
+
+
+def test_shp_to_geojson_with_workers_keeps_input_order(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines,
+        [input_polygon_shp, output_centerline_geojson, "--workers", 2],
+    )
+
+    with fiona.open(input_polygon_shp) as src:
+        expected_ids = [record["properties"]["id"] for record in src]
+    with fiona.open(output_centerline_geojson) as dst:
+        assert [record["properties"]["id"] for record in dst] == expected_ids
+
+
+def test_shp_to_geojson_unordered_record_count_is_3(
+    create_input_file, create_output_centerline_file
+):
+    EXPECTED_COUNT = 3
+
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_geojson,
+            "--workers",
+            2,
+            "--unordered",
+        ],
+    )
+
+    with fiona.open(output_centerline_geojson) as dst:
+        assert len(list(dst)) == EXPECTED_COUNT
+
+
+def test_shp_to_shp_with_workers_too_large_density_raises_error(
+    create_input_file, create_output_centerline_file, caplog
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_shp = create_output_centerline_file("shp")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_shp,
+            "--interpolation-distance",
+            13.5,
+            "--workers",
+            2,
+        ],
+    )
+
+    assert (
+        "Number of produced ridges is too small. Please adjust your "
+        "interpolation distance." in caplog.messages
+    )
+
+
+def test_shp_to_geojson_with_auto_interpolation_distance_record_count_is_3(
+    create_input_file, create_output_centerline_file, caplog
+):
+    EXPECTED_COUNT = 3
+
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_geojson,
+            "--interpolation-distance",
+            "auto",
+        ],
+    )
+
+    assert caplog.messages == []
+    with fiona.open(output_centerline_geojson) as dst:
+        assert len(list(dst)) == EXPECTED_COUNT
+
+
+def test_shp_to_geojson_with_pruning_and_simplification_has_fewer_points(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+    simplified_centerline_geojson = create_output_centerline_file("json")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines, [input_polygon_shp, output_centerline_geojson]
+    )
+    result = runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            simplified_centerline_geojson,
+            "--min-branch-length",
+            "1",
+            "--simplify-tolerance",
+            "0.1",
+        ],
+    )
+
+    assert result.exit_code == 0
+    with fiona.open(output_centerline_geojson) as dst:
+        point_count = sum(map(_count_points, dst))
+    with fiona.open(simplified_centerline_geojson) as dst:
+        simplified_point_count = sum(map(_count_points, dst))
+    assert 0 < simplified_point_count < point_count
+
+
+def test_shp_to_geojson_with_the_delaunay_engine(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_geojson,
+            "--engine",
+            "delaunay",
+        ],
+    )
+
+    assert result.exit_code == 0
+    with fiona.open(input_polygon_shp) as src:
+        polygons = {
+            feature["properties"]["id"]: shape(feature["geometry"])
+            for feature in src
+        }
+    with fiona.open(output_centerline_geojson) as dst:
+        records = list(dst)
+    assert records
+    for record in records:
+        polygon = polygons[record["properties"]["id"]]
+        assert polygon.contains(shape(record["geometry"]))
+
+
+def _count_points(record):
+    return sum(len(line) for line in record["geometry"]["coordinates"])
+
+
+def test_shp_to_gpkg_in_batches_keeps_the_records(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+    output_centerline_gpkg = create_output_centerline_file("gpkg")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines, [input_polygon_shp, output_centerline_geojson]
+    )
+    result = runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_gpkg,
+            "--write-batch-size",
+            "2",
+        ],
+    )
+
+    assert result.exit_code == 0
+    with fiona.open(output_centerline_geojson) as dst:
+        expected_properties = [dict(record["properties"]) for record in dst]
+    with fiona.open(output_centerline_gpkg) as dst:
+        assert dst.schema["geometry"] == "MultiLineString"
+        assert [
+            dict(record["properties"]) for record in dst
+        ] == expected_properties
+
+
+def test_invalid_interpolation_distance(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_geojson,
+            "--interpolation-distance",
+            "automatic",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "neither a number nor 'auto'" in result.output
+
+
+def test_shp_to_geojson_with_cache_reuses_the_centerlines(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+    cache = create_output_centerline_file("sqlite")
+    arguments = [
+        input_polygon_shp,
+        output_centerline_geojson,
+        "--cache",
+        cache,
+    ]
+
+    runner = CliRunner()
+    runner.invoke(create_centerlines, arguments)
+    os.remove(output_centerline_geojson)
+    result = runner.invoke(create_centerlines, arguments)
+
+    assert "Cache: 3 hits, 0 misses" in result.output
+    with fiona.open(output_centerline_geojson) as dst:
+        assert len(list(dst)) == 3
+
+
+def test_shp_to_geojson_with_previous_output_reuses_the_centerlines(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    previous_centerline_geojson = create_output_centerline_file("json")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines, [input_polygon_shp, previous_centerline_geojson]
+    )
+    result = runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_geojson,
+            "--previous-src",
+            input_polygon_shp,
+            "--previous-dst",
+            previous_centerline_geojson,
+        ],
+    )
+
+    assert "3 reused, 0 recomputed, 0 deleted" in result.output
+    with fiona.open(previous_centerline_geojson) as previous_dst:
+        with fiona.open(output_centerline_geojson) as dst:
+            assert [record["properties"] for record in dst] == [
+                record["properties"] for record in previous_dst
+            ]
+
+
+def test_previous_output_outside_of_the_filters_is_not_deleted(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    previous_centerline_geojson = create_output_centerline_file("json")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines, [input_polygon_shp, previous_centerline_geojson]
+    )
+    result = runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_geojson,
+            "--previous-src",
+            input_polygon_shp,
+            "--previous-dst",
+            previous_centerline_geojson,
+            "--fid",
+            "1",
+        ],
+    )
+
+    assert "1 reused, 0 recomputed, 0 deleted" in result.output
+
+
+def test_previous_output_with_duplicate_attributes_is_found_by_fid_field(
+    tmp_path, caplog
+):
+    input_polygons_geojson = str(tmp_path / "polygons.geojson")
+    previous_centerline_geojson = str(tmp_path / "previous.geojson")
+    output_centerline_geojson = str(tmp_path / "centerlines.geojson")
+    with open(input_polygons_geojson, "w") as input_file:
+        json.dump(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {
+                        "type": "Feature",
+                        "properties": {"name": "river"},
+                        "geometry": mapping(box(x, 0, x + 10, 3)),
+                    }
+                    for x in (0, 20)
+                ],
+            },
+            input_file,
+        )
+    incremental_arguments = [
+        input_polygons_geojson,
+        output_centerline_geojson,
+        "--previous-src",
+        input_polygons_geojson,
+        "--previous-dst",
+        previous_centerline_geojson,
+    ]
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines,
+        [input_polygons_geojson, previous_centerline_geojson],
+    )
+    result = runner.invoke(create_centerlines, incremental_arguments)
+
+    assert "0 reused, 2 recomputed, 0 deleted" in result.output
+    assert "of 2 unchanged features were not found" in caplog.text
+
+    runner.invoke(
+        create_centerlines,
+        [
+            input_polygons_geojson,
+            previous_centerline_geojson,
+            "--fid-field",
+            "src_fid",
+        ],
+    )
+    result = runner.invoke(
+        create_centerlines, incremental_arguments + ["--fid-field", "src_fid"]
+    )
+
+    assert "2 reused, 0 recomputed, 0 deleted" in result.output
+    with fiona.open(output_centerline_geojson) as dst:
+        assert [record["properties"]["src_fid"] for record in dst] == [0, 1]
+
+
+def test_previous_src_requires_previous_dst(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_geojson,
+            "--previous-src",
+            input_polygon_shp,
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "must be used together" in result.output
+
+
+def test_shp_to_geojson_with_stats_writes_the_slowest_features(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+    stats_json = create_output_centerline_file("json")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_geojson,
+            "--stats",
+            stats_json,
+            "--stats-slowest",
+            2,
+        ],
+    )
+
+    with open(stats_json) as stats_file:
+        stats = json.load(stats_file)
+    assert stats["features"] == 3
+    assert len(stats["slowest"]) == 2
+    assert stats["slowest"][0]["feature_id"] in ("0", "1", "2")
+
+
+@pytest.mark.parametrize(
+    "filter_arguments,expected_ids",
+    [
+        (["--bbox", "9", "53", "15", "60"], [1, 2]),
+        (["--bbox", "9", "53", "15", "60", "--where", "id > 1"], [2]),
+        (["--fid", "0", "--fid", "2"], [1, 3]),
+        (["--where", "name LIKE 'name %'", "--fid", "2"], [3]),
+    ],
+)
+def test_shp_to_geojson_only_converts_the_selected_features(
+    create_input_file,
+    create_output_centerline_file,
+    filter_arguments,
+    expected_ids,
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines,
+        [input_polygon_shp, output_centerline_geojson] + filter_arguments,
+    )
+
+    assert result.exit_code == 0
+    with fiona.open(output_centerline_geojson) as dst:
+        assert [record["properties"]["id"] for record in dst] == expected_ids
+
+
+def test_shp_to_geojson_with_mask_converts_the_intersecting_features(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+    mask_geojson = create_output_centerline_file("json")
+    with open(mask_geojson, "w") as mask_file:
+        json.dump(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {
+                        "type": "Feature",
+                        "properties": {},
+                        "geometry": mapping(box(20, 60, 30, 70)),
+                    }
+                ],
+            },
+            mask_file,
+        )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines,
+        [input_polygon_shp, output_centerline_geojson, "--mask", mask_geojson],
+    )
+
+    assert result.exit_code == 0
+    with fiona.open(output_centerline_geojson) as dst:
+        assert [record["properties"]["id"] for record in dst] == [3]
+
+
+def test_null_and_tiny_features_do_not_stop_the_conversion(tmp_path):
+    input_polygons_geojson = str(tmp_path / "polygons.geojson")
+    output_centerline_geojson = str(tmp_path / "centerlines.geojson")
+    geometries = [
+        box(0, 0, 10, 3),
+        box(0, 0, 0.1, 0.1),
+        None,
+        box(20, 0, 30, 3),
+    ]
+    with open(input_polygons_geojson, "w") as input_file:
+        json.dump(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {
+                        "type": "Feature",
+                        "properties": {"id": index},
+                        "geometry": geometry and mapping(geometry),
+                    }
+                    for index, geometry in enumerate(geometries, 1)
+                ],
+            },
+            input_file,
+        )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines, [input_polygons_geojson, output_centerline_geojson]
+    )
+
+    assert result.exit_code == 0
+    with fiona.open(output_centerline_geojson) as dst:
+        assert [record["properties"]["id"] for record in dst] == [1, 4]
+
+
+@pytest.mark.parametrize(
+    "filter_arguments,expected_ids",
+    [
+        (["--fid", "0", "--fid", "2"], [1, 3]),
+        (["--bbox", "9", "53", "15", "60", "--fid", "1"], [2]),
+        (["--shard", "2/2"], [2]),
+    ],
+)
+def test_fids_are_selected_without_the_attribute_filters(
+    create_input_file,
+    create_output_centerline_file,
+    monkeypatch,
+    filter_arguments,
+    expected_ids,
+):
+    monkeypatch.setattr(
+        converters, "_supports_attribute_filters", lambda: False
+    )
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines,
+        [input_polygon_shp, output_centerline_geojson] + filter_arguments,
+    )
+
+    assert result.exit_code == 0
+    with fiona.open(output_centerline_geojson) as dst:
+        assert [record["properties"]["id"] for record in dst] == expected_ids
+
+
+def test_where_clause_requires_the_attribute_filters(
+    create_input_file, create_output_centerline_file, monkeypatch
+):
+    monkeypatch.setattr(
+        converters, "_supports_attribute_filters", lambda: False
+    )
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines,
+        [input_polygon_shp, output_centerline_geojson, "--where", "id > 1"],
+    )
+
+    assert result.exit_code == 2
+    assert "Fiona 1.9" in result.output
+
+
+def test_invalid_where_clause(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines,
+        [
+            input_polygon_shp,
+            output_centerline_geojson,
+            "--where",
+            "id >< 1",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "'--where'" in result.output
+    assert not os.path.exists(output_centerline_geojson)
+
+
+@pytest.mark.parametrize("shard_by", ["fid", "space"])
+def test_shp_shards_merge_into_all_of_the_centerlines(
+    create_input_file, create_output_centerline_file, shard_by
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_gpkg = create_output_centerline_file("gpkg")
+    output_directory = os.path.dirname(output_centerline_gpkg)
+    partial_geojsons = [
+        os.path.join(output_directory, "shard{}.geojson".format(number))
+        for number in (1, 2, 3)
+    ]
+
+    runner = CliRunner()
+    shard_ids = []
+    for number, partial_geojson in enumerate(partial_geojsons, 1):
+        result = runner.invoke(
+            create_centerlines,
+            [
+                input_polygon_shp,
+                partial_geojson,
+                "--shard",
+                "{}/3".format(number),
+                "--shard-by",
+                shard_by,
+            ],
+        )
+        assert result.exit_code == 0
+        with fiona.open(partial_geojson) as partial_dst:
+            shard_ids.extend(
+                record["properties"]["id"] for record in partial_dst
+            )
+    result = runner.invoke(
+        merge_centerlines, partial_geojsons + [output_centerline_gpkg]
+    )
+
+    assert result.exit_code == 0
+    assert sorted(shard_ids) == [1, 2, 3]
+    with fiona.open(input_polygon_shp) as src:
+        with fiona.open(output_centerline_gpkg) as dst:
+            assert dst.crs == src.crs
+            assert dst.schema["geometry"] == "MultiLineString"
+            assert [record["properties"]["id"] for record in dst] == shard_ids
+
+
+@pytest.mark.parametrize("shard", ["0/2", "3/2", "1-2"])
+def test_invalid_shard(
+    create_input_file, create_output_centerline_file, shard
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        create_centerlines,
+        [input_polygon_shp, output_centerline_geojson, "--shard", shard],
+    )
+
+    assert result.exit_code == 2
+    assert "--shard" in result.output
+
+
+def test_merge_requires_the_same_schemas(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_geojson = create_output_centerline_file("geojson")
+
+    runner = CliRunner()
+    runner.invoke(
+        create_centerlines, [input_polygon_shp, output_centerline_geojson]
+    )
+    result = runner.invoke(
+        merge_centerlines,
+        [
+            output_centerline_geojson,
+            input_polygon_shp,
+            create_output_centerline_file("gpkg"),
+        ],
+    )
+
+    assert result.exit_code == 1
+    assert "does not have the schema and the CRS" in result.output
+
+
+def test_interrupted_shp_to_gpkg_is_resumed_from_the_checkpoint(
+    create_input_file, create_output_centerline_file, monkeypatch
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_gpkg = create_output_centerline_file("gpkg")
+    arguments = [
+        input_polygon_shp,
+        output_centerline_gpkg,
+        "--write-batch-size",
+        "1",
+    ]
+    iter_centerlines = converters.iter_centerlines
+
+    def interrupted_iter_centerlines(*args, **kwargs):
+        centerline_features = iter_centerlines(*args, **kwargs)
+        yield next(centerline_features)
+        yield next(centerline_features)
+        raise MemoryError
+
+    runner = CliRunner()
+    with monkeypatch.context() as patch:
+        patch.setattr(
+            converters, "iter_centerlines", interrupted_iter_centerlines
+        )
+        result = runner.invoke(create_centerlines, arguments)
+    assert isinstance(result.exception, MemoryError)
+    with fiona.open(output_centerline_gpkg) as dst:
+        assert len(dst) == 2
+    result = runner.invoke(create_centerlines, arguments + ["--resume"])
+
+    assert result.exit_code == 0
+    with fiona.open(output_centerline_gpkg) as dst:
+        assert [record["properties"]["id"] for record in dst] == [1, 2, 3]
+    assert not os.path.exists(output_centerline_gpkg + ".checkpoint")
+
+
+def test_complete_run_cannot_be_resumed(
+    create_input_file, create_output_centerline_file
+):
+    input_polygon_shp = create_input_file("polygons", "shp")
+    output_centerline_gpkg = create_output_centerline_file("gpkg")
+    arguments = [input_polygon_shp, output_centerline_gpkg]
+
+    runner = CliRunner()
+    runner.invoke(create_centerlines, arguments)
+    result = runner.invoke(create_centerlines, arguments + ["--resume"])
+
+    assert result.exit_code == 1
+    assert "The checkpoint cannot be read" in result.output
+    with fiona.open(output_centerline_gpkg) as dst:
+        assert len(dst) == 3
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from click.testing import CliRunner
+from shapely.geometry import Point, mapping
+
+from centerline.server import (
+    CenterlineService,
+    _Worker,
+    create_http_server,
+    serve_centerlines,
+    serve_json_lines,
+)
+
+
+try:
+    from http.client import HTTPConnection
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+except ImportError:  # pragma: no cover
+    from httplib import HTTPConnection
+    from urllib2 import HTTPError, urlopen
+
+
+@pytest.fixture
+def service():
+    with CenterlineService(workers=2, max_pending=2) as service:
+        yield service
+
+
+@pytest.fixture
+def create_request(simple_polygon):
+    def _create_request(**options):
+        request = {"id": 1, "geometry": mapping(simple_polygon)}
+        request.update(options)
+        return request
+
+    return _create_request
+
+
+def test_centerline_is_returned_with_the_id_and_properties(
+    service, create_request
+):
+    request = create_request(properties={"name": "polygon"})
+
+    status, response = service.handle(request)
+
+    assert status == 200
+    assert response["id"] == 1
+    assert response["geometry"]["type"] == "MultiLineString"
+    assert response["properties"] == {"name": "polygon"}
+
+
+@pytest.mark.parametrize(
+    "options, expected_status",
+    [
+        ({"interpolation_distance": 10}, 422),
+        ({"interpolation_distance": "far"}, 400),
+        ({"interpolation_distance": 0}, 400),
+        ({"interpolation_distance": 1e-9}, 400),
+        ({"geometry": {"type": "Polygon"}}, 400),
+        ({"geometry": mapping(Point(0, 0))}, 422),
+    ],
+)
+def test_errors_are_returned_with_their_status(
+    service, create_request, options, expected_status
+):
+    status, response = service.handle(create_request(**options))
+
+    assert status == expected_status
+    assert response["id"] == 1
+    assert "error" in response
+
+
+def test_requests_over_the_limit_are_rejected(service, create_request):
+    slow_request = create_request(
+        geometry=mapping(Point(0, 0).buffer(500, 64)),
+        interpolation_distance=0.25,
+    )
+    finished = threading.Semaphore(0)
+    for _ in range(2):
+        service.submit(slow_request, lambda *result: finished.release())
+
+    status, _ = service.handle(create_request())
+    for _ in range(2):
+        finished.acquire()
+
+    assert status == 503
+    assert service.handle(create_request())[0] == 200
+
+
+def test_timed_out_requests_do_not_hold_up_the_worker(create_request):
+    slow_request = create_request(
+        geometry=mapping(Point(0, 0).buffer(500, 64)),
+        interpolation_distance=0.02,
+    )
+    with CenterlineService(workers=1, max_pending=1, timeout=1) as service:
+        start = time.time()
+        slow_status, _ = service.handle(slow_request)
+        timed_out = time.time() - start
+        # The slow request's worker was replaced and its slot released.
+        status, _ = service.handle(create_request())
+
+    assert slow_status == 504
+    assert timed_out < 2
+    assert status == 200
+
+
+def test_queued_requests_time_out_without_being_processed(create_request):
+    slow_request = create_request(
+        geometry=mapping(Point(0, 0).buffer(500, 64)),
+        interpolation_distance=0.02,
+    )
+    with CenterlineService(workers=1, max_pending=2, timeout=1) as service:
+        finished = threading.Semaphore(0)
+        results = []
+
+        def callback(*result):
+            results.append(result)
+            finished.release()
+
+        for request in (slow_request, create_request()):
+            service.submit(request, callback)
+        for _ in range(2):
+            finished.acquire()
+
+    assert [status for status, _ in results] == [504, 504]
+
+
+def test_worker_that_dies_while_warming_up_is_replaced(create_request):
+    worker = _Worker()
+    worker._process.terminate()
+    worker._process.join()
+    task = (create_request(), 0.5, 1000000)
+
+    crashed_status, _ = worker.run(task, 10)
+    status, _ = worker.run(task, 10)
+    worker.stop()
+
+    assert crashed_status == 500
+    assert status == 200
+
+
+@pytest.mark.parametrize("timeout", ["0", "-1", "nan"])
+def test_timeout_must_be_positive(timeout):
+    runner = CliRunner()
+    result = runner.invoke(serve_centerlines, ["--timeout", timeout])
+
+    assert result.exit_code == 2
+
+
+def test_json_lines_are_answered_by_their_ids(service, create_request):
+    requests = [
+        create_request(id=index, interpolation_distance=0.1 * index)
+        for index in range(1, 6)
+    ]
+    input_file = io.StringIO(
+        "\n".join(json.dumps(request) for request in requests)
+        + "\n\nnot json\n"
+    )
+    output_file = io.StringIO()
+
+    serve_json_lines(service, input_file, output_file)
+
+    responses = [
+        json.loads(line) for line in output_file.getvalue().splitlines()
+    ]
+    ids = [response["id"] for response in responses]
+    assert sorted(ids, key=str) == [1, 2, 3, 4, 5, None]
+    assert "error" in responses[ids.index(None)]
+
+
+def test_http_server_responds_with_the_status_codes(service, create_request):
+    server = create_http_server(service)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    url = "http://127.0.0.1:{}".format(server.server_port)
+    try:
+        health = json.loads(urlopen(url + "/health").read().decode("utf-8"))
+        response = urlopen(url, json.dumps(create_request()).encode("utf-8"))
+        with pytest.raises(HTTPError) as error_info:
+            urlopen(
+                url,
+                json.dumps(create_request(interpolation_distance=10)).encode(
+                    "utf-8"
+                ),
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    assert health == {"status": "ok"}
+    assert response.getcode() == 200
+    geometry = json.loads(response.read().decode("utf-8"))["geometry"]
+    assert geometry["type"] == "MultiLineString"
+    assert error_info.value.code == 422
+
+
+@pytest.mark.parametrize(
+    "body, headers",
+    [
+        (b"\xff\xfe{}", {}),
+        (b"{}", {"Content-Length": "two"}),
+        (b"{}", {"Content-Length": "-1"}),
+    ],
+)
+def test_http_server_rejects_unreadable_bodies(service, body, headers):
+    server = create_http_server(service)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    connection = HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    try:
+        connection.putrequest("POST", "/")
+        headers.setdefault("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders(body)
+        response = connection.getresponse()
+        data = json.loads(response.read().decode("utf-8"))
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    assert response.status == 400
+    assert "error" in data
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import numpy
+
+from shapely.geometry import box, mapping
+
+from centerline.sharding import get_hilbert_keys, get_spatial_shard_ids
+
+
+def test_hilbert_keys_visit_the_neighbouring_cells_in_turn():
+    x, y = numpy.meshgrid(numpy.arange(4), numpy.arange(4))
+    points = numpy.column_stack([x.ravel(), y.ravel()]).astype(float)
+
+    keys = get_hilbert_keys(points, order=2)
+
+    assert sorted(keys.tolist()) == list(range(16))
+    path = points[numpy.argsort(keys)]
+    assert (numpy.abs(numpy.diff(path, axis=0)).sum(axis=1) == 1).all()
+
+
+def test_spatial_shards_are_balanced_regions():
+    # Two clusters of ten boxes each, in the shuffled order of the FIDs.
+    features = [
+        {
+            "id": str(fid),
+            "geometry": mapping(
+                box(fid % 2 * 100 + fid, 0, fid % 2 * 100 + fid + 1, 1)
+            ),
+        }
+        for fid in numpy.random.RandomState(0).permutation(20)
+    ]
+    features.append({"id": "20", "geometry": None})
+
+    shards = [get_spatial_shard_ids(features, index, 3) for index in (0, 1, 2)]
+
+    assert sorted(len(shard) for shard in shards) == [7, 7, 7]
+    assert set.union(*shards) == set(range(21))
+    assert shards == [
+        get_spatial_shard_ids(reversed(features), index, 3)
+        for index in (0, 1, 2)
+    ]
+    # Neither of the clusters is spread over all of the shards.
+    for remainder in (0, 1):
+        cluster = set(range(remainder, 20, 2))
+        assert sum(bool(shard & cluster) for shard in shards) == 2
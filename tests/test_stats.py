@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pickle
+
+import pytest
+
+from centerline import iter_centerlines
+from centerline.geometry import Centerline
+from centerline.stats import STAGES, CenterlineStats, FeatureStats
+
+
+def test_centerline_records_the_stages(complex_polygon):
+    feature_stats = FeatureStats(trace_memory=True)
+
+    Centerline(complex_polygon, _stats=feature_stats)
+
+    assert set(feature_stats.durations) == set(STAGES)
+    assert set(feature_stats.peak_bytes) == set(STAGES)
+    assert feature_stats.points > 0
+    assert 0 < feature_stats.kept_ridges < feature_stats.ridges
+
+
+def test_memory_tracing_started_by_the_caller_is_left_running(
+    complex_polygon,
+):
+    tracemalloc = pytest.importorskip("tracemalloc")
+    feature_stats = FeatureStats(trace_memory=True)
+    tracemalloc.start()
+    try:
+        Centerline(complex_polygon, _stats=feature_stats)
+
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert set(feature_stats.peak_bytes) == set(STAGES)
+    assert all(peak > 0 for peak in feature_stats.peak_bytes.values())
+
+
+def test_feature_stats_are_picklable():
+    feature_stats = FeatureStats(3)
+    feature_stats.durations["voronoi"] = 1.5
+
+    unpickled = pickle.loads(pickle.dumps(feature_stats))
+
+    assert unpickled.to_dict() == feature_stats.to_dict()
+
+
+def test_multipolygon_stats_add_up_the_parts(multipolygon):
+    part_stats = [FeatureStats() for _ in multipolygon.geoms]
+    for polygon, stats in zip(multipolygon.geoms, part_stats):
+        Centerline(polygon, _stats=stats)
+    feature_stats = FeatureStats()
+
+    Centerline(multipolygon, _stats=feature_stats)
+
+    assert set(feature_stats.durations) == set(STAGES)
+    for count in ("points", "ridges", "kept_ridges"):
+        assert getattr(feature_stats, count) == sum(
+            getattr(stats, count) for stats in part_stats
+        )
+
+
+def test_only_the_slowest_features_are_kept():
+    stats = CenterlineStats(slowest_count=2)
+    for feature_id, duration in enumerate([3, 1, 4, 1, 5]):
+        feature_stats = stats.create_feature_stats(feature_id)
+        feature_stats.durations["voronoi"] = duration
+        stats.add(feature_stats)
+
+    report = stats.to_dict()
+
+    assert report["features"] == 5
+    assert report["durations"]["voronoi"] == 14
+    assert [feature["feature_id"] for feature in report["slowest"]] == [4, 2]
+    assert "peak_bytes" not in report
+
+
+def test_iter_centerlines_with_workers_aggregates_the_stats(
+    simple_polygon, point
+):
+    features = [{"id": "7", "geometry": simple_polygon, "properties": {}}]
+    features.append((point, {}))
+    stats = CenterlineStats()
+
+    centerline_features = list(
+        iter_centerlines(features, workers=2, stats=stats)
+    )
+
+    assert centerline_features[0].stats.feature_id == "7"
+    assert centerline_features[1].stats is None
+    assert stats.features == 1
+    assert stats.kept_ridges == centerline_features[0].stats.kept_ridges
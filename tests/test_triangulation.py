@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import numpy
+import pytest
+
+from shapely import vectorized
+from shapely.geometry import LineString, Point, Polygon, box
+
+from centerline.exceptions import RefinementLimitError
+from centerline.triangulation import (
+    MIN_REFINEMENT_POINTS,
+    get_chordal_axis,
+    get_ring_segments,
+    triangulate_conforming,
+)
+
+
+def _triangulate(polygon):
+    points, segments = get_ring_segments(
+        [numpy.array(polygon.exterior.coords)]
+    )
+    return triangulate_conforming(
+        points,
+        segments,
+        lambda centroids: vectorized.contains(
+            polygon, centroids[:, 0], centroids[:, 1]
+        ),
+    )
+
+
+def test_ring_segments_merge_the_repeated_vertices():
+    ring = numpy.array([[0, 0], [1, 0], [1, 0], [1, 1], [0, 1], [0, 0]])
+
+    points, segments = get_ring_segments([ring, ring[:3]])
+
+    assert points.tolist() == [[0, 0], [0, 1], [1, 0], [1, 1]]
+    assert segments.tolist() == [[0, 1], [0, 2], [1, 3], [2, 3]]
+
+
+def test_long_segments_are_split_until_the_triangles_span_the_polygon():
+    polygon = box(0, 0, 10, 1)
+
+    points, triangles, _, triangles_are_inside = _triangulate(polygon)
+
+    assert len(points) > 4
+    assert numpy.isin(points[:, 1], [0, 1]).all()
+    assert (
+        polygon.area
+        == numpy.abs(
+            numpy.cross(
+                points[triangles[:, 1]] - points[triangles[:, 0]],
+                points[triangles[:, 2]] - points[triangles[:, 0]],
+            )[triangles_are_inside]
+        ).sum()
+        / 2
+    )
+
+
+@pytest.mark.parametrize(
+    "polygon",
+    [
+        LineString([(0, 0), (1000, 0)]).buffer(8),
+        Point(0, 0).buffer(20),
+    ],
+    ids=["round_caps", "disc"],
+)
+def test_round_borders_are_not_refined_along_their_curves(polygon):
+    points, _, _, _ = _triangulate(polygon)
+
+    # Only the long sides of the round caps' strip are split, by its
+    # width.
+    straight_length = max(polygon.length - numpy.pi * 16, 0)
+    assert len(points) <= len(polygon.exterior.coords) + straight_length / 16
+
+
+def test_chordal_axis_follows_the_middle_of_a_strip():
+    polygon = box(0, 0, 10, 1)
+
+    vertices, ridges = get_chordal_axis(*_triangulate(polygon))
+
+    assert len(ridges) > 0
+    midpoints = vertices[ridges].mean(axis=1)
+    is_sleeve = (midpoints[:, 0] > 2) & (midpoints[:, 0] < 8)
+    assert is_sleeve.any()
+    assert numpy.allclose(vertices[ridges][is_sleeve][:, :, 1], 0.5)
+
+
+def test_chordal_axis_stays_within_a_concave_polygon():
+    polygon = Polygon([(0, 0), (10, 0), (10, 1), (1, 1), (1, 10), (0, 10)])
+
+    vertices, ridges = get_chordal_axis(*_triangulate(polygon))
+
+    assert vectorized.contains(polygon, vertices[:, 0], vertices[:, 1]).all()
+    assert len(numpy.unique(ridges)) == len(vertices)
+
+
+def test_refinement_of_sharp_corners_is_bounded(star_polygon):
+    calls = []
+
+    def is_inside(centroids):
+        calls.append(len(centroids))
+        return vectorized.contains(
+            star_polygon, centroids[:, 0], centroids[:, 1]
+        )
+
+    points, segments = get_ring_segments(
+        [numpy.array(star_polygon.exterior.coords)]
+    )
+    with pytest.raises(RefinementLimitError):
+        triangulate_conforming(points, segments, is_inside)
+
+    # No triangulation has more triangles than twice its points.
+    assert max(calls) < 2 * MIN_REFINEMENT_POINTS